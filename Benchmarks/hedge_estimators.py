@@ -0,0 +1,90 @@
+"""
+Compares pairsTrader's hedge ratio estimators on cointegrated pairs
+with known hedge ratios.
+
+Every estimator trades the same pairs with the same z score period and
+bandwidth. The run reports the seconds per pair, the mean cumulative
+return and number of trades, and the median absolute error of the hedge
+ratios against the true ratio:
+
+    python -m package.Benchmarks.hedge_estimators --bars 2000 --pairs 4
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import synthetic_data as synth
+from ..Lib.strategies.pairs import pairsTrader
+
+# (name, pairsTrader keyword arguments) of each estimator compared
+ESTIMATORS = [('kalman', {'hedge_ratio': 'kalman'}),
+              ('ols', {'hedge_ratio': 'ols'}),
+              ('ewma', {'hedge_ratio': 'ewma'})]
+
+
+def compare_estimators(bars, pairs, zperiod=20, bandwidth=2.0, window=100,
+                       seed=0, estimators=None):
+    """
+    Trades every estimator on the same synthetic pairs.
+
+    Inputs:
+    - bars, pairs:      (int) size of cointegrated_pairs(bars, pairs)
+    - zperiod:          (int) z score period
+    - bandwidth:        (float) z score bandwidth
+    - window:           (int) hedge_window of the regression estimators
+    - seed:             (int) random seed of the prices
+    - estimators:       (list, str) optional subset of ESTIMATORS names
+
+    Outputs:
+    - comparison:       (pandas DataFrame) one row per estimator
+    """
+    df, hedge_ratios = synth.cointegrated_pairs(bars, pairs, seed=seed)
+    if estimators is None:
+        estimators = [name for name, _ in ESTIMATORS]
+
+    rows = []
+    for name, kwargs in ESTIMATORS:
+        if name not in estimators:
+            continue
+        if kwargs['hedge_ratio'] != 'kalman':
+            kwargs = dict(kwargs, hedge_window=window)
+        seconds, returns, trades, errors = 0.0, [], [], []
+        for (xsym, ysym), ratio in hedge_ratios.items():
+            start = time.perf_counter()
+            strategy = pairsTrader(df[xsym].copy(), df[ysym].copy(), xsym,
+                                   ysym, zperiod, bandwidth, **kwargs)
+            returns.append(strategy.trade())
+            seconds += time.perf_counter() - start
+            trades.append(len(strategy.opentimes))
+            errors.append(np.nanmedian(np.abs(strategy.df['HR'] - ratio)))
+        rows.append([name, seconds/pairs, np.mean(returns), np.mean(trades),
+                     np.median(errors)])
+
+    return pd.DataFrame(rows, columns=['estimator', 'seconds', 'cum_returns',
+                                       'trades', 'hedge_ratio_error'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bars', type=int, default=2000)
+    parser.add_argument('--pairs', type=int, default=4)
+    parser.add_argument('--zperiod', type=int, default=20)
+    parser.add_argument('--bandwidth', type=float, default=2.0)
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--estimators', nargs='+',
+                        choices=[name for name, _ in ESTIMATORS])
+    args = parser.parse_args(argv)
+
+    comparison = compare_estimators(args.bars, args.pairs, args.zperiod,
+                                    args.bandwidth, args.window,
+                                    estimators=args.estimators)
+    print(comparison.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
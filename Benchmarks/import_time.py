@@ -0,0 +1,91 @@
+"""
+Import time benchmark of the library modules.
+
+Each module is imported in a fresh interpreter, after numpy and pandas
+which every module needs, so the time measured is the library's own
+import cost. Plotting, Kalman filter, statsmodels, scipy and HTTP
+dependencies must only load when first used, so the run also fails if
+any of them is imported.
+
+    python -m package.Benchmarks.import_time --budget 0.25
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Package the library is imported as, e.g. 'package'
+ROOT_PACKAGE = __package__.rsplit('.', 1)[0]
+
+MODULES = ['Lib.strategies.crossover', 'Lib.strategies.zscore_trend',
+           'Lib.strategies.pairs', 'Lib.sweeps.parameter_sweep',
+           'Lib.pair_selection.cointegration',
+           'Lib.reporting.batch_report', 'Main.run_study',
+           'Lib.data_loading.file_loading_strategies',
+           'Lib.data_loading.web_loading_strategies']
+
+HEAVY_MODULES = ['matplotlib', 'pykalman', 'statsmodels', 'scipy',
+                 'requests']
+
+_SCRIPT = """
+import json, sys, time
+import numpy, pandas
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{'seconds': seconds, 'heavy': heavy}}))
+"""
+
+
+def measure_import(module, repeats=3):
+    """
+    Times the import of a library module in fresh interpreters.
+
+    Inputs:
+    - module:           (str) module relative to the package root, e.g.
+                        'Lib.strategies.crossover'
+    - repeats:          (int) number of fresh interpreters, the best
+                        time is reported
+
+    Outputs:
+    - seconds:          (float) best import time beyond numpy and pandas
+    - heavy:            (list, str) heavy dependencies the import loaded
+    """
+    script = _SCRIPT.format(module=ROOT_PACKAGE + '.' + module,
+                            heavy=HEAVY_MODULES)
+    root_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+
+    best, heavy = float('inf'), []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', script], cwd=root_dir,
+                                check=True, capture_output=True, text=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        best = min(best, result['seconds'])
+        heavy = result['heavy']
+    return best, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--budget', type=float, default=0.25,
+                        help="seconds allowed per module")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in MODULES:
+        seconds, heavy = measure_import(module, args.repeats)
+        ok = seconds <= args.budget and len(heavy) == 0
+        failed = failed or not ok
+        print("{:<45} {:.4f}s {}{}".format(
+            module, seconds, "ok" if ok else "FAILED",
+            "" if len(heavy) == 0 else " loads " + ", ".join(heavy)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,392 @@
+"""
+Benchmark suite of the loaders, indicators, strategies and sweep drivers
+on deterministic synthetic data.
+
+Every benchmark is timed on a grid of (bars, symbols) sizes and the
+results are written as JSON, which can be compared against a saved
+baseline run to catch performance regressions:
+
+    python -m package.Benchmarks.run_benchmarks --suite quick \
+        --output bench.json --baseline baseline.json
+
+The process exits with status 1 if a benchmark is slower than its
+baseline by more than the tolerance.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import synthetic_data as synth
+from ..Lib.data_loading.data_loader import dataLoader
+from ..Lib.data_loading.file_loading_strategies import (fileLoadingDF,
+                                                        fileLoadingRaw)
+from ..Lib.types.simple_moving_average import simpleMovingAverage
+from ..Lib.types.exponential_moving_average import expMovingAverage
+from ..Lib.types.zscore import zScore
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategies.zscore_trend import zScoreTrader
+from ..Lib.strategies.pairs import pairsTrader
+from ..Lib.strategies.batch_kalman import batch_kalman_filter
+from ..Lib.strategy_backtester import backtest
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+from ..Lib.sweeps.walk_forward import walkForward
+from ..Lib.sweeps.successive_halving import successiveHalving
+from ..Lib.pair_selection.cointegration import get_coint_pairs
+from ..Lib.streaming.raw_replay import rawReplay
+from ..Lib.streaming.event_driven import crossoverStream
+
+# (bars, symbols) cases of each suite. The bars axis is timed with two
+# symbols, the symbols axis with a fixed history length.
+SUITES = {
+    'quick': ([(10**k, 2) for k in range(3, 6)]
+              + [(1000, n) for n in (10, 50)]),
+    'full': ([(10**k, 2) for k in range(3, 8)]
+             + [(10000, n) for n in (10, 50, 100, 500)]),
+}
+
+
+# Benchmark set ups. Each builds its inputs outside of the timed region
+# and returns the function to time.
+# -----------------------------------------------------------------------------
+def _setup_load_csv(bars, symbols, workdir, workers):
+    path = os.path.join(workdir, "prices_{}_{}.csv".format(bars, symbols))
+    synth.gbm_prices(bars, symbols).to_csv(path, index=False)
+    return lambda: dataLoader(fileLoadingDF(path)).get_data()
+
+
+def _setup_load_raw(bars, symbols, workdir, workers):
+    path = os.path.join(workdir, "raw_{}_{}.json".format(bars, symbols))
+    names = synth.write_raw_json(path, bars, symbols)
+    return lambda: dataLoader(fileLoadingRaw(path, names, "hour")).get_data()
+
+
+def _setup_indicators(bars, symbols, workdir, workers):
+    series = synth.gbm_prices(bars, 1)['S000']
+
+    def run():
+        simpleMovingAverage(series, 40)
+        expMovingAverage(series, 40)
+        zScore(series, 20)
+    return run
+
+
+def _setup_crossover(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, 1)
+
+    def run():
+        strategy = crossoverTrader(df.copy(), 'S000', 'SMA', 40, fast_MA=10)
+        return backtest(strategy).trade()
+    return run
+
+
+def _setup_zscore(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, 1)
+
+    def run():
+        strategy = zScoreTrader(df.copy(), 'S000', 'SMA', 80, 8, 1.5,
+                                fast_MA=27)
+        return backtest(strategy).trade()
+    return run
+
+
+def _setup_zscore_events(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, 1)
+
+    def run():
+        strategy = zScoreTrader(df.copy(), 'S000', 'SMA', 80, 8, 1.5,
+                                fast_MA=27, event_skipping=True)
+        return backtest(strategy).trade()
+    return run
+
+
+def _setup_pairs(bars, symbols, workdir, workers):
+    df, _ = synth.cointegrated_pairs(bars, 1)
+
+    def run():
+        strategy = pairsTrader(df['X000'], df['Y000'], 'X000', 'Y000', 20)
+        return strategy.trade()
+    return run
+
+
+def _setup_pairs_ols(bars, symbols, workdir, workers):
+    df, _ = synth.cointegrated_pairs(bars, 1)
+
+    def run():
+        strategy = pairsTrader(df['X000'], df['Y000'], 'X000', 'Y000', 20,
+                               hedge_ratio='ols', hedge_window=100)
+        return strategy.trade()
+    return run
+
+
+def _setup_kalman_batch(bars, symbols, workdir, workers):
+    df, _ = synth.cointegrated_pairs(bars, max(symbols//2, 1))
+    x = df.filter(regex='^X').T.to_numpy()
+    y = df.filter(regex='^Y').T.to_numpy()
+    return lambda: batch_kalman_filter(x, y)
+
+
+def _setup_parameter_sweep(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, symbols)
+    jobs = [('crossover', (sym,), {'MA_type': 'SMA', 'slow_MA': slow,
+                                   'fast_MA': 10})
+            for sym in synth.symbol_names(symbols) for slow in (40, 80)]
+    sweep = parameterSweep(df, workers=workers)
+    return lambda: sweep.run(jobs)
+
+
+def _setup_walk_forward(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, 1)
+    grid = [{'MA_type': 'SMA', 'slow_MA': slow, 'fast_MA': fast}
+            for slow in (20, 40, 80) for fast in (5, 10)]
+    train, test = bars//4, bars//8
+    return lambda: walkForward(df, 'S000', 'crossover', grid, train, test,
+                               workers=workers).run()
+
+
+def _setup_successive_halving(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, symbols)
+    grid = [{'MA_type': 'SMA', 'slow_MA': slow, 'fast_MA': fast}
+            for slow in (20, 40, 80, 160) for fast in (5, 10)]
+    names = synth.symbol_names(symbols)
+    return lambda: successiveHalving(df, names, 'crossover', grid,
+                                     resource='symbols').run()
+
+
+def _setup_coint_screen(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, symbols)
+    return lambda: get_coint_pairs(df, workers=workers)
+
+
+def _setup_coint_batch(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, symbols)
+    return lambda: get_coint_pairs(df, method='batch', lag=10)
+
+
+def _setup_coint_neighbours(bars, symbols, workdir, workers):
+    df = synth.gbm_prices(bars, symbols)
+    return lambda: get_coint_pairs(df, method='batch', lag=10,
+                                   prefilter='neighbours',
+                                   prefilter_threshold=5)
+
+
+def _setup_raw_replay(bars, symbols, workdir, workers):
+    path = os.path.join(workdir, "raw_{}_{}.json".format(bars, symbols))
+    names = synth.write_raw_json(path, bars, symbols)
+
+    def run():
+        replay = rawReplay(path)
+        for name in names:
+            replay.subscribe(crossoverStream(name, 'SMA', 40, fast_MA=10))
+        return replay.run()
+    return run
+# -----------------------------------------------------------------------------
+
+
+# Benchmarks in the order they run. max_bars and max_symbols cap the
+# cases run by slow (e.g. per bar Python) stages.
+BENCHMARKS = {
+    'load_csv':             {'setup': _setup_load_csv},
+    'load_raw':             {'setup': _setup_load_raw, 'max_bars': 10**4,
+                             'max_symbols': 10},
+    'indicators':           {'setup': _setup_indicators, 'max_symbols': 2},
+    'crossover':            {'setup': _setup_crossover, 'max_bars': 10**6,
+                             'max_symbols': 2},
+    'zscore':               {'setup': _setup_zscore, 'max_bars': 10**6,
+                             'max_symbols': 2},
+    'zscore_events':        {'setup': _setup_zscore_events,
+                             'max_bars': 10**7, 'max_symbols': 2},
+    'pairs':                {'setup': _setup_pairs, 'max_bars': 10**4,
+                             'max_symbols': 2},
+    'pairs_ols':            {'setup': _setup_pairs_ols, 'max_bars': 10**5,
+                             'max_symbols': 2},
+    'kalman_batch':         {'setup': _setup_kalman_batch, 'max_bars': 10**5,
+                             'max_symbols': 500},
+    'parameter_sweep':      {'setup': _setup_parameter_sweep,
+                             'max_bars': 10**5, 'max_symbols': 50},
+    'walk_forward':         {'setup': _setup_walk_forward, 'max_bars': 10**6,
+                             'max_symbols': 2},
+    'successive_halving':   {'setup': _setup_successive_halving,
+                             'max_bars': 10**6, 'max_symbols': 100},
+    'coint_screen':         {'setup': _setup_coint_screen, 'max_bars': 10**4,
+                             'max_symbols': 10},
+    'coint_batch':          {'setup': _setup_coint_batch, 'max_bars': 10**5,
+                             'max_symbols': 100},
+    'coint_neighbours':     {'setup': _setup_coint_neighbours,
+                             'max_bars': 10**5, 'max_symbols': 500},
+    'raw_replay':           {'setup': _setup_raw_replay, 'max_bars': 10**5,
+                             'max_symbols': 50},
+}
+
+
+def run_benchmarks(suite='quick', names=None, repeats=3, workers=1,
+                   cases=None):
+    """
+    Times benchmarks over the cases of a suite.
+
+    Inputs:
+    - suite:            (str) key of SUITES
+    - names:            (list, str) optional subset of BENCHMARKS
+    - repeats:          (int) timed runs of each case, the best and
+                        median are reported
+    - workers:          (int) worker processes of the sweep drivers
+    - cases:            (list, tuple) optional (bars, symbols) cases
+                        replacing the suite's
+
+    Outputs:
+    - results:          (dict) JSON serialisable results:
+                        {'suite': ..., 'environment': {...},
+                         'results': [{'benchmark', 'bars', 'symbols',
+                                      'best', 'median', 'repeats',
+                                      'error'}, ...]}
+                        Failed cases have a null time and the error
+                        message.
+    """
+    if suite not in SUITES:
+        raise ValueError("suite must be one of {}".format(list(SUITES)))
+    if names is None:
+        names = list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if len(unknown) > 0:
+        raise ValueError("Unknown benchmarks: {}".format(unknown))
+    if not isinstance(repeats, int) or repeats < 1:
+        raise ValueError("repeats must be a positive int")
+    if cases is None:
+        cases = SUITES[suite]
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            spec = BENCHMARKS[name]
+            for bars, symbols in cases:
+                if (bars > spec.get('max_bars', np.inf)
+                        or symbols > spec.get('max_symbols', np.inf)):
+                    continue
+                result = {'benchmark': name, 'bars': bars,
+                          'symbols': symbols, 'best': None, 'median': None,
+                          'repeats': repeats, 'error': None}
+                try:
+                    func = spec['setup'](bars, symbols, workdir, workers)
+                    times = time_call(func, repeats)
+                    result['best'] = min(times)
+                    result['median'] = float(np.median(times))
+                except Exception as error:
+                    result['error'] = "{}: {}".format(type(error).__name__,
+                                                      error)
+                results.append(result)
+                print(_format_result(result), flush=True)
+
+    return {'suite': suite, 'environment': environment(),
+            'results': results}
+
+
+def time_call(func, repeats):
+    """
+    Returns the wall clock seconds of repeats calls of func. Anything
+    func prints is discarded.
+    """
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def environment():
+    """
+    Describes the machine and library versions of a benchmark run.
+    """
+    return {'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count()}
+
+
+def compare_results(results, baseline, tolerance=0.25):
+    """
+    Compares the median times of a run against a baseline run.
+
+    Inputs:
+    - results:          (dict) output of run_benchmarks
+    - baseline:         (dict) output of a previous run_benchmarks
+    - tolerance:        (float) fractional slow down above which a case
+                        counts as a regression
+
+    Outputs:
+    - comparison:       (pandas DataFrame) benchmark, bars, symbols,
+                        baseline, current, ratio (current/baseline) and
+                        regression of every case timed in both runs
+    """
+    def timed(run):
+        return {(r['benchmark'], r['bars'], r['symbols']): r['median']
+                for r in run['results'] if r['median'] is not None}
+
+    current, previous = timed(results), timed(baseline)
+    rows = []
+    for key in current:
+        if key in previous:
+            ratio = current[key]/previous[key]
+            rows.append(list(key) + [previous[key], current[key], ratio,
+                                     ratio > 1 + tolerance])
+    return pd.DataFrame(rows, columns=['benchmark', 'bars', 'symbols',
+                                       'baseline', 'current', 'ratio',
+                                       'regression'])
+
+
+def _format_result(result):
+    """
+    One line summary of a benchmark case.
+    """
+    case = "{:<20} bars={:<9} symbols={:<4}".format(
+        result['benchmark'], result['bars'], result['symbols'])
+    if result['error'] is not None:
+        return case + " FAILED " + result['error']
+    return case + " best={:.4f}s median={:.4f}s".format(result['best'],
+                                                        result['median'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--suite', default='quick', choices=list(SUITES))
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS),
+                        help="subset of benchmarks to run")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', help="JSON file of the results")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.suite, args.benchmarks, args.repeats,
+                             args.workers)
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+        comparison = compare_results(results, baseline, args.tolerance)
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import json
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# First bar of every synthetic series: 2019-03-09 16:00 UTC, hourly bars
+START_TIMESTAMP = 1552147200
+BAR_SECONDS = 3600
+
+
+def symbol_names(num_symbols):
+    """
+    Returns num_symbols deterministic ticker style names, e.g. 'S000'.
+    """
+    return ["S{:03d}".format(i) for i in range(num_symbols)]
+
+
+def gbm_prices(num_bars, num_symbols, seed=0, drift=0.0, volatility=0.01,
+               start_price=1.0):
+    """
+    Generates geometric Brownian motion close prices.
+
+    Inputs:
+    - num_bars:         (int) number of hourly bars
+    - num_symbols:      (int) number of assets
+    - seed:             (int) random seed, the same seed always gives
+                        the same prices
+    - drift:            (float) mean log return per bar
+    - volatility:       (float) standard deviation of log returns per
+                        bar
+    - start_price:      (float) price of every asset at the first bar
+
+    Outputs:
+    - df:               (pandas DataFrame) with a 'date' column and one
+                        float column of prices per symbol, in the
+                        layout of Data/mock_df.csv
+    """
+    if num_bars < 1 or num_symbols < 1:
+        raise ValueError("num_bars and num_symbols must be positive")
+
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(drift, volatility, (num_bars, num_symbols))
+    log_returns[0] = 0.0
+    prices = start_price*np.exp(np.cumsum(log_returns, axis=0))
+
+    df = pd.DataFrame(prices, columns=symbol_names(num_symbols))
+    df.insert(0, 'date', _dates(num_bars))
+    return df
+
+
+def cointegrated_pairs(num_bars, num_pairs, seed=0, volatility=0.01,
+                       noise=0.01, reversion=0.1):
+    """
+    Generates pairs of cointegrated prices with known hedge ratios.
+
+    The x asset of each pair follows a geometric Brownian motion and
+    its partner is y = hedge_ratio*x + s, where the spread s is a
+    stationary Ornstein-Uhlenbeck process.
+
+    Inputs:
+    - num_bars:         (int) number of hourly bars
+    - num_pairs:        (int) number of pairs
+    - seed:             (int) random seed
+    - volatility:       (float) volatility of the x log returns
+    - noise:            (float) volatility of the spread
+    - reversion:        (float) mean reversion speed of the spread per
+                        bar, between 0 and 1
+
+    Outputs:
+    - df:               (pandas DataFrame) 'date' column and columns
+                        'X000', 'Y000', 'X001', 'Y001', ...
+    - hedge_ratios:     (dict) hedge ratio of each (x, y) symbol pair
+    """
+    if num_bars < 1 or num_pairs < 1:
+        raise ValueError("num_bars and num_pairs must be positive")
+    if not 0 < reversion <= 1:
+        raise ValueError("reversion must be in (0, 1]")
+
+    rng = np.random.default_rng(seed)
+    x = gbm_prices(num_bars, num_pairs, seed=seed, volatility=volatility,
+                   start_price=10.0).iloc[:, 1:].to_numpy()
+    ratios = rng.uniform(0.5, 2.0, num_pairs)
+
+    # AR(1) spread s_t = (1 - reversion)*s_{t-1} + shock_t
+    shocks = rng.normal(0.0, noise, (num_bars, num_pairs))
+    spread = lfilter([1.0], [1.0, reversion - 1.0], shocks, axis=0)
+    y = ratios*x + spread
+
+    data = {'date': _dates(num_bars)}
+    hedge_ratios = {}
+    for k in range(num_pairs):
+        xsym, ysym = "X{:03d}".format(k), "Y{:03d}".format(k)
+        data[xsym], data[ysym] = x[:, k], y[:, k]
+        hedge_ratios[(xsym, ysym)] = ratios[k]
+    return pd.DataFrame(data), hedge_ratios
+
+
+def raw_json(num_bars, num_symbols, seed=0, gap_fraction=0.05):
+    """
+    Generates raw OHLCV data in the CryptoCompare shape stored by
+    webLoading and read by fileLoadingRaw, with bars randomly missing.
+
+    Inputs:
+    - num_bars:         (int) number of hourly bars
+    - num_symbols:      (int) number of assets
+    - seed:             (int) random seed
+    - gap_fraction:     (float) fraction of bars of each symbol that are
+                        missing. The first and last bar are always kept.
+
+    Outputs:
+    - raw:              (dict) {symbol: [{"time": ..., "close": ...,
+                        "high": ..., "low": ..., "open": ...,
+                        "volumefrom": ..., "volumeto": ...}, ...]}
+    """
+    if not 0 <= gap_fraction < 1:
+        raise ValueError("gap_fraction must be in [0, 1)")
+
+    closes = gbm_prices(num_bars, num_symbols, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    times = START_TIMESTAMP + BAR_SECONDS*np.arange(num_bars)
+
+    raw = {}
+    for symbol in symbol_names(num_symbols):
+        close = closes[symbol].to_numpy()
+        opens = np.concatenate([close[:1], close[:-1]])
+        spread = np.abs(rng.normal(0.0, 0.005, num_bars))
+        high = np.maximum(opens, close)*(1 + spread)
+        low = np.minimum(opens, close)*(1 - spread)
+        volume = rng.lognormal(5.0, 1.0, num_bars)
+
+        keep = rng.random(num_bars) >= gap_fraction
+        keep[0] = keep[-1] = True
+        raw[symbol] = [{"time": int(times[i]),
+                        "close": round(float(close[i]), 8),
+                        "high": round(float(high[i]), 8),
+                        "low": round(float(low[i]), 8),
+                        "open": round(float(opens[i]), 8),
+                        "volumefrom": round(float(volume[i]), 2),
+                        "volumeto": round(float(volume[i]*close[i]), 2)}
+                       for i in np.flatnonzero(keep)]
+    return raw
+
+
+def write_raw_json(path, num_bars, num_symbols, seed=0, gap_fraction=0.05):
+    """
+    Writes raw_json(...) to path and returns the symbols written.
+    """
+    raw = raw_json(num_bars, num_symbols, seed=seed,
+                   gap_fraction=gap_fraction)
+    with open(path, 'w') as outfile:
+        json.dump(raw, outfile)
+    return list(raw.keys())
+
+
+def _dates(num_bars):
+    """
+    Hourly date strings of the synthetic bars.
+    """
+    return pd.date_range(pd.Timestamp(START_TIMESTAMP, unit='s'),
+                         periods=num_bars, freq='h').astype(str)
@@ -1,3 +1,5 @@
+from ..instrumentation import memory
+
 
 class dataLoader():
     """
@@ -10,4 +12,6 @@ class dataLoader():
         self._strategy = strategy
 
     def get_data(self):
-        return self._strategy.get_data()
+        name = 'load.' + type(self._strategy).__name__
+        with memory.measure(name):
+            return self._strategy.get_data()
@@ -2,8 +2,6 @@ import json
 import numpy as np
 from datetime import datetime
 import pandas as pd
-from matplotlib import pyplot as plt
-from pandas.plotting import register_matplotlib_converters
 
 from .abstract_data_loading_strategy import dataLoadingStrat
 
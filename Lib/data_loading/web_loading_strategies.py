@@ -1,4 +1,3 @@
-import requests
 import json
 from datetime import datetime, timedelta
 import math
@@ -6,6 +5,29 @@ import pandas as pd
 
 from .abstract_data_loading_strategy import dataLoadingStrat
 
+API_URL = "https://min-api.cryptocompare.com"
+
+
+def construct_url(ticksize, symbol, limit, api_key, timestamp='none',
+                  base_url=API_URL):
+    """
+    Constructs URL compatible with cryptocompare API software
+
+    Inputs:
+    - ticksize:         (str) "day", "hour" or "minute"
+    - symbol:           (str) Desired ticker symbol, e.g. "BTC"
+    - limit:            (int) Number of ticks to request
+    - api_key:          (str) cryptocompare api key
+    - timestamp:        (int) Timestamp of the latest date of dataset
+    - base_url:         (str) address of the API
+    """
+    if timestamp == 'none':
+        url = ("{}/data/histo{}?fsym={}&tsym=BTC&limit={}&api_key={}".format(base_url, ticksize, symbol, limit, api_key))
+
+    else:
+        url = ("{}/data/histo{}?fsym={}&tsym=BTC&limit={}&toTs={}&api_key={}".format(base_url, ticksize, symbol, limit, timestamp, api_key))
+    return url
+
 
 class webLoading(dataLoadingStrat):
     """
@@ -73,12 +95,8 @@ class webLoading(dataLoadingStrat):
         - limit:            (int) Number of ticks to request
         - timestamp:        (int) Timestamp of the latest date of dataset
         """
-        if timestamp == 'none':
-            url = ("https://min-api.cryptocompare.com/data/histo{}?fsym={}&tsym=BTC&limit={}&api_key={}".format(self._ticksize, symbol, limit, self._key))
-
-        else:
-            url = ("https://min-api.cryptocompare.com/data/histo{}?fsym={}&tsym=BTC&limit={}&toTs={}&api_key={}".format(self._ticksize, symbol, limit, timestamp, self._key))
-        return url
+        return construct_url(self._ticksize, symbol, limit, self._key,
+                             timestamp)
 
     def _pull_data(self, symbol, limit, timestamp='none'):
         """
@@ -96,6 +114,7 @@ class webLoading(dataLoadingStrat):
                             given data
         '''
         """
+        import requests
 
         if timestamp == 'none':
             address = self._construct_url(symbol, limit)
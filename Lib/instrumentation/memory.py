@@ -0,0 +1,289 @@
+"""
+Opt-in memory accounting of loaders, strategies and sweeps.
+
+Loaders (dataLoader.get_data) and the construction of every
+crossoverTrader, zScoreTrader and pairsTrader, in a sweep or not, are
+wrapped in measure(name). While accounting is disabled measure()
+returns a shared no-op context manager. Calling enable() installs a
+memoryTracker in the process which uses tracemalloc to record the bytes
+each measured block allocated and still holds, and the peak it reached.
+parameterSweep workers ship their tracker state and peak RSS back with
+each result.
+
+Example usage:
+```
+tracker = memory.enable()
+df = dataLoader(fileLoadingDF("prices.csv")).get_data()
+parameterSweep(df, workers=4).run(jobs)
+memory.disable()
+print(tracker.summary())
+print(tracker.workers)  # peak RSS of each worker process
+```
+"""
+
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+
+# Tracker of the current process, None while disabled
+_tracker = None
+# Whether enable() started tracemalloc, so disable() should stop it
+_started_tracing = False
+
+
+class _nullMeasure():
+    """
+    No-op context manager returned by measure() while disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_MEASURE = _nullMeasure()
+
+
+class _measure():
+    """
+    Context manager measuring the allocations of one block into a
+    tracker.
+    """
+
+    def __init__(self, tracker, name):
+        self._tracker = tracker
+        self._name = name
+
+    def __enter__(self):
+        current, peak = tracemalloc.get_traced_memory()
+        stack = self._tracker._peaks
+        if stack:
+            stack[-1] = max(stack[-1], peak)
+        tracemalloc.reset_peak()
+        stack.append(current)
+        self._start = current
+        if self._tracker.snapshots:
+            self._snapshot = tracemalloc.take_snapshot()
+        return self
+
+    def __exit__(self, *exc):
+        current, peak = tracemalloc.get_traced_memory()
+        stack = self._tracker._peaks
+        peak = max(stack.pop(), peak)
+        if stack:
+            # enclosing blocks see this block's peak
+            stack[-1] = max(stack[-1], peak)
+        top = None
+        if self._tracker.snapshots:
+            top = [str(stat) for stat in tracemalloc.take_snapshot()
+                   .compare_to(self._snapshot, 'lineno')[:10]]
+        self._tracker.record(self._name, current - self._start,
+                             peak - self._start, top)
+        return False
+
+
+class memoryTracker():
+    """
+    Accumulates memory measurements of named blocks.
+
+    Initialisation:
+    - snapshots:        (bool) also keep the ten source lines that
+                        allocated most in each block, from tracemalloc
+                        snapshots. Much slower.
+
+    Members:
+    - self.stats:       (dict) block name: [calls, held bytes, peak
+                        bytes]. Held bytes are still allocated when the
+                        block ends (summed over calls), peak bytes are
+                        the largest increase during a call.
+    - self.top:         (dict) block name: top allocating lines of its
+                        last call, if snapshots
+    - self.workers:     (dict) pid: peak RSS in bytes of each sweep
+                        worker process that shipped its state
+    """
+
+    def __init__(self, snapshots=False):
+        self.snapshots = snapshots
+        self._peaks = []  # running peaks of the open blocks
+        self.stats = {}
+        self.top = {}
+        self.workers = {}
+
+    def record(self, name, held, peak, top=None):
+        """
+        Records one call of block name.
+        """
+        stat = self.stats.get(name)
+        if stat is None:
+            self.stats[name] = [1, held, peak]
+        else:
+            stat[0] += 1
+            stat[1] += held
+            stat[2] = max(stat[2], peak)
+        if top is not None:
+            self.top[name] = top
+
+    def getState(self):
+        """
+        Returns the measurements and the process's peak RSS as plain
+        picklable data.
+        """
+        return {'stats': {k: list(v) for k, v in self.stats.items()},
+                'top': dict(self.top),
+                'workers': dict(self.workers),
+                'pid': os.getpid(), 'peak_rss': peak_rss()}
+
+    def merge(self, state):
+        """
+        Adds the measurements of another tracker's getState(), and
+        records the peak RSS of the process it came from.
+        """
+        for name, (calls, held, peak) in state['stats'].items():
+            stat = self.stats.get(name)
+            if stat is None:
+                self.stats[name] = [calls, held, peak]
+            else:
+                stat[0] += calls
+                stat[1] += held
+                stat[2] = max(stat[2], peak)
+        self.top.update(state['top'])
+        self.workers.update(state['workers'])
+        pid, rss = state['pid'], state['peak_rss']
+        if rss is not None and pid != os.getpid():
+            self.workers[pid] = max(self.workers.get(pid, 0), rss)
+
+    def reset(self):
+        """
+        Clears all measurements.
+        """
+        self.stats = {}
+        self.top = {}
+        self.workers = {}
+
+    def summary(self):
+        """
+        Returns a table of the measured blocks.
+
+        Outputs:
+        - summary:          (pandas DataFrame) indexed by block with
+                            columns calls, held and peak (bytes), sorted
+                            by peak
+        """
+        rows = [[name] + stat for name, stat in self.stats.items()]
+        summary = pd.DataFrame(rows, columns=['block', 'calls', 'held',
+                                              'peak'])
+        return (summary.sort_values('peak', ascending=False)
+                .set_index('block'))
+
+
+def measure(name):
+    """
+    Returns a context manager measuring the allocations of block name,
+    a no-op while accounting is disabled.
+    """
+    if _tracker is None:
+        return _NULL_MEASURE
+    return _measure(_tracker, name)
+
+
+def enable(snapshots=False):
+    """
+    Enables accounting in this process, starting tracemalloc if needed,
+    and returns the tracker. If already enabled the existing tracker is
+    returned.
+    """
+    global _tracker, _started_tracing
+    if _tracker is None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracker = memoryTracker(snapshots=snapshots)
+    return _tracker
+
+
+def disable():
+    """
+    Disables accounting, stops tracemalloc if enable() started it and
+    returns the tracker that was active, if any.
+    """
+    global _tracker, _started_tracing
+    tracker, _tracker = _tracker, None
+    if _started_tracing and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _started_tracing = False
+    return tracker
+
+
+def get_tracker():
+    """
+    Returns the active tracker, None while disabled.
+    """
+    return _tracker
+
+
+def drain():
+    """
+    Returns the state of the active tracker and resets it. Used by
+    worker processes to ship their measurements with each result.
+    """
+    if _tracker is None:
+        return None
+    state = _tracker.getState()
+    _tracker.reset()
+    return state
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes, None
+    where the resource module is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss*1024
+
+
+def current_rss():
+    """
+    Returns the current resident set size of this process in bytes,
+    None where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages*os.sysconf('SC_PAGE_SIZE')
+
+
+def strategy_memory(strategy):
+    """
+    Returns the bytes held by each indicator and each df column of a
+    strategy.
+
+    Inputs:
+    - strategy:         (movingAverageTrader or pairsTrader)
+
+    Outputs:
+    - memory:           (pandas DataFrame) columns kind ('indicator' or
+                        'column'), name and bytes
+    """
+    rows = []
+    for attr in ('fastMA', 'slowMA', 'zscore'):
+        indicator = getattr(strategy, attr, None)
+        if indicator is not None:
+            rows.append(['indicator', indicator.name,
+                         int(indicator.values.memory_usage(deep=True))])
+    usage = strategy.df.memory_usage(deep=True)
+    rows.extend(['column', str(name), int(nbytes)]
+                for name, nbytes in usage.items())
+    return pd.DataFrame(rows, columns=['kind', 'name', 'bytes'])
+
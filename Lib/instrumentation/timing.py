@@ -0,0 +1,229 @@
+"""
+Opt-in per-phase timing of backtests.
+
+Strategies and the backtest context wrap their phases (indicator
+construction, the bar loop, Position bookkeeping, DataFrame writes,
+plotting, ...) in phase(name). While instrumentation is disabled
+phase() returns a shared no-op context manager, so an instrumented call
+site costs a function call and an attribute lookup. Calling enable()
+installs a phaseRecorder in the process which records the wall time and
+call count of every phase, and optionally a trace event per call.
+
+Example usage:
+```
+recorder = timing.enable(trace=True)
+backtest(strategy).trade()
+timing.disable()
+print(recorder.summary())
+recorder.exportChromeTrace("trace.json")
+```
+"""
+
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# Recorder of the current process, None while disabled
+_recorder = None
+
+
+class _nullPhase():
+    """
+    No-op context manager returned by phase() while disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _nullPhase()
+
+
+class _phase():
+    """
+    Context manager timing one call of a phase into a recorder.
+    """
+
+    def __init__(self, recorder, name, bars):
+        self._recorder = recorder
+        self._name = name
+        self._bars = bars
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._recorder.record(self._name, self._start, time.perf_counter(),
+                              self._bars)
+        return False
+
+
+class phaseRecorder():
+    """
+    Accumulates wall time and call counts of named phases.
+
+    Initialisation:
+    - trace:            (bool) also keep one event per phase call, for
+                        exportChromeTrace
+
+    Members:
+    - self.stats:       (dict) phase name: [calls, total seconds,
+                        max seconds, bars]
+    - self.events:      (list) (name, pid, tid, start, duration) of each
+                        phase call if tracing, times in seconds
+
+    Notes:
+    - Phases nest, e.g. 'position' calls happen inside 'bar_loop', so
+    the total of a phase includes the phases nested in it.
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.stats = {}
+        self.events = []
+
+    def record(self, name, start, end, bars=0):
+        """
+        Records one call of phase name from start to end (perf_counter
+        seconds) covering bars bars of a bar loop.
+        """
+        duration = end - start
+        stat = self.stats.get(name)
+        if stat is None:
+            self.stats[name] = [1, duration, duration, bars]
+        else:
+            stat[0] += 1
+            stat[1] += duration
+            stat[2] = max(stat[2], duration)
+            stat[3] += bars
+        if self.trace:
+            self.events.append((name, os.getpid(), threading.get_ident(),
+                                start, duration))
+
+    def getState(self):
+        """
+        Returns the recorded stats and events as plain picklable data,
+        e.g. to send them from a worker process to the parent.
+        """
+        return {'stats': {k: list(v) for k, v in self.stats.items()},
+                'events': list(self.events)}
+
+    def merge(self, state):
+        """
+        Adds the stats and events of another recorder's getState().
+        """
+        for name, (calls, total, longest, bars) in state['stats'].items():
+            stat = self.stats.get(name)
+            if stat is None:
+                self.stats[name] = [calls, total, longest, bars]
+            else:
+                stat[0] += calls
+                stat[1] += total
+                stat[2] = max(stat[2], longest)
+                stat[3] += bars
+        if self.trace:
+            self.events.extend(state['events'])
+
+    def reset(self):
+        """
+        Clears all recorded stats and events.
+        """
+        self.stats = {}
+        self.events = []
+
+    def summary(self):
+        """
+        Returns a table of the recorded phases.
+
+        Outputs:
+        - summary:          (pandas DataFrame) indexed by phase with
+                            columns calls, total, mean and max (seconds),
+                            bars and per_bar (seconds per bar of the bar
+                            loop phases), sorted by total time
+        """
+        rows = []
+        for name, (calls, total, longest, bars) in self.stats.items():
+            per_bar = total/bars if bars > 0 else float('nan')
+            rows.append([name, calls, total, total/calls, longest, bars,
+                         per_bar])
+        summary = pd.DataFrame(rows, columns=['phase', 'calls', 'total',
+                                              'mean', 'max', 'bars',
+                                              'per_bar'])
+        return (summary.sort_values('total', ascending=False)
+                .set_index('phase'))
+
+    def exportChromeTrace(self, path):
+        """
+        Writes the recorded events as Chrome trace event JSON, which
+        can be opened with chrome://tracing or Perfetto.
+        """
+        if not self.trace:
+            raise RuntimeError("Recorder was not enabled with trace=True")
+        events = [{'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                   'ts': start*1e6, 'dur': duration*1e6}
+                  for name, pid, tid, start, duration in self.events]
+        with open(path, 'w') as outfile:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                      outfile)
+
+
+def phase(name, bars=0):
+    """
+    Returns a context manager timing phase name, a no-op while
+    instrumentation is disabled.
+
+    Inputs:
+    - name:             (str) name of the phase
+    - bars:             (int) number of bars iterated by the phase, used
+                        for the per bar cost of bar loops
+    """
+    if _recorder is None:
+        return _NULL_PHASE
+    return _phase(_recorder, name, bars)
+
+
+def enable(trace=False):
+    """
+    Enables instrumentation in this process and returns the recorder.
+    If already enabled the existing recorder is returned.
+    """
+    global _recorder
+    if _recorder is None:
+        _recorder = phaseRecorder(trace=trace)
+    return _recorder
+
+
+def disable():
+    """
+    Disables instrumentation in this process and returns the recorder
+    that was active, if any.
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def get_recorder():
+    """
+    Returns the active recorder, None while disabled.
+    """
+    return _recorder
+
+
+def drain():
+    """
+    Returns the state of the active recorder and resets it. Used by
+    worker processes to ship their timings with each result.
+    """
+    if _recorder is None:
+        return None
+    state = _recorder.getState()
+    _recorder.reset()
+    return state
@@ -0,0 +1,160 @@
+"""
+Pair candidates of a large universe for the cointegration screen.
+
+Testing every pair of N assets is O(N^2). Cointegrated prices move
+together, so their normalised price histories are close. Each asset's
+normalised history is embedded in a few dimensions and only assets that
+are close in the embedding are proposed for testing, either
+- 'neighbours': every asset with its k nearest neighbours, or
+- 'clusters': every pair within clusters of at most a given size,
+found by repeatedly splitting the assets along their principal
+direction.
+Either way the number of candidates grows linearly with N.
+
+Example usage:
+```
+rows, cols = candidate_pairs(prices, 'neighbours', 5)
+```
+"""
+
+import numpy as np
+
+# Dimensions of the price embedding
+_EMBED_DIMS = 16
+
+
+def candidate_pairs(prices, method, size, dims=_EMBED_DIMS, seed=0):
+    """
+    Proposes the pairs of assets worth testing for cointegration.
+
+    Inputs:
+    - prices:           (np array) (time x assets) prices
+    - method:           (str) 'neighbours' or 'clusters'
+    - size:             (int) neighbours per asset, or the largest
+                        cluster
+    - dims:             (int) dimensions of the embedding
+    - seed:             (int) random seed of the embedding
+
+    Outputs:
+    - rows, cols:       (np array, int) asset indices of each candidate
+                        pair, with rows > cols, sorted and unique
+    """
+    if not isinstance(size, (int, np.integer)) or size < 1:
+        raise ValueError("size must be a positive int")
+    embedding = embed_prices(prices, dims=dims, seed=seed)
+
+    if method == 'neighbours':
+        rows, cols = nearest_neighbour_pairs(embedding, size)
+    elif method == 'clusters':
+        rows, cols = cluster_pairs(embedding, size)
+    else:
+        raise ValueError("method must be 'neighbours' or 'clusters'")
+
+    num_assets = embedding.shape[0]
+    keys = np.unique(np.maximum(rows, cols)*num_assets
+                     + np.minimum(rows, cols))
+    rows, cols = keys // num_assets, keys % num_assets
+    distinct = rows != cols
+    return rows[distinct], cols[distinct]
+
+
+def embed_prices(prices, dims=_EMBED_DIMS, seed=0):
+    """
+    Embeds each asset's normalised price history in a few dimensions.
+
+    Prices are normalised to zero mean and unit norm over time, so the
+    squared distance between two assets is 2(1 - correlation) of their
+    prices. The histories are then projected on their leading principal
+    directions, found with a randomised SVD in O(assets x time x dims).
+
+    Inputs:
+    - prices:           (np array) (time x assets) prices
+    - dims:             (int) dimensions of the embedding
+    - seed:             (int) random seed of the randomised SVD
+
+    Outputs:
+    - embedding:        (np array) (assets x dims) coordinates
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 2 or prices.shape[0] < 2:
+        raise ValueError("prices must be (time x assets) with 2+ bars")
+    if not isinstance(dims, (int, np.integer)) or dims < 1:
+        raise ValueError("dims must be a positive int")
+
+    centred = prices - prices.mean(axis=0)
+    norms = np.sqrt((centred**2).sum(axis=0))
+    normalised = np.divide(centred, norms, out=np.zeros_like(centred),
+                           where=norms > 0).T
+
+    # randomised range finder with oversampling and power iterations
+    rank = min(dims + 10, *normalised.shape)
+    rng = np.random.default_rng(seed)
+    sketch = normalised @ rng.normal(size=(normalised.shape[1], rank))
+    for _ in range(2):
+        sketch, _ = np.linalg.qr(sketch)
+        sketch = normalised @ (normalised.T @ sketch)
+    basis, _ = np.linalg.qr(sketch)
+    u, s, _ = np.linalg.svd(basis.T @ normalised, full_matrices=False)
+
+    dims = min(dims, rank)
+    return (basis @ u[:, :dims])*s[:dims]
+
+
+def nearest_neighbour_pairs(embedding, k):
+    """
+    Returns every asset paired with its k nearest neighbours in the
+    embedding, found with a k-d tree.
+
+    Inputs:
+    - embedding:        (np array) (assets x dims) coordinates
+    - k:                (int) neighbours per asset
+
+    Outputs:
+    - rows, cols:       (np array, int) asset indices of each pair, in
+                        either order and possibly repeated
+    """
+    from scipy.spatial import cKDTree
+
+    num_assets = embedding.shape[0]
+    k = min(k, num_assets - 1)
+    if k < 1:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    _, neighbours = cKDTree(embedding).query(embedding, k=k + 1)
+    rows = np.repeat(np.arange(num_assets), k + 1)
+    return rows, neighbours.ravel()
+
+
+def cluster_pairs(embedding, max_size):
+    """
+    Returns every pair within clusters of at most max_size assets. The
+    assets are split at the median of their principal direction until
+    every cluster is small enough.
+
+    Inputs:
+    - embedding:        (np array) (assets x dims) coordinates
+    - max_size:         (int) largest cluster
+
+    Outputs:
+    - rows, cols:       (np array, int) asset indices of each pair,
+                        rows > cols
+    """
+    clusters, pending = [], [np.arange(embedding.shape[0])]
+    while len(pending) > 0:
+        members = pending.pop()
+        if len(members) <= max(max_size, 1):
+            clusters.append(members)
+            continue
+        points = embedding[members] - embedding[members].mean(axis=0)
+        direction = np.linalg.svd(points, full_matrices=False)[2][0]
+        order = np.argsort(points @ direction, kind='stable')
+        half = len(members)//2
+        pending.extend([members[order[:half]], members[order[half:]]])
+
+    rows, cols = [], []
+    for members in clusters:
+        i, j = np.tril_indices(len(members), k=-1)
+        members = np.sort(members)
+        rows.append(members[i])
+        cols.append(members[j])
+    return np.concatenate(rows), np.concatenate(cols)
@@ -0,0 +1,303 @@
+import os.path
+import multiprocessing as mp
+import numpy as np
+
+from ..sweeps.shared_price_matrix import sharedPriceMatrix
+from ..sweeps.results_store import data_fingerprint
+from .engle_granger import batch_coint
+from .candidates import candidate_pairs
+from ..reporting.plotting import show_or_save
+
+# Price view attached once per worker process by _init_worker
+_worker_prices = None
+
+# prefilter_threshold of each prefilter when not given
+_PREFILTER_DEFAULTS = {'correlation': 0.5, 'distance': 0.5, 'neighbours': 5,
+                       'clusters': 20}
+
+
+def get_coint_pairs(df, threshold=0.05, plot=False, workers=1,
+                    cache_dir=None, window=None, prefilter=None,
+                    prefilter_threshold=None, method='statsmodels',
+                    lag=None):
+    """
+    Determines cointegrated pairs of 2 or more assets for a given
+    theshold.
+
+    Each pair is tested with statsmodels' Engle-Granger coint test. The
+    tests can be spread over a pool of worker processes, which read the
+    prices from shared memory, and the resulting p value matrix can be
+    cached on disk keyed by the data fingerprint and window, so a
+    repeated screen only tests pairs it has not seen before.
+
+    With method='batch' the tests use a fixed ADF lag and are solved for
+    many pairs at once in array operations (see batch_coint) instead of
+    one statsmodels call per pair, which is much faster on large
+    universes. Its p values agree with coint(..., maxlag=lag,
+    autolag=None) rather than with the default automatic lag selection.
+
+    Inputs:
+    - df:                   (pandas Dataframe) dataframe storing asset
+                            price history. Non numeric columns are
+                            ignored.
+    - threshold:            (float) cointegration threshold
+    - plot:                 (bool) plot the p value matrix
+    - workers:              (int) number of worker processes
+    - cache_dir:            (str) optional directory of the p value
+                            cache
+    - window:               (tuple, int) optional (start, end) bars of
+                            the history to test over
+    - prefilter:            (str) optional cheap prefilter skipping
+                            pairs that have little chance of being
+                            cointegrated:
+                            'correlation' skips pairs whose price
+                            correlation is below prefilter_threshold,
+                            'distance' only keeps the prefilter_threshold
+                            fraction of pairs with the smallest distance
+                            between their normalised prices,
+                            'neighbours' keeps each asset's
+                            prefilter_threshold nearest neighbours and
+                            'clusters' the pairs within clusters of at
+                            most prefilter_threshold assets, in an
+                            embedding of the normalised prices (see
+                            candidates.py). The last two test O(N)
+                            pairs of N assets.
+    - prefilter_threshold:  (float) see prefilter, defaults to 0.5, or
+                            5 neighbours or clusters of 20
+    - method:               (str) 'statsmodels' or 'batch'
+    - lag:                  (int) fixed ADF lag of the batch method.
+                            Defaults to statsmodels' maximum lag.
+
+    Outputs:
+    - p_values:     (2D array, floats) storing pvalues between pairs.
+                    Pairs skipped by the prefilter have a p value of 1.
+    - pairs:        (list) of cointegrated pairs w/ their coint factor.
+    """
+
+    symbols = [key for key in df.keys() if df[key].dtype.kind in 'biuf']
+    num_assets = len(symbols)
+    if num_assets < 2:
+        raise ValueError("Need at least 2 assets to find pairs")
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError("workers must be a positive int")
+    if method not in ('statsmodels', 'batch'):
+        raise ValueError("method must be 'statsmodels' or 'batch'")
+
+    if window is None:
+        window = (0, df.shape[0])
+    prices = df[symbols].iloc[window[0]:window[1]]
+
+    # Tests of pairs (i, j) with i > j, NaN where not yet computed
+    # -------------------------------------------------------------------------
+    cache_file = None
+    p_values = np.full((num_assets, num_assets), np.nan)
+    if cache_dir is not None:
+        name = "coint_{}_{}_{}.npz".format(data_fingerprint(df[symbols]),
+                                           window[0], window[1])
+        if method == 'batch':
+            name = "batch{}_{}".format('' if lag is None else lag, name)
+        cache_file = os.path.join(cache_dir, name)
+        if os.path.exists(cache_file):
+            p_values = np.load(cache_file)['p_values']
+
+    rows, cols = np.tril_indices(num_assets, k=-1)
+    keep = _prefilter(prices.to_numpy(dtype=np.float64), rows, cols,
+                      prefilter, prefilter_threshold)
+    todo = keep & np.isnan(p_values[rows, cols])
+    tasks = list(zip(rows[todo].tolist(), cols[todo].tolist()))
+
+    if len(tasks) > 0 and method == 'batch':
+        _, pvals = batch_coint(prices.to_numpy(dtype=np.float64).T,
+                               rows[todo], cols[todo], lag=lag)
+    elif len(tasks) > 0:
+        with sharedPriceMatrix(prices) as shared:
+            if workers == 1:
+                _init_worker(shared.spec)
+                try:
+                    pvals = [_coint_pvalue(task) for task in tasks]
+                finally:
+                    _close_worker()
+            else:
+                chunksize = max(1, len(tasks) // (4*workers))
+                ctx = mp.get_context()
+                with ctx.Pool(workers, initializer=_init_worker,
+                              initargs=(shared.spec,)) as pool:
+                    pvals = pool.map(_coint_pvalue, tasks,
+                                     chunksize=chunksize)
+
+    if len(tasks) > 0:
+        p_values[rows[todo], cols[todo]] = pvals
+        if cache_file is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez(cache_file, p_values=p_values,
+                     symbols=np.array(symbols))
+    # -------------------------------------------------------------------------
+
+    p_values = np.where(np.isnan(p_values), 1.0, p_values)
+    p_values[~np.tri(num_assets, k=-1, dtype=bool)] = 1.0
+    p_values[rows[~keep], cols[~keep]] = 1.0
+    pairs = []
+    for j in range(num_assets):
+        for i in range(j+1, num_assets):
+            pval = p_values[i, j]
+            if pval < threshold:
+                asset1, asset2 = symbols[i], symbols[j]
+                pairs.append([asset1, asset2, pval])
+                print("{} and {} are cointegrated with p value: {}\n"
+                      .format(asset1, asset2, pval))
+
+    if(plot):
+        from matplotlib import pyplot as plt
+        mask = np.triu(p_values)
+        p_values = np.ma.array(p_values, mask=mask)
+        plt.imshow(p_values, cmap='Spectral')
+        plt.colorbar()
+        plt.xticks(np.arange(num_assets), symbols, rotation=90)
+        plt.yticks(np.arange(num_assets), symbols)
+        plt.title("co-integration factor between top {} assets"
+                  .format(num_assets))
+        show_or_save()
+
+    return p_values, pairs
+
+
+def coint_candidates(df, window=None, prefilter=None,
+                     prefilter_threshold=None):
+    """
+    Returns the pairs get_coint_pairs would test with a prefilter,
+    without testing them.
+
+    Inputs:
+    - df:                   (pandas Dataframe) asset price history
+    - window:               (tuple, int) optional (start, end) bars
+    - prefilter:            (str) prefilter of get_coint_pairs
+    - prefilter_threshold:  (float) see get_coint_pairs
+
+    Outputs:
+    - pairs:                (list) [asset1, asset2] of each pair, in the
+                            order get_coint_pairs reports them
+    """
+    symbols = [key for key in df.keys() if df[key].dtype.kind in 'biuf']
+    if len(symbols) < 2:
+        raise ValueError("Need at least 2 assets to find pairs")
+    if window is None:
+        window = (0, df.shape[0])
+    prices = df[symbols].iloc[window[0]:window[1]].to_numpy(dtype=np.float64)
+
+    rows, cols = np.tril_indices(len(symbols), k=-1)
+    keep = _prefilter(prices, rows, cols, prefilter, prefilter_threshold)
+    order = np.lexsort((rows, cols))
+    return [[symbols[rows[k]], symbols[cols[k]]]
+            for k in order if keep[k]]
+
+
+def prefilter_misses(df, prefilter, prefilter_threshold=None,
+                     threshold=0.05, window=None, lag=None):
+    """
+    Measures the cointegrated pairs a prefilter skips, against an
+    exhaustive screen of every pair with batch_coint.
+
+    Inputs:
+    - df:                   (pandas Dataframe) asset price history
+    - prefilter:            (str) prefilter of get_coint_pairs
+    - prefilter_threshold:  (float) see get_coint_pairs
+    - threshold:            (float) cointegration threshold
+    - window:               (tuple, int) optional (start, end) bars
+    - lag:                  (int) fixed ADF lag of batch_coint
+
+    Outputs:
+    - tests:                (int) pairs the prefilter keeps for testing
+    - missed:               (list) cointegrated pairs [asset1, asset2,
+                            pval] of the exhaustive screen that the
+                            prefilter skips
+    - pairs:                (list) cointegrated pairs of the exhaustive
+                            screen
+    """
+    symbols = [key for key in df.keys() if df[key].dtype.kind in 'biuf']
+    if len(symbols) < 2:
+        raise ValueError("Need at least 2 assets to find pairs")
+    if window is None:
+        window = (0, df.shape[0])
+    prices = df[symbols].iloc[window[0]:window[1]].to_numpy(dtype=np.float64)
+
+    rows, cols = np.tril_indices(len(symbols), k=-1)
+    keep = _prefilter(prices, rows, cols, prefilter, prefilter_threshold)
+    _, pvals = batch_coint(prices.T, rows, cols, lag=lag)
+
+    pairs, missed = [], []
+    for k in np.flatnonzero(pvals < threshold):
+        pair = [symbols[rows[k]], symbols[cols[k]], pvals[k]]
+        pairs.append(pair)
+        if not keep[k]:
+            missed.append(pair)
+    return int(keep.sum()), missed, pairs
+
+
+def _prefilter(prices, rows, cols, prefilter, threshold):
+    """
+    Returns a mask of the pairs (rows[k], cols[k]) worth testing.
+
+    Inputs:
+    - prices:           (np array) (time x assets) prices
+    - rows, cols:       (np array, int) asset indices of each pair
+    - prefilter:        (str) None, 'correlation', 'distance',
+                        'neighbours' or 'clusters'
+    - threshold:        (float) see get_coint_pairs
+    """
+    if prefilter is None:
+        return np.ones(rows.shape[0], dtype=bool)
+    if prefilter not in _PREFILTER_DEFAULTS:
+        raise ValueError("prefilter must be 'correlation', 'distance', "
+                         "'neighbours' or 'clusters'")
+    if threshold is None:
+        threshold = _PREFILTER_DEFAULTS[prefilter]
+
+    if prefilter == 'correlation':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.corrcoef(prices, rowvar=False)
+        return np.abs(np.nan_to_num(corr[rows, cols])) >= threshold
+    elif prefilter == 'distance':
+        if not 0 < threshold <= 1:
+            raise ValueError("distance prefilter keeps a fraction in (0, 1]")
+        normalised = prices/prices[0]
+        sq_norms = (normalised**2).sum(axis=0)
+        gram = normalised.T @ normalised
+        distance = sq_norms[rows] + sq_norms[cols] - 2*gram[rows, cols]
+        num_keep = int(np.ceil(threshold*rows.shape[0]))
+        keep = np.zeros(rows.shape[0], dtype=bool)
+        keep[np.argsort(distance, kind='stable')[:num_keep]] = True
+        return keep
+    else:
+        num_assets = prices.shape[1]
+        candidates = np.zeros((num_assets, num_assets), dtype=bool)
+        candidates[candidate_pairs(prices, prefilter, threshold)] = True
+        return candidates[rows, cols]
+
+
+def _init_worker(spec):
+    """
+    Attaches the worker process to the published prices.
+    """
+    global _worker_prices
+    _worker_prices = sharedPriceMatrix.attach(spec)
+
+
+def _close_worker():
+    """
+    Detaches the calling process from the published prices.
+    """
+    global _worker_prices
+    if _worker_prices is not None:
+        _worker_prices.close()
+    _worker_prices = None
+
+
+def _coint_pvalue(task):
+    """
+    Runs the coint test of asset i against asset j in a worker.
+    """
+    from statsmodels.tsa.stattools import coint
+
+    i, j = task
+    _, pval, _ = coint(_worker_prices.values[i], _worker_prices.values[j])
+    return pval
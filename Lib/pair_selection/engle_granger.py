@@ -0,0 +1,128 @@
+import numpy as np
+
+# Same colinearity cut off as statsmodels' coint
+_SQRTEPS = np.sqrt(np.finfo(np.double).eps)
+
+
+def batch_coint(prices, rows, cols, lag=None, memory_budget=256*2**20):
+    """
+    Engle-Granger cointegration test of many pairs at once.
+
+    Equivalent to statsmodels'
+    coint(prices[rows[k]], prices[cols[k]], maxlag=lag, autolag=None)
+    for every k, but the hedge regressions and the augmented
+    Dickey-Fuller regressions of the residuals are solved for a chunk
+    of pairs at a time with array operations.
+
+    Inputs:
+    - prices:           (np array) (assets x time) price matrix
+    - rows, cols:       (np array, int) assets of each pair. prices[rows]
+                        are regressed on prices[cols].
+    - lag:              (int) fixed number of lagged differences in the
+                        ADF regression. Defaults to the statsmodels
+                        default maximum lag, 12*(time/100)^(1/4).
+    - memory_budget:    (int) approximate bytes of temporaries allowed
+
+    Outputs:
+    - tstats:           (np array) ADF test statistic of each pair
+    - pvalues:          (np array) MacKinnon approximate p values
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    T = prices.shape[1]
+    max_lag = T//2 - 1
+    if lag is None:
+        lag = min(int(np.ceil(12.0*np.power(T/100.0, 1/4.0))), max_lag)
+    if not isinstance(lag, (int, np.integer)) or not 0 <= lag <= max_lag:
+        raise ValueError("lag must be an int between 0 and time/2 - 1")
+
+    nobs = T - 1 - lag
+    per_pair = 8*(nobs*(lag + 1)*2 + 4*T)
+    chunk = max(int(memory_budget // per_pair), 1)
+    tstats = np.empty(rows.shape[0])
+
+    for p0 in range(0, rows.shape[0], chunk):
+        p1 = min(p0 + chunk, rows.shape[0])
+        y0, y1 = prices[rows[p0:p1]], prices[cols[p0:p1]]
+        tstats[p0:p1] = _adf_tstats(_hedge_residuals(y0, y1), lag)
+
+    return tstats, coint_pvalues(tstats)
+
+
+def _hedge_residuals(y0, y1):
+    """
+    Residuals of the OLS regressions y0 = alpha + beta*y1 of each row.
+    Rows that are (almost) perfectly colinear give NaN residuals.
+    """
+    y0c = y0 - y0.mean(axis=1, keepdims=True)
+    y1c = y1 - y1.mean(axis=1, keepdims=True)
+    sxx = (y1c*y1c).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = (y0c*y1c).sum(axis=1)/sxx
+        resid = y0c - beta[:, None]*y1c
+        rsquared = 1.0 - (resid*resid).sum(axis=1)/(y0c*y0c).sum(axis=1)
+    resid[~(rsquared < 1 - 100*_SQRTEPS)] = np.nan
+    return resid
+
+
+def _adf_tstats(resid, lag):
+    """
+    t statistics of the level coefficient of the ADF regressions,
+    without constant, of each row of resid:
+    diff(e)_t = gamma*e_{t-1} + sum_i phi_i*diff(e)_{t-i} + u_t
+    Colinear (NaN) rows give -inf, as in statsmodels' coint.
+    """
+    colinear = np.isnan(resid[:, 0])
+    resid = np.where(colinear[:, None], 0.0, resid)
+    xdiff = np.diff(resid, axis=1)
+    num_pairs, num_diff = xdiff.shape
+    nobs = num_diff - lag
+
+    X = np.empty((num_pairs, nobs, lag + 1))
+    X[:, :, 0] = resid[:, lag:-1]
+    for i in range(1, lag + 1):
+        X[:, :, i] = xdiff[:, lag - i:num_diff - i]
+    y = xdiff[:, lag:]
+
+    XtX = np.einsum('pnk,pnl->pkl', X, X)
+    Xty = np.einsum('pnk,pn->pk', X, y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        XtX_inv = np.linalg.pinv(XtX)
+        params = np.einsum('pkl,pl->pk', XtX_inv, Xty)
+        fitted = np.einsum('pnk,pk->pn', X, params)
+        sigma2 = ((y - fitted)**2).sum(axis=1)/(nobs - lag - 1)
+        tstats = params[:, 0]/np.sqrt(sigma2*XtX_inv[:, 0, 0])
+    tstats[colinear] = -np.inf
+    return tstats
+
+
+def coint_pvalues(tstats, N=2):
+    """
+    Vectorised MacKinnon (1994) approximate p values of Engle-Granger
+    test statistics with a constant, the same approximation as
+    statsmodels' mackinnonp(tstat, regression='c', N=N).
+    """
+    from scipy.stats import norm
+    from statsmodels.tsa import adfvalues
+
+    tstats = np.asarray(tstats, dtype=np.float64)
+    try:
+        # MacKinnon (1994) tables behind statsmodels' mackinnonp
+        _tau_maxs, _tau_mins = adfvalues._tau_maxs, adfvalues._tau_mins
+        _tau_stars = adfvalues._tau_stars
+        _tau_smallps = adfvalues._tau_smallps
+        _tau_largeps = adfvalues._tau_largeps
+    except AttributeError:  # pragma: no cover
+        return np.array([adfvalues.mackinnonp(t, regression='c', N=N)
+                         for t in tstats])
+
+    # infinite statistics give nan polynomials, replaced by 0 or 1 below
+    with np.errstate(invalid='ignore'):
+        small = np.polynomial.polynomial.polyval(tstats,
+                                                 _tau_smallps['c'][N-1])
+        large = np.polynomial.polynomial.polyval(tstats,
+                                                 _tau_largeps['c'][N-1])
+    pvalues = norm.cdf(np.where(tstats <= _tau_stars['c'][N-1], small, large))
+    pvalues = np.where(tstats > _tau_maxs['c'][N-1], 1.0, pvalues)
+    pvalues = np.where(tstats < _tau_mins['c'][N-1], 0.0, pvalues)
+    return pvalues
@@ -0,0 +1,160 @@
+"""
+Batched performance metrics for the runs of a sweep.
+
+Returns follow the convention of the strategies: a (runs x time) matrix
+where entry [k, t] holds the return of any round trip trade of run k
+closed at bar t (i.e. the df['returns'] column of each run), and
+cumulative returns are its cumulative sum.
+
+A ledger is a tuple of equally long arrays (runs, opens, closes,
+returns) with one entry per round trip trade: the run it belongs to,
+the bars it was opened and closed at and its return.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Approximate bytes of temporaries held per (run, bar) of a chunk
+_BYTES_PER_CELL = 48
+
+
+def returns_metrics(returns, periods_per_year=None, memory_budget=256*2**20):
+    """
+    Computes return based statistics of every run in batched array
+    operations. Runs are processed in chunks to bound memory.
+
+    Inputs:
+    - returns:          (np array) (runs x time) returns matrix
+    - periods_per_year: (float) optional number of bars per year used
+                        to annualise the Sharpe and Sortino ratios,
+                        e.g. 8760 for hourly bars
+    - memory_budget:    (int) approximate bytes of temporaries allowed
+
+    Outputs:
+    - metrics:          (dict) arrays of length runs:
+                        cum_returns, sharpe, sortino, max_drawdown,
+                        max_drawdown_duration (bars), num_trades,
+                        hit_rate, average_trade
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    num_runs, T = returns.shape
+    scale = 1.0 if periods_per_year is None else np.sqrt(periods_per_year)
+    chunk = max(int(memory_budget // (_BYTES_PER_CELL*max(T, 1))), 1)
+
+    names = ['cum_returns', 'sharpe', 'sortino', 'max_drawdown',
+             'max_drawdown_duration', 'num_trades', 'hit_rate',
+             'average_trade']
+    metrics = {name: np.empty(num_runs) for name in names}
+
+    for r0 in range(0, num_runs, chunk):
+        r1 = min(r0 + chunk, num_runs)
+        rets = returns[r0:r1]
+
+        mean = rets.mean(axis=1)
+        std = rets.std(axis=1, ddof=1) if T > 1 else np.full(r1 - r0, np.nan)
+        downside = np.sqrt((np.minimum(rets, 0.0)**2).mean(axis=1))
+
+        # drawdowns of the additive equity curve, starting from zero
+        equity = np.cumsum(rets, axis=1)
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+        drawdown = peak - equity
+        bars = np.arange(T)[None, :]
+        last_peak = np.where(drawdown == 0, bars, -1)
+        np.maximum.accumulate(last_peak, axis=1, out=last_peak)
+        duration = bars - last_peak
+        del peak, last_peak
+
+        trades = rets != 0
+        num_trades = trades.sum(axis=1)
+        wins = (rets > 0).sum(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics['cum_returns'][r0:r1] = equity[:, -1]
+            metrics['sharpe'][r0:r1] = scale*mean/std
+            metrics['sortino'][r0:r1] = scale*mean/downside
+            metrics['max_drawdown'][r0:r1] = drawdown.max(axis=1)
+            metrics['max_drawdown_duration'][r0:r1] = duration.max(axis=1)
+            metrics['num_trades'][r0:r1] = num_trades
+            metrics['hit_rate'][r0:r1] = wins/num_trades
+            metrics['average_trade'][r0:r1] = rets.sum(axis=1)/num_trades
+
+    return metrics
+
+
+def ledger_metrics(ledger, num_runs, num_bars):
+    """
+    Computes trade based statistics of every run from a ledger.
+
+    Inputs:
+    - ledger:           (tuple, np array) (runs, opens, closes, returns)
+    - num_runs:         (int) number of runs in the sweep
+    - num_bars:         (int) number of bars of each run
+
+    Outputs:
+    - metrics:          (dict) arrays of length num_runs:
+                        num_trades, hit_rate, average_trade,
+                        turnover (position changes per bar) and
+                        exposure (fraction of bars a position is open)
+    """
+    runs, opens, closes, returns = [np.asarray(item) for item in ledger]
+    runs = runs.astype(np.int64)
+
+    num_trades = np.bincount(runs, minlength=num_runs).astype(np.float64)
+    wins = np.bincount(runs, weights=returns > 0, minlength=num_runs)
+    total = np.bincount(runs, weights=returns, minlength=num_runs)
+    held = np.bincount(runs, weights=closes - opens, minlength=num_runs)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'num_trades': num_trades,
+                'hit_rate': wins/num_trades,
+                'average_trade': total/num_trades,
+                'turnover': 2*num_trades/num_bars,
+                'exposure': held/num_bars}
+
+
+def performance_metrics(returns, ledger=None, periods_per_year=None,
+                        memory_budget=256*2**20):
+    """
+    Computes all performance metrics of the runs of a sweep.
+
+    Inputs:
+    - returns:          (np array) (runs x time) returns matrix
+    - ledger:           (tuple, np array) optional ledger of the runs.
+                        Gives exact trade statistics, turnover and
+                        exposure. Without it trades are taken to be the
+                        non zero returns and turnover and exposure are
+                        not available.
+    - periods_per_year: (float) see returns_metrics
+    - memory_budget:    (int) see returns_metrics
+
+    Outputs:
+    - metrics:          (pandas DataFrame) one row per run
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    metrics = returns_metrics(returns, periods_per_year=periods_per_year,
+                              memory_budget=memory_budget)
+    if ledger is not None:
+        metrics.update(ledger_metrics(ledger, *returns.shape))
+    else:
+        metrics['turnover'] = np.full(returns.shape[0], np.nan)
+        metrics['exposure'] = np.full(returns.shape[0], np.nan)
+    return pd.DataFrame(metrics)
+
+
+def strategies_ledger(strategies):
+    """
+    Builds the ledger of a list of traded strategies, one run per
+    strategy, from their opentimes, closetimes and df['returns'].
+    Positions still open at the end of a run are not included.
+    """
+    runs, opens, closes, returns = [], [], [], []
+    for k, strategy in enumerate(strategies):
+        num_closed = len(strategy.closetimes)
+        close_times = np.asarray(strategy.closetimes, dtype=np.int64)
+        runs.append(np.full(num_closed, k))
+        opens.append(np.asarray(strategy.opentimes[:num_closed],
+                                dtype=np.int64))
+        closes.append(close_times)
+        returns.append(strategy.df['returns'].to_numpy()[close_times])
+    return tuple(np.concatenate(item) if len(item) else np.array([])
+                 for item in (runs, opens, closes, returns))
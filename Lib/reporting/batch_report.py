@@ -0,0 +1,222 @@
+import html
+import multiprocessing as mp
+import os.path
+import pandas as pd
+
+from . import plotting
+from ..sweeps.shared_price_matrix import sharedPriceMatrix
+from ..sweeps.parameter_sweep import build_strategy, validate_job
+
+# Price view and (out_dir, dpi, figsize) set once per worker process by
+# _init_worker
+_worker_prices = None
+_worker_settings = None
+
+
+class batchReport():
+    """
+    Renders the charts of a sweep to files without a display.
+
+    Each job (see parameterSweep) is backtested again in a pool of
+    worker processes, which attach to the prices through a
+    sharedPriceMatrix, and its trade(plot=True) chart is saved with the
+    non-interactive Agg backend. Sweep heatmaps of the cumulative
+    returns over two parameters are rendered next, and an index.html
+    page links every chart together with a runs.csv table of the runs.
+
+    Initialisation:
+    - df:               (pandas DataFrame) containing asset price
+                        history. Non numeric columns are ignored.
+    - out_dir:          (str) directory the report is written to
+    - workers:          (int) number of rendering processes
+    - start_method:     (str) optional multiprocessing start method
+    - image_format:     (str) matplotlib file format, e.g. 'png', 'svg'
+    - dpi:              (int) resolution of raster images
+    - figsize:          (tuple) size of each run's figure in inches
+
+    Example usage:
+    ```
+    report = batchReport(df, "report", workers=8)
+    index = report.run(jobs, heatmaps=[('fast_MA', 'slow_MA')])
+    ```
+
+    Notes:
+    - The calling process is switched to the Agg backend too.
+    """
+
+    def __init__(self, df, out_dir, workers=1, start_method=None,
+                 image_format='png', dpi=100, figsize=(12, 8)):
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive int")
+
+        self.df = df
+        self.out_dir = out_dir
+        self.workers = workers
+        self.start_method = start_method
+        self.image_format = image_format
+        self.dpi = dpi
+        self.figsize = figsize
+
+    def run(self, jobs, heatmaps=None, title="Sweep report"):
+        """
+        Renders the charts of all jobs, the heatmaps and the index page.
+
+        Inputs:
+        - jobs:             (list) of (strategy, symbols, params) tuples
+        - heatmaps:         (list, tuple) optional (x, y) pairs of
+                            parameter names. For every strategy with
+                            both parameters a heatmap of its cumulative
+                            returns, averaged over the other parameters
+                            and the symbols, is rendered.
+        - title:            (str) title of the index page
+
+        Outputs:
+        - index:            (str) path of the index page
+        """
+        for job in jobs:
+            validate_job(job)
+        os.makedirs(self.out_dir, exist_ok=True)
+        plotting.use_headless_backend()
+
+        items = []
+        for n, (strategy, symbols, params) in enumerate(jobs):
+            name = "run_{:05d}_{}_{}.{}".format(n, strategy, "_".join(symbols),
+                                                self.image_format)
+            items.append(((strategy, symbols, params), name))
+
+        with sharedPriceMatrix(self.df) as prices:
+            if self.workers == 1 or len(items) <= 1:
+                _init_worker(prices.spec, self.out_dir, self.dpi,
+                             self.figsize)
+                try:
+                    outputs = [_render_job(item) for item in items]
+                finally:
+                    _close_worker()
+            else:
+                chunksize = max(1, len(items) // (4*self.workers))
+                ctx = mp.get_context(self.start_method)
+                initargs = (prices.spec, self.out_dir, self.dpi, self.figsize)
+                with ctx.Pool(self.workers, initializer=_init_worker,
+                              initargs=initargs) as pool:
+                    outputs = pool.map(_render_job, items,
+                                       chunksize=chunksize)
+
+        runs = self._runsTable(jobs, items, outputs)
+        runs.to_csv(os.path.join(self.out_dir, "runs.csv"), index=False)
+        figures = self._renderHeatmaps(runs, heatmaps or [])
+        return self._writeIndex(title, runs, figures)
+
+    def _runsTable(self, jobs, items, outputs):
+        """
+        Builds a table of the runs with their parameters and results.
+        """
+        rows = []
+        for (strategy, symbols, params), (_, name), (cum, trades) in zip(
+                jobs, items, outputs):
+            row = {'run': len(rows), 'strategy': strategy,
+                   'symbols': "/".join(symbols), 'cum_returns': cum,
+                   'num_trades': trades, 'chart': name}
+            row.update(params)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def _renderHeatmaps(self, runs, heatmaps):
+        """
+        Renders the requested heatmaps and returns their file names.
+        """
+        figures = []
+        for strategy, group in runs.groupby('strategy', sort=False):
+            # drop the parameters of the other strategies
+            group = group.dropna(axis=1, how='all')
+            for x, y in heatmaps:
+                if x not in group or y not in group:
+                    continue
+                table = group.pivot_table(values='cum_returns', index=y,
+                                          columns=x, aggfunc='mean')*100
+                name = "heatmap_{}_{}_{}.{}".format(strategy, y, x,
+                                                    self.image_format)
+                plotting.render_heatmap(
+                    table.to_numpy(), list(table.columns), list(table.index),
+                    "{} average returns".format(strategy),
+                    outfile=os.path.join(self.out_dir, name),
+                    xlabel=x, ylabel=y)
+                figures.append(name)
+        return figures
+
+    def _writeIndex(self, title, runs, figures):
+        """
+        Writes index.html linking the heatmaps and every run's chart.
+        """
+        columns = [c for c in runs.columns if c not in ('chart',)]
+        lines = ["<!DOCTYPE html>", "<html><head><meta charset='utf-8'>",
+                 "<title>{}</title>".format(html.escape(title)),
+                 "<style>table{border-collapse:collapse}"
+                 "td,th{border:1px solid #ccc;padding:2px 6px}</style>",
+                 "</head><body>",
+                 "<h1>{}</h1>".format(html.escape(title))]
+        for name in figures:
+            lines.append("<img src='{0}' alt='{0}'>".format(html.escape(name)))
+        lines.append("<h2>Runs</h2><p><a href='runs.csv'>runs.csv</a></p>")
+        lines.append("<table><tr>" + "".join(
+            "<th>{}</th>".format(html.escape(str(c))) for c in columns)
+            + "<th>chart</th></tr>")
+        for row in runs.itertuples(index=False):
+            row = row._asdict()
+            cells = "".join("<td>{}</td>".format(html.escape(_cell(row[c])))
+                            for c in columns)
+            chart = html.escape(row['chart'])
+            lines.append("<tr>{}<td><a href='{}'>chart</a></td></tr>"
+                         .format(cells, chart))
+        lines.append("</table></body></html>")
+
+        index = os.path.join(self.out_dir, "index.html")
+        with open(index, 'w') as outfile:
+            outfile.write("\n".join(lines))
+        return index
+
+
+def _cell(value):
+    """
+    Formats a runs table value for the index page.
+    """
+    if isinstance(value, float):
+        return "" if pd.isna(value) else "{:.4g}".format(value)
+    return str(value)
+
+
+def _init_worker(spec, out_dir, dpi, figsize):
+    """
+    Switches the worker to the Agg backend and attaches it to the
+    published prices.
+    """
+    global _worker_prices, _worker_settings
+    plotting.use_headless_backend()
+    _worker_prices = sharedPriceMatrix.attach(spec)
+    _worker_settings = (out_dir, dpi, figsize)
+
+
+def _close_worker():
+    """
+    Detaches the calling process from the published prices.
+    """
+    global _worker_prices
+    if _worker_prices is not None:
+        _worker_prices.close()
+    _worker_prices = None
+
+
+def _render_job(item):
+    """
+    Backtests a job and saves its trading chart. Returns the
+    cumulative returns and number of closed trades.
+    """
+    from matplotlib import pyplot as plt
+
+    (strategy, symbols, params), name = item
+    out_dir, dpi, figsize = _worker_settings
+    trader = build_strategy(strategy, _worker_prices, symbols, params)
+    plt.figure(figsize=figsize)
+    with plotting.saving_to(os.path.join(out_dir, name), dpi=dpi):
+        cum_returns = trader.trade(plot=True)
+    plt.close('all')
+    return float(cum_returns), len(trader.closetimes)
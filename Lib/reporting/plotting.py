@@ -0,0 +1,258 @@
+"""
+Plotting helpers shared by the strategies' plot methods and the batch
+reports.
+
+Plots end with show_or_save(), which shows the figure interactively
+unless a saving_to() block redirects it to a file, so any strategy's
+trade(plot=True) can be rendered headlessly:
+```
+with saving_to("ETH_crossover.png"):
+    strategy.trade(plot=True)
+```
+Long series are drawn with plot_series(), which downsamples them to at
+most max_points (see set_downsampling()) while keeping their shape, the
+first and last points and the bars of every trade exactly.
+matplotlib is imported on first use.
+"""
+
+import contextlib
+
+import numpy as np
+
+# Output of the current saving_to block, None to show figures
+_output = None
+
+# Points each plotted series is downsampled to, None to plot every bar
+_max_points = 4000
+_method = 'minmax'
+
+
+@contextlib.contextmanager
+def saving_to(outfile, dpi=100):
+    """
+    Redirects show_or_save() inside the block to save the current
+    figure to outfile and close it instead of showing it.
+    """
+    global _output
+    previous, _output = _output, (outfile, dpi)
+    try:
+        yield
+    finally:
+        _output = previous
+
+
+def show_or_save():
+    """
+    Shows the current figure, or saves and closes it inside a
+    saving_to block.
+    """
+    from matplotlib import pyplot as plt
+
+    if _output is None:
+        plt.show()
+    else:
+        outfile, dpi = _output
+        plt.savefig(outfile, dpi=dpi)
+        plt.close()
+
+
+def use_headless_backend():
+    """
+    Switches matplotlib to the non-interactive Agg backend, for
+    rendering without a display.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def set_downsampling(max_points=4000, method='minmax'):
+    """
+    Sets how plot_series() downsamples long series.
+
+    Inputs:
+    - max_points:       (int) target number of points per series, None
+                        to plot every bar
+    - method:           (str) 'minmax' keeps the lowest and highest bar
+                        of equal width buckets (fast), 'lttb' picks the
+                        bar of each bucket enclosing the largest
+                        triangle with its neighbours (smoother)
+    """
+    global _max_points, _method
+    if max_points is not None and (not isinstance(max_points, int)
+                                   or max_points < 4):
+        raise ValueError("max_points must be an int of at least 4")
+    if method not in ('minmax', 'lttb'):
+        raise ValueError("method must be 'minmax' or 'lttb'")
+    _max_points, _method = max_points, method
+
+
+def minmax_indices(y, max_points):
+    """
+    Returns the sorted positions of the minimum and maximum of
+    max_points//2 equal width buckets of y, plus its first and last
+    positions. y must not contain NaNs.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    N = len(y)
+    buckets = max(1, max_points//2 - 1)
+    size = -(-N//buckets)
+    padded = np.full(buckets*size, np.nan)
+    padded[:N] = y
+    padded = padded.reshape(buckets, size)
+    # rows past the end are all NaN, only the last used row is partial
+    rows = np.arange(-(-N//size))
+    offsets = rows*size
+    lows = offsets + np.nanargmin(padded[rows], axis=1)
+    highs = offsets + np.nanargmax(padded[rows], axis=1)
+    return np.unique(np.concatenate(([0, N - 1], lows, highs)))
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Returns the sorted positions of max_points points of (x, y) chosen
+    by Largest Triangle Three Buckets, including the first and last.
+    y must not contain NaNs.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    N = len(y)
+    if N <= max_points:
+        return np.arange(N)
+
+    edges = np.linspace(1, N - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, N - 1
+    a = 0
+    for n in range(max_points - 2):
+        start, stop = edges[n], edges[n + 1]
+        if n < max_points - 3:
+            cx = x[stop:edges[n + 2]].mean()
+            cy = y[stop:edges[n + 2]].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx)*(y[start:stop] - y[a])
+                      - (x[a] - x[start:stop])*(cy - y[a]))
+        a = start + int(np.argmax(area))
+        selected[n + 1] = a
+    return selected
+
+
+def downsample(series, max_points=None, method=None, keep=None):
+    """
+    Downsamples a series for plotting while preserving its shape.
+
+    Inputs:
+    - series:           (pandas Series) to downsample, indexed by bar
+    - max_points:       (int) target number of points, defaults to the
+                        set_downsampling() value
+    - method:           (str) 'minmax' or 'lttb', defaults to the
+                        set_downsampling() value
+    - keep:             (list) index labels that are always kept, e.g.
+                        trade times
+
+    Outputs:
+    - series:           (pandas Series) the input if it is already
+                        short enough, else a subset of its non NaN bars
+    """
+    max_points = _max_points if max_points is None else max_points
+    method = _method if method is None else method
+    if max_points is None or len(series) <= max_points:
+        return series
+
+    values = series.dropna()
+    if len(values) <= max_points:
+        return values
+    y = values.to_numpy(dtype=np.float64)
+    if method == 'lttb':
+        if np.issubdtype(values.index.dtype, np.number):
+            x = values.index.to_numpy(dtype=np.float64)
+        else:
+            x = np.arange(len(y), dtype=np.float64)
+        positions = lttb_indices(x, y, max_points)
+    elif method == 'minmax':
+        positions = minmax_indices(y, max_points)
+    else:
+        raise ValueError("method must be 'minmax' or 'lttb'")
+
+    if keep is not None and len(keep) > 0:
+        kept = values.index.get_indexer(np.asarray(keep))
+        positions = np.union1d(positions, kept[kept >= 0])
+    return values.iloc[positions]
+
+
+def plot_series(series, keep=None, ax=None, **kwargs):
+    """
+    Plots a series after downsampling it with downsample(). The bars in
+    keep, typically the trade times, are plotted exactly.
+
+    Inputs:
+    - series:           (pandas Series) indexed by bar
+    - keep:             (list) index labels that are always kept
+    - ax:               (matplotlib Axes) defaults to the current axes
+    - kwargs:           passed to ax.plot, e.g. label
+    """
+    from matplotlib import pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+    values = downsample(series, keep=keep)
+    return ax.plot(values.index, values.to_numpy(), **kwargs)
+
+
+def trade_markers(times, color, ax=None):
+    """
+    Draws a dashed vertical line spanning the axes at each of times
+    with a single vlines call, rather than one axvline per trade.
+
+    Inputs:
+    - times:            (list, int) x positions of the trades
+    - color:            (str) matplotlib colour
+    - ax:               (matplotlib Axes) defaults to the current axes
+    """
+    from matplotlib import pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+    if len(times) == 0:
+        return None
+    return ax.vlines(np.asarray(times), 0, 1, colors=color, lw=0.5,
+                     linestyles='--', transform=ax.get_xaxis_transform())
+
+
+def render_heatmap(values, xlabels, ylabels, title, outfile=None,
+                   xlabel=None, ylabel=None):
+    """
+    Draws a returns heatmap with a colour scale symmetric around zero,
+    in the style of the apps, then shows or saves it.
+
+    Inputs:
+    - values:           (2D array) returns as percentages, rows follow
+                        ylabels and columns xlabels
+    - xlabels, ylabels: (list) tick labels
+    - title:            (str) figure title
+    - outfile:          (str) optional file to save the figure to
+    - xlabel, ylabel:   (str) optional axis labels
+    """
+    from matplotlib import pyplot as plt
+    from matplotlib.ticker import FuncFormatter
+
+    values = np.asarray(values, dtype=np.float64)
+    plt.figure()
+    plt.imshow(values, cmap='RdBu')
+    plt.colorbar(format=FuncFormatter(
+        lambda x, pos: '{}%'.format(np.round(x, 0))))
+    max_ret = np.nanmax(np.abs(values)) if np.isfinite(values).any() else 1
+    plt.clim(vmin=-max_ret, vmax=max_ret)
+    plt.xticks(np.arange(len(xlabels)), xlabels, rotation=90)
+    plt.yticks(np.arange(len(ylabels)), ylabels)
+    if xlabel is not None:
+        plt.xlabel(xlabel)
+    if ylabel is not None:
+        plt.ylabel(ylabel)
+    plt.title(title)
+    plt.tight_layout()
+    if outfile is None:
+        show_or_save()
+    else:
+        with saving_to(outfile):
+            show_or_save()
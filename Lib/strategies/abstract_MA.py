@@ -1,10 +1,10 @@
-from matplotlib import pyplot as plt
 import pandas as pd
 import abc
 
 from ..types.position import Position
 from ..types.simple_moving_average import simpleMovingAverage
 from ..types.exponential_moving_average import expMovingAverage
+from ..instrumentation import timing
 
 
 class movingAverageTrader(metaclass=abc.ABCMeta):
@@ -62,12 +62,13 @@ class movingAverageTrader(metaclass=abc.ABCMeta):
         self.trading_fee = trading_fee
         self.position = Position()
         self.df['returns'] = 0.0
-        if MA_type == 'SMA':
-            self.fastMA = simpleMovingAverage(df[self.sym], fast_MA)
-            self.slowMA = simpleMovingAverage(df[self.sym], slow_MA)
-        elif MA_type == 'EMA':
-            self.fastMA = expMovingAverage(df[self.sym], fast_MA)
-            self.slowMA = expMovingAverage(df[self.sym], slow_MA)
+        with timing.phase('indicators'):
+            if MA_type == 'SMA':
+                self.fastMA = simpleMovingAverage(df[self.sym], fast_MA)
+                self.slowMA = simpleMovingAverage(df[self.sym], slow_MA)
+            elif MA_type == 'EMA':
+                self.fastMA = expMovingAverage(df[self.sym], fast_MA)
+                self.slowMA = expMovingAverage(df[self.sym], slow_MA)
 
     def getSpotPrice(self, t):
         """
@@ -80,26 +81,29 @@ class movingAverageTrader(metaclass=abc.ABCMeta):
         Stores trade returns in dataframe
         """
 
-        self.df.loc[t, 'returns'] = self.position.tradereturn
+        with timing.phase('dataframe_write'):
+            self.df.loc[t, 'returns'] = self.position.tradereturn
 
     def openPosition(self, t, pos_type):
         """
         Opens a position at time t
         """
         spotprice = self.getSpotPrice(t)
-        if pos_type == 'L':
-            self.position.open(spotprice, 'L', fee=self.trading_fee)
-        elif pos_type == 'S':
-            self.position.open(spotprice, 'S', fee=self.trading_fee)
-        else:
-            raise ValueError("Position type not recognised")
+        with timing.phase('position'):
+            if pos_type == 'L':
+                self.position.open(spotprice, 'L', fee=self.trading_fee)
+            elif pos_type == 'S':
+                self.position.open(spotprice, 'S', fee=self.trading_fee)
+            else:
+                raise ValueError("Position type not recognised")
 
     def closePosition(self, t):
         """
         Closes a position at time t
         """
         spotprice = self.getSpotPrice(t)
-        self.position.close(spotprice, fee=self.trading_fee)
+        with timing.phase('position'):
+            self.position.close(spotprice, fee=self.trading_fee)
         self.storeTradeReturns(t)
 
     @abc.abstractmethod
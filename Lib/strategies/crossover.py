@@ -1,7 +1,9 @@
-from matplotlib import pyplot as plt
 import pandas as pd
 
 from .abstract_MA import movingAverageTrader
+from ..instrumentation import timing, memory
+from ..reporting.plotting import (plot_series, trade_markers,
+                                  show_or_save)
 
 
 class crossoverTrader(movingAverageTrader):
@@ -37,6 +39,8 @@ class crossoverTrader(movingAverageTrader):
                         object that handles moving average of series
     - self.slowMA:      moving average with longer period than
                         self.fastMA
+    - self.opentimes:   (list, int) holds indeces of trade opening times
+    - self.closetimes:  (list, int) holds indeces of trade closing times
 
     Notes:
     - Currently designed to only open one positon at a time
@@ -47,7 +51,10 @@ class crossoverTrader(movingAverageTrader):
                  slow_MA, fast_MA=1, trading_fee=0.0):
         args = (df, asset_symbol, MA_type, slow_MA)
         kwargs = {"fast_MA": fast_MA, "trading_fee": trading_fee}
-        super(crossoverTrader, self).__init__(*args, **kwargs)
+        with memory.measure('construct.crossover'):
+            super(crossoverTrader, self).__init__(*args, **kwargs)
+        self.opentimes = []
+        self.closetimes = []
 
     def plotTrading(self, opentimes, closetimes):
         """
@@ -60,25 +67,29 @@ class crossoverTrader(movingAverageTrader):
         - plot has green and red verticle lines indicating
         opening longs and shorts respectively
         """
+        from matplotlib import pyplot as plt
 
         t0 = self.slowMA.period
         T = self.df.shape[0]
+        trades = opentimes + closetimes
         plt.subplot(211)
-        self.df.loc[t0:T, self.sym].plot(label=self.sym)
-        self.slowMA.values.loc[t0:T].plot(label=self.slowMA.name)
+        plot_series(self.df.loc[t0:T, self.sym], trades, label=self.sym)
+        plot_series(self.slowMA.values.loc[t0:T], trades,
+                    label=self.slowMA.name)
         if self.fastMA.period > 1:
-            self.fastMA.values.loc[t0:T].plot(label=self.fastMA.name)
-        [plt.axvline(x, c='g', lw=0.5, ls='--') for x in opentimes]
-        [plt.axvline(x, c='r', lw=0.5, ls='--') for x in closetimes]
+            plot_series(self.fastMA.values.loc[t0:T], trades,
+                        label=self.fastMA.name)
+        trade_markers(opentimes, 'g')
+        trade_markers(closetimes, 'r')
         plt.ylabel('{}/BTC'.format(self.sym))
         plt.legend()
 
         plt.subplot(212)
         returns = self.df.loc[t0:T, 'returns'].cumsum()*100
-        returns.plot()
+        plot_series(returns, trades)
         plt.ylabel('Returns (%)')
         plt.xlabel('Hours')
-        plt.show()
+        show_or_save()
 
     def trade(self, plot=False):
         """
@@ -91,26 +102,35 @@ class crossoverTrader(movingAverageTrader):
 
         longtimes = []
         shorttimes = []
-
-        for t in range(self.slowMA.period + 1, self.df.shape[0]):
-            slowMA_t = self.slowMA.getValue(t)
-            fastMA_t = self.fastMA.getValue(t)
-            slowMA_t_1 = self.slowMA.getValue(t-1)
-            fastMA_t_1 = self.fastMA.getValue(t-1)
-
-            if fastMA_t > slowMA_t and fastMA_t_1 < slowMA_t_1:
-                if self.position.position != 0:
-                    self.closePosition(t)
-                self.openPosition(t, 'L')
-                longtimes.append(t)
-
-            if fastMA_t < slowMA_t and fastMA_t_1 > slowMA_t_1:
-                if self.position.position != 0:
-                    self.closePosition(t)
-                self.openPosition(t, 'S')
-                shorttimes.append(t)
+        self.opentimes = []
+        self.closetimes = []
+
+        t0 = self.slowMA.period + 1
+        with timing.phase('bar_loop', bars=max(self.df.shape[0] - t0, 0)):
+            for t in range(t0, self.df.shape[0]):
+                slowMA_t = self.slowMA.getValue(t)
+                fastMA_t = self.fastMA.getValue(t)
+                slowMA_t_1 = self.slowMA.getValue(t-1)
+                fastMA_t_1 = self.fastMA.getValue(t-1)
+
+                if fastMA_t > slowMA_t and fastMA_t_1 < slowMA_t_1:
+                    if self.position.position != 0:
+                        self.closePosition(t)
+                        self.closetimes.append(t)
+                    self.openPosition(t, 'L')
+                    longtimes.append(t)
+                    self.opentimes.append(t)
+
+                if fastMA_t < slowMA_t and fastMA_t_1 > slowMA_t_1:
+                    if self.position.position != 0:
+                        self.closePosition(t)
+                        self.closetimes.append(t)
+                    self.openPosition(t, 'S')
+                    shorttimes.append(t)
+                    self.opentimes.append(t)
 
         if plot:
-            self.plotTrading(longtimes, shorttimes)
+            with timing.phase('plotting'):
+                self.plotTrading(longtimes, shorttimes)
 
         return self.df['returns'].cumsum().iloc[-1]
@@ -0,0 +1,219 @@
+"""
+Array kernels reproducing the trading rules of crossoverTrader and
+zScoreTrader on precomputed indicator arrays.
+
+Trading rules only act on a sparse set of bars (MA crossings, z score
+band and zero crossings). The *_events functions find those bars with
+vectorised comparisons over the whole series once. The *_trades
+functions then replay the strategy's state machine over the events
+that fall inside any [start, end) window, so evaluating a window costs
+O(events in window) rather than O(bars in window).
+
+Trade returns follow Position: a position of size 1*(1-fee) is opened,
+scaled by (1-fee) again on closing and returns
+size*(exit - entry)/abs(entry).
+"""
+import numpy as np
+
+from ..types.simple_moving_average import simpleMovingAverage
+from ..types.exponential_moving_average import expMovingAverage
+from ..types.zscore import zScore
+
+# Event codes used by zscore_events
+LONG_OPEN, SHORT_OPEN, LONG_CLOSE, SHORT_CLOSE = 1, 2, 4, 8
+
+
+def trade_returns(entry, exit, side, fee=0.0):
+    """
+    Computes round trip returns exactly as Position.calcTradeReturn.
+
+    Inputs:
+    - entry, exit:      (np array, float) entry and exit prices
+    - side:             (np array, int) 1 for longs, -1 for shorts
+    - fee:              (float) fractional trading fee
+    """
+    entry = np.asarray(entry, dtype=np.float64)
+    exit = np.asarray(exit, dtype=np.float64)
+    size = np.asarray(side)*(1 - fee)*(1 - fee)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = size*(exit - entry)/np.abs(entry)
+    return np.where(exit - entry == 0, np.abs(size) - 1, returns)
+
+
+def crossover_events(fastMA, slowMA, start):
+    """
+    Finds the bars where crossoverTrader opens a position.
+
+    Inputs:
+    - fastMA, slowMA:   (np array) moving average values
+    - start:            (int) first tradable index, slowMA period + 1
+
+    Outputs:
+    - index:            (np array, int) bars where the fast MA crosses
+    - side:             (np array, int) 1 for an upwards cross (long),
+                        -1 for a downwards cross (short)
+    """
+    fast_t, slow_t = fastMA[1:], slowMA[1:]
+    fast_t_1, slow_t_1 = fastMA[:-1], slowMA[:-1]
+    up = (fast_t > slow_t) & (fast_t_1 < slow_t_1)
+    down = (fast_t < slow_t) & (fast_t_1 > slow_t_1)
+
+    index = np.flatnonzero(up | down) + 1
+    index = index[index >= start]
+    side = np.where(up[index - 1], 1, -1)
+    return index, side
+
+
+def crossover_trades(prices, index, side, start, end, fee=0.0):
+    """
+    Replays crossoverTrader between bars start and end. Every cross
+    closes any open position and opens one in the direction of the
+    cross. Positions still open at end are not counted.
+
+    Inputs:
+    - prices:           (np array) asset prices
+    - index, side:      output of crossover_events
+    - start, end:       (int) window of bars [start, end)
+    - fee:              (float) fractional trading fee
+
+    Outputs:
+    - opens, closes:    (np array, int) bars of each round trip
+    - returns:          (np array, float) return of each round trip
+    """
+    lo, hi = np.searchsorted(index, [start, end])
+    index, side = index[lo:hi], side[lo:hi]
+    opens, closes = index[:-1], index[1:]
+    returns = trade_returns(prices[opens], prices[closes], side[:-1], fee)
+    return opens, closes, returns
+
+
+def zscore_events(fastMA, slowMA, zscore, bandwidth, start):
+    """
+    Finds every bar where zScoreTrader could open or close a position.
+
+    Inputs:
+    - fastMA, slowMA:   (np array) moving average values
+    - zscore:           (np array) z score values
+    - bandwidth:        (float) bandwidth of the trading logic
+    - start:            (int) first tradable index, slowMA period
+
+    Outputs:
+    - index:            (np array, int) candidate bars
+    - codes:            (np array, int) bitmask of LONG_OPEN,
+                        SHORT_OPEN, LONG_CLOSE and SHORT_CLOSE for each
+                        candidate bar
+    """
+    uptrend = fastMA[1:] > slowMA[1:]
+    z_t, z_t_1 = zscore[1:], zscore[:-1]
+
+    codes = (LONG_OPEN*(uptrend & (z_t > -bandwidth) & (z_t_1 < -bandwidth))
+             + SHORT_OPEN*(~uptrend & (z_t < bandwidth) & (z_t_1 > bandwidth))
+             + LONG_CLOSE*((z_t > 0) & (z_t_1 < 0))
+             + SHORT_CLOSE*((z_t < 0) & (z_t_1 > 0)))
+
+    index = np.flatnonzero(codes) + 1
+    index = index[index >= start]
+    return index, codes[index - 1]
+
+
+def zscore_trades(prices, index, codes, start, end, fee=0.0):
+    """
+    Replays the zScoreTrader state machine over the candidate bars
+    between start and end. Positions still open at end are not counted.
+
+    Inputs:
+    - prices:           (np array) asset prices
+    - index, codes:     output of zscore_events
+    - start, end:       (int) window of bars [start, end)
+    - fee:              (float) fractional trading fee
+
+    Outputs:
+    - opens, closes:    (np array, int) bars of each round trip
+    - returns:          (np array, float) return of each round trip
+    """
+    lo, hi = np.searchsorted(index, [start, end])
+    opens, closes, sides = [], [], []
+    # zScoreTrader compares the fee scaled position size against +-1
+    position, t_open = 0, 0
+    size = 1 - fee
+
+    for t, code in zip(index[lo:hi].tolist(), codes[lo:hi].tolist()):
+        if position == 0:
+            if code & LONG_OPEN:
+                position, t_open = size, t
+            elif code & SHORT_OPEN:
+                position, t_open = -size, t
+        if ((position == 1 and code & LONG_CLOSE)
+                or (position == -1 and code & SHORT_CLOSE)):
+            opens.append(t_open)
+            closes.append(t)
+            sides.append(position)
+            position = 0
+
+    opens = np.array(opens, dtype=np.int64)
+    closes = np.array(closes, dtype=np.int64)
+    returns = trade_returns(prices[opens], prices[closes],
+                            np.array(sides), fee)
+    return opens, closes, returns
+
+
+def grid_events(series, strategy, grid):
+    """
+    Computes the events of every parameter set of a grid. Each distinct
+    indicator is computed once, with the same moving average and z
+    score types as the strategies, and shared across parameter sets.
+
+    Inputs:
+    - series:           (pandas Series) asset price history
+    - strategy:         (str) 'crossover' or 'zscore'
+    - grid:             (list, dict) strategy constructor keyword
+                        arguments of each parameter set
+
+    Outputs:
+    - events:           (list, tuple) (index, side or codes, fee) of
+                        each parameter set, to be passed to
+                        crossover_trades or zscore_trades
+    """
+    cache = {}
+
+    def indicator(kind, period):
+        if (kind, period) not in cache:
+            if kind == 'SMA':
+                values = simpleMovingAverage(series, period).values
+            elif kind == 'EMA':
+                values = expMovingAverage(series, period).values
+            elif kind == 'Z':
+                values = zScore(series, period).values
+            else:
+                raise ValueError("MA type not supported. Try 'SMA' or 'EMA'")
+            cache[(kind, period)] = values.to_numpy(dtype=np.float64)
+        return cache[(kind, period)]
+
+    events = []
+    for params in grid:
+        MA_type, slow = params['MA_type'], params['slow_MA']
+        fast = params.get('fast_MA', 1)
+        fee = params.get('trading_fee', 0.0)
+        slowMA, fastMA = indicator(MA_type, slow), indicator(MA_type, fast)
+        if strategy == 'crossover':
+            index, side = crossover_events(fastMA, slowMA, slow + 1)
+            events.append((index, side, fee))
+        elif strategy == 'zscore':
+            zscore = indicator('Z', params['zscore_period'])
+            index, codes = zscore_events(fastMA, slowMA, zscore,
+                                         params['bandwidth'], slow)
+            events.append((index, codes, fee))
+        else:
+            raise ValueError("Strategy must be 'crossover' or 'zscore'")
+    return events
+
+
+def replay_function(strategy):
+    """
+    Returns the *_trades kernel replaying the given strategy
+    """
+    if strategy == 'crossover':
+        return crossover_trades
+    elif strategy == 'zscore':
+        return zscore_trades
+    raise ValueError("Strategy must be 'crossover' or 'zscore'")
@@ -0,0 +1,129 @@
+"""
+Broadcast kernels evaluating a whole crossoverTrader parameter grid at
+once.
+
+Given a (periods x time) matrix of moving averages, the side of the
+fast MA relative to the slow MA is compared for every (fast, slow)
+pair in one (pairs x time) array operation. Crossings and round trip
+returns are then reduced per pair with array operations only, so the
+cost of a grid does not involve a Python loop over pairs or bars.
+
+Time is processed in chunks carrying the last crossing of each pair
+across chunk boundaries, so the memory held is bounded by
+pairs x chunk length whatever the length of the history.
+"""
+import numpy as np
+
+from .event_kernels import trade_returns
+from ..types.simple_moving_average import simpleMovingAverage
+from ..types.exponential_moving_average import expMovingAverage
+
+# Approximate bytes of temporaries held per (pair, bar) of a chunk
+_BYTES_PER_CELL = 96
+
+
+def ma_matrix(series, periods, MA_type='SMA'):
+    """
+    Computes the moving averages of a series for several periods with
+    the same moving average types used by the strategies.
+
+    Inputs:
+    - series:           (pandas Series) asset price history
+    - periods:          (list, int) moving average periods
+    - MA_type:          (str) 'SMA' or 'EMA'
+
+    Outputs:
+    - ma:               (np array) (periods x time) moving averages
+    """
+    if MA_type == 'SMA':
+        average = simpleMovingAverage
+    elif MA_type == 'EMA':
+        average = expMovingAverage
+    else:
+        raise ValueError("MA type not supported. Try 'SMA' or 'EMA")
+
+    ma = np.empty((len(periods), series.shape[0]))
+    for k, period in enumerate(periods):
+        ma[k] = average(series, period).values.to_numpy(dtype=np.float64)
+    return ma
+
+
+def crossover_grid_returns(prices, ma, periods, fee=0.0, chunk_size=None,
+                           memory_budget=256*2**20):
+    """
+    Computes the cumulative returns of crossoverTrader for every pair
+    of periods (fast, slow) with fast < slow.
+
+    Inputs:
+    - prices:           (np array) asset prices
+    - ma:               (np array) (periods x time) moving averages,
+                        see ma_matrix
+    - periods:          (list, int) period of each row of ma
+    - fee:              (float) fractional trading fee
+    - chunk_size:       (int) bars per chunk. Derived from
+                        memory_budget if not given.
+    - memory_budget:    (int) approximate bytes of temporaries allowed
+
+    Outputs:
+    - returns:          (np array) (periods x periods) heatmap where
+                        returns[j, i] holds the cumulative returns of
+                        fast MA periods[i] against slow MA periods[j].
+                        Entries with i >= j are zero.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    ma = np.asarray(ma, dtype=np.float64)
+    num_periods, T = ma.shape
+    if num_periods != len(periods) or T != prices.shape[0]:
+        raise ValueError("ma must have shape (len(periods), len(prices))")
+
+    fast, slow = np.triu_indices(num_periods, k=1)
+    start = np.asarray(periods)[slow] + 1  # first bar traded by each pair
+    num_pairs = fast.shape[0]
+    totals = np.zeros(num_pairs)
+
+    if chunk_size is None:
+        chunk_size = memory_budget // (_BYTES_PER_CELL*max(num_pairs, 1))
+    chunk_size = max(int(chunk_size), 1)
+
+    # side and entry price of the last crossing of each pair so far
+    last_side = np.zeros(num_pairs)
+    last_price = np.full(num_pairs, np.nan)
+    rows = np.arange(num_pairs)[:, None]
+
+    for c0 in range(1, T, chunk_size):
+        c1 = min(c0 + chunk_size, T)
+        above = ma[fast, c0-1:c1] > ma[slow, c0-1:c1]
+        below = ma[fast, c0-1:c1] < ma[slow, c0-1:c1]
+        up = above[:, 1:] & below[:, :-1]
+        down = below[:, 1:] & above[:, :-1]
+        del above, below
+
+        bars = np.arange(c0, c1)
+        cross = (up | down) & (bars[None, :] >= start[:, None])
+        side = np.where(up, 1.0, -1.0)
+        del up, down
+
+        # index within the chunk of the latest crossing at or before t
+        latest = np.where(cross, np.arange(c1 - c0)[None, :], -1)
+        np.maximum.accumulate(latest, axis=1, out=latest)
+        previous = np.empty_like(latest)
+        previous[:, 0] = -1
+        previous[:, 1:] = latest[:, :-1]
+
+        chunk_prices = prices[c0:c1]
+        in_chunk = previous >= 0
+        entry = np.where(in_chunk, chunk_prices[np.maximum(previous, 0)],
+                         last_price[:, None])
+        entry_side = np.where(in_chunk, side[rows, np.maximum(previous, 0)],
+                              last_side[:, None])
+        closing = cross & (entry_side != 0)
+        trades = trade_returns(entry, chunk_prices[None, :], entry_side, fee)
+        totals += np.where(closing, trades, 0.0).sum(axis=1)
+
+        crossed = latest[:, -1] >= 0
+        last_price[crossed] = chunk_prices[latest[crossed, -1]]
+        last_side[crossed] = side[crossed, latest[crossed, -1]]
+
+    returns = np.zeros((num_periods, num_periods))
+    returns[slow, fast] = totals
+    return returns
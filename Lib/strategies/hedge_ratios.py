@@ -0,0 +1,97 @@
+"""
+Regression hedge ratio estimators of a pair, the fast alternatives to
+pairsTrader's Kalman filter.
+
+Both regress y = beta*x + alpha over trailing data at every bar from
+running sums of x, y, xy and x^2, so the whole series costs O(N)
+whatever the window:
+- rolling_ols_hedge_ratios: ordinary least squares over the last window
+  bars, from differences of cumulative sums.
+- ewma_hedge_ratios: least squares with exponentially decaying weights,
+  from exponentially weighted means.
+
+Example usage:
+```
+hedge_ratios = rolling_ols_hedge_ratios(xMA, yMA, 100)
+```
+"""
+
+import numpy as np
+import pandas as pd
+
+# Windows whose x variance is below this fraction of its mean square
+# are treated as constant and give no hedge ratio
+_MIN_VARIANCE = 1e-12
+
+
+def rolling_ols_hedge_ratios(x, y, window):
+    """
+    Returns the OLS slope beta of y = beta*x + alpha over the window
+    bars up to and including each bar.
+
+    Inputs:
+    - x, y:             (np array or pandas Series) price series
+    - window:           (int) bars in each regression, at least 2
+
+    Outputs:
+    - hedge_ratios:     (np array, float) NaN for the first window - 1
+                        bars and for windows of constant x
+    """
+    x, y = _centred(x, y, window)
+    hedge_ratios = np.full(len(x), np.nan)
+    if len(x) < window:
+        return hedge_ratios
+
+    sums = [np.concatenate(([0.0], np.cumsum(values)))
+            for values in (x, y, x*y, x*x)]
+    sx, sy, sxy, sxx = [s[window:] - s[:-window] for s in sums]
+    hedge_ratios[window - 1:] = _slope(sxy - sx*sy/window,
+                                       sxx - sx*sx/window, sxx)
+    return hedge_ratios
+
+
+def ewma_hedge_ratios(x, y, window):
+    """
+    Returns the exponentially weighted least squares slope beta of
+    y = beta*x + alpha up to each bar, with the weights of
+    expMovingAverage(series, window).
+
+    Inputs:
+    - x, y:             (np array or pandas Series) price series
+    - window:           (int) centre of mass of the weights, at least 2
+
+    Outputs:
+    - hedge_ratios:     (np array, float) NaN for the first window - 1
+                        bars and for constant x
+    """
+    x, y = _centred(x, y, window)
+    means = pd.DataFrame({'x': x, 'y': y, 'xy': x*y, 'xx': x*x})
+    means = means.ewm(com=window, min_periods=window).mean()
+    ex, ey = means['x'].to_numpy(), means['y'].to_numpy()
+    exx = means['xx'].to_numpy()
+    return _slope(means['xy'].to_numpy() - ex*ey, exx - ex*ex, exx)
+
+
+def _centred(x, y, window):
+    """
+    Checks the inputs and returns x, y less their means, which leaves
+    the slopes unchanged but limits cancellation in the sums.
+    """
+    if not isinstance(window, (int, np.integer)) or window < 2:
+        raise ValueError("window must be an int of at least 2")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.shape != y.shape or x.ndim != 1:
+        raise ValueError("x and y must be 1D series of equal length")
+    if len(x) == 0:
+        return x, y
+    return x - x.mean(), y - y.mean()
+
+
+def _slope(covariance, variance, mean_square):
+    """
+    Returns covariance/variance, NaN where the variance is negligible.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = covariance/variance
+    return np.where(variance > _MIN_VARIANCE*mean_square, slope, np.nan)
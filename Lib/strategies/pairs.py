@@ -1,11 +1,19 @@
-from matplotlib import pyplot as plt
 import pandas as pd
 import numpy as np
-from pykalman import KalmanFilter
 
 from ..types.zscore import zScore
 from ..types.position import Position
 from ..types.exponential_moving_average import expMovingAverage
+from ..types.numerics import (KF_SCALE, KF_MEAN, KF_COV, KF_OBS_COV,
+                              KF_TRANS_COV)
+from .pairs_cache import regressionSpread, window_zscores
+from ..instrumentation import timing, memory
+from ..reporting.plotting import (plot_series, trade_markers,
+                                  show_or_save)
+
+
+# bars scored at once by a cached trade, doubling while nothing trades
+_BLOCK = 64
 
 
 class pairsTrader():
@@ -25,6 +33,20 @@ class pairsTrader():
     - asset1, asset2:           (str) labels for each price series x, y
     - bandwidth:                (float) bandwidth for zscore logic
     - fee:                      (float) fractional trading fee
+    - spread_cache:             (spreadCache) optional cache of the
+                                pair's free running hedge ratios,
+                                spreads and z scores, shared by the
+                                pairsTraders of a grid. Trades are
+                                identical with and without it.
+    - hedge_ratio:              (str) hedge ratio estimator: 'kalman'
+                                (default) filters the smoothed prices,
+                                'ols' regresses them over the last
+                                hedge_window bars and 'ewma' with
+                                exponential weights of centre of mass
+                                hedge_window. Either way the hedge
+                                ratio is held while a position is open.
+    - hedge_window:             (int) window of the 'ols' and 'ewma'
+                                estimators
 
     Members:
     - self.name:                (str) name of the spread, used for plots
@@ -38,9 +60,20 @@ class pairsTrader():
     - self.df:                  (pandas Dataframe) stores data for
                                 trading including spread vals, hedge
                                 ratio, zscore etc.
+    - self.spreads:             (pairSpread) precomputation of the
+                                pair, if spread_cache was given or the
+                                hedge ratio is a regression
     """
 
-    def __init__(self, x, y, asset1, asset2, zperiod, bandwidth=2.0, fee=0.0):
+    def __init__(self, x, y, asset1, asset2, zperiod, bandwidth=2.0, fee=0.0,
+                 spread_cache=None, hedge_ratio='kalman', hedge_window=100):
+        if hedge_ratio not in ('kalman', 'ols', 'ewma'):
+            raise ValueError("Hedge ratio estimator not recognised")
+        if hedge_ratio == 'kalman':
+            hedge_window = None
+        elif not isinstance(hedge_window, int) or hedge_window < 2:
+            raise ValueError("Hedge window must be an int of at least 2")
+
         self.name = asset1 + "/" + asset2
         self.xsym, self.ysym = asset1, asset2
         self.spreadPosition = Position()
@@ -52,15 +85,29 @@ class pairsTrader():
         self.opentimes = []
         self.closetimes = []
 
-        self.df = pd.DataFrame({asset1: x, asset2: y})
-        self.df['spread'] = 0.0
-        self.df['zscore'] = 0.0
-        self.df['HR'] = 0.0  # Hedge ratio
-        self.df['returns'] = 0.0
-
-        # Use of a moving average to smooth spread
-        self.df['xMA'] = expMovingAverage(x, 10).values
-        self.df['yMA'] = expMovingAverage(y, 10).values
+        with memory.measure('construct.pairs'):
+            self.df = pd.DataFrame({asset1: x, asset2: y})
+            self.df['spread'] = 0.0
+            self.df['zscore'] = 0.0
+            self.df['HR'] = 0.0  # Hedge ratio
+            self.df['returns'] = 0.0
+
+            # Use of a moving average to smooth spread
+            self.spreads = None
+            if spread_cache is not None:
+                self.spreads = spread_cache.get(x, y, asset1, asset2,
+                                                estimator=hedge_ratio,
+                                                window=hedge_window)
+            elif hedge_ratio != 'kalman':
+                self.spreads = regressionSpread(x, y, hedge_ratio,
+                                                hedge_window)
+            if self.spreads is not None:
+                self.df['xMA'] = self.spreads.xMA
+                self.df['yMA'] = self.spreads.yMA
+            else:
+                with timing.phase('indicators'):
+                    self.df['xMA'] = expMovingAverage(x, 10).values
+                    self.df['yMA'] = expMovingAverage(y, 10).values
 
     def getSpreadPrice(self, t):
         """
@@ -92,52 +139,62 @@ class pairsTrader():
         """
         return self.df.loc[t, 'zscore']
 
-    def _storeTradeReturns(self, t):
+    def _storeTradeReturns(self, t, HR=None):
         """
         Stores trade returns from closing a position in index t
         """
-        HR = self.getHedgeRatio(t)
+        if HR is None:
+            HR = self.getHedgeRatio(t)
         yratio, xratio = 1.0 / (1.0 + HR), HR / (1.0 + HR)
 
         yreturn = self.yPosition.tradereturn*yratio
         xreturn = self.yPosition.tradereturn*xratio
 
-        self.df.loc[t, 'returns'] = yreturn + xreturn
+        with timing.phase('dataframe_write'):
+            self.df.loc[t, 'returns'] = yreturn + xreturn
 
-    def openPosition(self, t, pos_type):
+    def openPosition(self, t, pos_type, prices=None):
         """
-        Opens a position at time t.
+        Opens a position at time t, at the (spread, x, y) prices if
+        given rather than those in self.df.
         """
-        spreadprice = self.getSpreadPrice(t)
-        xspotprice = self.getXPrice(t)
-        yspotprice = self.getYPrice(t)
-
-        if pos_type == 'L':
-            self.spreadPosition.open(spreadprice, 'L', fee=self.trading_fee)
-            self.yPosition.open(yspotprice, 'L', fee=self.trading_fee)
-            self.xPosition.open(xspotprice, 'S', fee=self.trading_fee)
-            self.opentimes.append(t)
-        elif pos_type == 'S':
-            self.spreadPosition.open(spreadprice, 'S', fee=self.trading_fee)
-            self.yPosition.open(yspotprice, 'S', fee=self.trading_fee)
-            self.xPosition.open(xspotprice, 'L', fee=self.trading_fee)
-            self.opentimes.append(t)
-        else:
-            raise ValueError("Position type not recognised")
-
-    def closePosition(self, t):
+        if prices is None:
+            prices = (self.getSpreadPrice(t), self.getXPrice(t),
+                      self.getYPrice(t))
+        spreadprice, xspotprice, yspotprice = prices
+
+        with timing.phase('position'):
+            if pos_type == 'L':
+                self.spreadPosition.open(spreadprice, 'L',
+                                         fee=self.trading_fee)
+                self.yPosition.open(yspotprice, 'L', fee=self.trading_fee)
+                self.xPosition.open(xspotprice, 'S', fee=self.trading_fee)
+                self.opentimes.append(t)
+            elif pos_type == 'S':
+                self.spreadPosition.open(spreadprice, 'S',
+                                         fee=self.trading_fee)
+                self.yPosition.open(yspotprice, 'S', fee=self.trading_fee)
+                self.xPosition.open(xspotprice, 'L', fee=self.trading_fee)
+                self.opentimes.append(t)
+            else:
+                raise ValueError("Position type not recognised")
+
+    def closePosition(self, t, prices=None, HR=None):
         """
-        closes a position at time t
+        closes a position at time t, at the (spread, x, y) prices and
+        hedge ratio if given rather than those in self.df.
         """
-        spreadprice = self.getSpreadPrice(t)
-        xspotprice = self.getXPrice(t)
-        yspotprice = self.getYPrice(t)
-
-        self.spreadPosition.close(spreadprice, fee=self.trading_fee)
-        self.yPosition.close(yspotprice, fee=self.trading_fee)
-        self.xPosition.close(xspotprice, fee=self.trading_fee)
+        if prices is None:
+            prices = (self.getSpreadPrice(t), self.getXPrice(t),
+                      self.getYPrice(t))
+        spreadprice, xspotprice, yspotprice = prices
+
+        with timing.phase('position'):
+            self.spreadPosition.close(spreadprice, fee=self.trading_fee)
+            self.yPosition.close(yspotprice, fee=self.trading_fee)
+            self.xPosition.close(xspotprice, fee=self.trading_fee)
         self.closetimes.append(t)
-        self._storeTradeReturns(t)
+        self._storeTradeReturns(t, HR=HR)
 
     def _kf_linear_regression(self, x, y, plot=True):
         """
@@ -164,27 +221,27 @@ class pairsTrader():
         (beta, alpha).(x_i, 1) = y_i
         so the observation matrix (obs_mat) is a column of 1s and xs.
         """
+        from pykalman import KalmanFilter
 
         # Avoid underflow for small prices
-        x *= 10000000
-        y *= 10000000
+        x *= KF_SCALE
+        y *= KF_SCALE
 
-        delta = 1e-5
-        trans_cov = delta / (1 - delta) * np.eye(2)  # How much rand walk moves
         obs_mat = np.expand_dims(np.vstack([[x], [np.ones_like(x)]]).T, axis=1)
 
         # y is 1-dimensional, (alpha, beta) is 2-dimensional
         kf = KalmanFilter(n_dim_obs=1, n_dim_state=2,
-                          initial_state_mean=[0, 0],
-                          initial_state_covariance=np.ones((2, 2)),
+                          initial_state_mean=KF_MEAN,
+                          initial_state_covariance=KF_COV,
                           transition_matrices=np.eye(2),
                           observation_matrices=obs_mat,
-                          observation_covariance=2,
-                          transition_covariance=trans_cov)
+                          observation_covariance=KF_OBS_COV,
+                          transition_covariance=KF_TRANS_COV)
 
         # Use the observations y to get running estimates and errors
         # for the state parameters
-        state_means, state_cov = kf.filter(y)
+        with timing.phase('kalman_filter'):
+            state_means, state_cov = kf.filter(y)
 
         return state_means[:, 0]
 
@@ -237,7 +294,9 @@ class pairsTrader():
         if(T is None):
             T = self.df.shape[0]
 
-        zscr = zScore(self.df.loc[t0-period:T-1, 'spread'], period).values
+        with timing.phase('zscore'):
+            zscr = zScore(self.df.loc[t0-period:T-1, 'spread'],
+                          period).values
         self.df.loc[t0:T, 'zscore'] = zscr.loc[t0:T-1]
 
     def trade(self, plot=False):
@@ -248,104 +307,210 @@ class pairsTrader():
         - plot:                (bool) bool to plot trading.
         """
 
+        if self.spreads is not None:
+            self._tradeCached()
+            if (plot):
+                with timing.phase('plotting'):
+                    self.plotTrading(t0=self.zperiod, T=self.df.shape[0]-1)
+            return self.df['returns'].cumsum().iloc[-1]
+
         t0, T = self.zperiod, self.df.shape[0]-1
         position_t = 0
         self._generateSpread(T=t0)
         self._generateZScore(T=t0, period=self.zperiod)
 
-        for t in range(t0, T):
+        with timing.phase('bar_loop', bars=max(T - t0, 0)):
+            for t in range(t0, T):
 
-            self._generateSpread(t0=t, T=t+1)
-            self._generateZScore(t0=t, T=t+1, period=self.zperiod)
+                self._generateSpread(t0=t, T=t+1)
+                self._generateZScore(t0=t, T=t+1, period=self.zperiod)
 
-            z_t, z_t_1 = self.getZScore(t), self.getZScore(t-1)
-            position_t = self.spreadPosition.position
+                z_t, z_t_1 = self.getZScore(t), self.getZScore(t-1)
+                position_t = self.spreadPosition.position
 
-            # Open logic
-            # -----------------------------------------------------------------
-            if (position_t == 0):
-                if (z_t > - self.bw) and (z_t_1 < -self.bw) and (z_t < 0):
-                    # Long Spread
-                    self.openPosition(t, 'L')
+                # Open logic
+                # -------------------------------------------------------------
+                if (position_t == 0):
+                    if (z_t > - self.bw) and (z_t_1 < -self.bw) and (z_t < 0):
+                        # Long Spread
+                        self.openPosition(t, 'L')
 
-                if (z_t < self.bw) and (z_t_1 > self.bw) and (z_t > 0):
-                    # Short Spread
-                    self.openPosition(t, 'S')
-            # -----------------------------------------------------------------
+                    if (z_t < self.bw) and (z_t_1 > self.bw) and (z_t > 0):
+                        # Short Spread
+                        self.openPosition(t, 'S')
+                # -------------------------------------------------------------
 
-            # Close logic
-            # -----------------------------------------------------------------
-            if (position_t == 1):
-                if (z_t >= 0) and (z_t_1 < 0):
-                    self.closePosition(t)
+                # Close logic
+                # -------------------------------------------------------------
+                if (position_t == 1):
+                    if (z_t >= 0) and (z_t_1 < 0):
+                        self.closePosition(t)
 
-            if (position_t == -1):
-                if (z_t <= 0) and (z_t_1 > 0):
-                    self.closePosition(t)
-            # -----------------------------------------------------------------
+                if (position_t == -1):
+                    if (z_t <= 0) and (z_t_1 > 0):
+                        self.closePosition(t)
+                # -------------------------------------------------------------
 
         if (plot):
-            self.plotTrading(t0=t0, T=T)
+            with timing.phase('plotting'):
+                self.plotTrading(t0=t0, T=T)
 
         return self.df['returns'].cumsum().iloc[-1]
 
+    def _tradeCached(self):
+        """
+        Executes the trades of trade() from self.spreads. Flat bars
+        whose z score window holds no held hedge ratio are read from
+        the free running series. The other bars are computed in blocks,
+        which end at the bar a position is opened or closed, so only
+        the bars with a position open, and the zperiod bars after it,
+        are scored for this z score period.
+        """
+        x, y = self.spreads.x, self.spreads.y
+        n, t0, T = len(x), self.zperiod, len(x) - 1
+        free_hr, free_spread, free_z = self.spreads.free(t0)
+
+        # as the first filter run and z score of trade()
+        HR, spread, zscore = np.zeros(n), np.zeros(n), np.zeros(n)
+        warmup = min(t0 + 1, n)
+        HR[:warmup] = self.spreads.runningHedgeRatios(warmup)
+        spread[:warmup] = y[:warmup] - x[:warmup]*HR[:warmup]
+        if t0 < n:
+            zscore[t0] = np.nan
+
+        t, block = t0, _BLOCK
+        held = -1  # last bar with a held hedge ratio
+        last_open = False
+        with timing.phase('bar_loop', bars=max(T - t0, 0)):
+            while t < T:
+                end = min(T, t + block)
+                position_t = self.spreadPosition.position
+                if position_t == 0:
+                    HR[t:end] = free_hr[t:end]
+                    spread[t:end] = free_spread[t:end]
+                    z = free_z[t:end].copy()
+                    scored = min(end, held + t0 + 1)
+                    if scored > t:
+                        with timing.phase('zscore'):
+                            z[:scored - t] = window_zscores(spread, t0, t,
+                                                            scored)
+                else:
+                    # Keep HR const, carry previous value forward.
+                    HR[t:end] = HR[t - 1]
+                    spread[t:end] = y[t:end] - x[t:end]*HR[t:end]
+                    with timing.phase('zscore'):
+                        z = window_zscores(spread, t0, t, end)
+                z_1 = np.concatenate(([zscore[t - 1]], z[:-1]))
+
+                # Open and close logic of trade() on the whole block
+                # -------------------------------------------------------------
+                if position_t == 0:
+                    longs = (z > -self.bw) & (z_1 < -self.bw) & (z < 0)
+                    shorts = (z < self.bw) & (z_1 > self.bw) & (z > 0)
+                    events = longs | shorts
+                elif position_t == 1:
+                    events = (z >= 0) & (z_1 < 0)
+                elif position_t == -1:
+                    events = (z <= 0) & (z_1 > 0)
+                else:
+                    # a fee scaled position is never closed
+                    events = np.zeros(end - t, dtype=bool)
+                # -------------------------------------------------------------
+
+                hits = np.flatnonzero(events)
+                stop = end if len(hits) == 0 else t + hits[0] + 1
+                zscore[t:stop] = z[:stop - t]
+                last_open = position_t != 0
+                if last_open:
+                    held = stop - 1
+                if len(hits) > 0:
+                    e = t + hits[0]
+                    prices = spread[e], x[e], y[e]
+                    if position_t == 0:
+                        self.openPosition(e, 'L' if longs[hits[0]] else 'S',
+                                          prices=prices)
+                    else:
+                        self.closePosition(e, prices=prices, HR=HR[e])
+                    block = _BLOCK
+                else:
+                    block *= 2
+                t = stop
+
+        if t0 < T:
+            # the last bar is filtered with the last traded bar
+            if last_open:
+                HR[T] = HR[T - 1]
+            else:
+                HR[T] = self.spreads.lastHedgeRatio()
+            spread[T] = y[T] - x[T]*HR[T]
+            zscore[T] = np.nan
+
+        with timing.phase('dataframe_write'):
+            self.df['HR'] = HR
+            self.df['spread'] = spread
+            self.df['zscore'] = zscore
+
     def plotSpread(self, t0=0, T=None):
         """
         Plots spread an associated hedge ratio
         """
+        from matplotlib import pyplot as plt
+
         if T == None:
             T = self.df.shape[0]
 
         plt.subplot(311)
-        self.df.loc[t0:T, 'spread'].plot()
+        plot_series(self.df.loc[t0:T, 'spread'])
         plt.plot([t0, T], [0, 0], c='k', ls='--', lw=0.5)
         plt.ylabel(self.name)
         plt.subplot(312)
-        self.df.loc[t0:T, 'zscore'].plot()
+        plot_series(self.df.loc[t0:T, 'zscore'])
         plt.plot([t0, T], [2, 2], c='k', ls='--', lw=0.5)
         plt.plot([t0, T], [-2, -2], c='k', ls='--', lw=0.5)
         plt.ylabel('Z Score')
         plt.subplot(313)
-        self.df.loc[t0:T, 'HR'].plot()
+        plot_series(self.df.loc[t0:T, 'HR'])
         plt.ylabel("Hedge Ratio")
         plt.xlabel("Time (hours)")
-        plt.show()
+        show_or_save()
 
     def plotTrading(self, t0=0, T=None):
         """
         Plots all executed trades
         """
+        from matplotlib import pyplot as plt
 
         if T == None:
             T = self.df.shape[0]
+        trades = self.opentimes + self.closetimes
 
         plt.subplot(411)
-        self.df.loc[t0:T, 'spread'].plot()
-        (expMovingAverage(self.df.loc[t0:T, 'spread'],
-                          self.zperiod).values.plot())
+        plot_series(self.df.loc[t0:T, 'spread'], trades)
+        plot_series(expMovingAverage(self.df.loc[t0:T, 'spread'],
+                                     self.zperiod).values, trades)
         plt.plot([t0, T], [0, 0], c='k', ls='--', lw=0.5)
         plt.ylabel(self.name)
-        [plt.axvline(x, c='g', lw=0.5, ls='--') for x in self.opentimes]
-        [plt.axvline(x, c='r', lw=0.5, ls='--') for x in self.closetimes]
+        trade_markers(self.opentimes, 'g')
+        trade_markers(self.closetimes, 'r')
 
         plt.subplot(412)
-        self.df.loc[t0:T, 'zscore'].plot()
+        plot_series(self.df.loc[t0:T, 'zscore'], trades)
         plt.plot([t0, T], [self.bw, self.bw], c='k', ls='--', lw=0.5)
         plt.plot([t0, T], [-self.bw, -self.bw], c='k', ls='--', lw=0.5)
         plt.plot([t0, T], [0, 0], c='k', ls='--', lw=0.5)
-        [plt.axvline(x, c='g', lw=0.5, ls='--') for x in self.opentimes]
-        [plt.axvline(x, c='r', lw=0.5, ls='--') for x in self.closetimes]
+        trade_markers(self.opentimes, 'g')
+        trade_markers(self.closetimes, 'r')
         plt.ylabel('Z Score')
 
         plt.subplot(413)
-        self.df.loc[t0:T, 'HR'].plot()
-        [plt.axvline(x, c='g', lw=0.5, ls='--') for x in self.opentimes]
-        [plt.axvline(x, c='r', lw=0.5, ls='--') for x in self.closetimes]
+        plot_series(self.df.loc[t0:T, 'HR'], trades)
+        trade_markers(self.opentimes, 'g')
+        trade_markers(self.closetimes, 'r')
         plt.ylabel("Hedge Ratio")
 
         plt.subplot(414)
         returns = self.df.loc[t0:T, 'returns'].cumsum()*100
-        returns.plot()
+        plot_series(returns, trades)
         plt.ylabel('Returns (%)')
         plt.xlabel('Hours')
-        plt.show()
+        show_or_save()
@@ -0,0 +1,394 @@
+"""
+Precomputes the parts of pairsTrader that do not depend on its z score
+period or bandwidth, so a grid of pairsTraders over the same pair only
+filters the pair once.
+
+While no position is open pairsTrader restarts its Kalman filter from
+the prior every bar, so the hedge ratio of each such bar is one filter
+step from the prior on that bar's smoothed prices, whatever the grid
+cell. pairSpread holds these free running hedge ratios with the spreads
+and z scores they give. A grid cell reads them for its flat bars and
+only computes the bars whose hedge ratio is held by an open position,
+and the z scores of windows containing them. spreadCache keeps recently
+used pairSpreads, keyed by pair and data fingerprint, within a memory
+bound.
+
+regressionSpread gives the same series for the rolling regression hedge
+ratios of hedge_ratios.py, which never depend on the trading either.
+
+Example usage:
+```
+cache = spreadCache(max_bytes=2**28)
+for zperiod, bandwidth in grid:
+    strategy = pairsTrader(x, y, 'ETH', 'NEO', zperiod, bandwidth,
+                           spread_cache=cache)
+    strategy.trade()
+```
+"""
+
+import collections
+import numpy as np
+import pandas as pd
+
+from ..types.exponential_moving_average import expMovingAverage
+from ..sweeps.results_store import data_fingerprint
+from ..types.numerics import (kf_predict, kf_correct, KF_MEAN, KF_COV,
+                              KF_SCALE, INV_COND_TOL)
+from ..streaming.indicators import window_zscore
+from .batch_kalman import _kf_batch_prior, _kf_batch_correct
+from .hedge_ratios import rolling_ols_hedge_ratios, ewma_hedge_ratios
+from ..instrumentation import timing
+
+_CACHE_BYTES = 64*2**20
+
+# Regression estimators of regressionSpread
+_ESTIMATORS = {'ols': rolling_ols_hedge_ratios, 'ewma': ewma_hedge_ratios}
+
+
+class pairSpread():
+    """
+    Free running hedge ratios, spreads and z scores of a pair.
+
+    Initialisation:
+    - x, y:             (pandas Series) price series of the pair
+
+    Members:
+    - self.x, self.y:   (np array, float) price series
+    - self.xMA, yMA:    (pandas Series) smoothed prices, as pairsTrader
+    - self.step_hr:     (np array, float) hedge ratio of one filter step
+                        from the prior on each bar
+    - self.nbytes:      (int) bytes of the arrays held
+    """
+
+    def __init__(self, x, y):
+        with timing.phase('indicators'):
+            self.xMA = expMovingAverage(x, 10).values
+            self.yMA = expMovingAverage(y, 10).values
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        # pairsTrader scales the smoothed prices to avoid underflow
+        self._xs = self.xMA.to_numpy(dtype=np.float64)*KF_SCALE
+        self._ys = self.yMA.to_numpy(dtype=np.float64)*KF_SCALE
+
+        with timing.phase('kalman_filter'):
+            # each bar is one correction from the prior, so the bars are
+            # filtered as a batch of independent filters
+            mean, cov = _kf_batch_prior(len(self._xs))
+            mean, _ = _kf_batch_correct(mean, cov, self._xs, self._ys)
+            self.step_hr = mean[:, 0].copy()
+        self._running = []
+        self._filter = None
+        self._free = {}
+
+    @property
+    def nbytes(self):
+        arrays = [self.x, self.y, self._xs, self._ys, self.step_hr]
+        arrays += [array for free in self._free.values() for array in free]
+        return (sum(array.nbytes for array in arrays)
+                + 2*self.xMA.nbytes + 8*len(self._running))
+
+    def runningHedgeRatios(self, n):
+        """
+        Returns the hedge ratios of one filter run over the first n bars,
+        as pairsTrader filters its first zperiod + 1 bars.
+        """
+        with timing.phase('kalman_filter'):
+            while len(self._running) < n:
+                t = len(self._running)
+                if self._filter is None:
+                    mean, cov = KF_MEAN, KF_COV
+                else:
+                    mean, cov = kf_predict(*self._filter)
+                self._filter = kf_correct(mean, cov, self._xs[t],
+                                           self._ys[t])
+                self._running.append(self._filter[0][0])
+        return np.array(self._running[:n], dtype=np.float64)
+
+    def lastHedgeRatio(self):
+        """
+        Returns the hedge ratio of the last bar from a filter started
+        from the prior at the bar before, as pairsTrader filters its
+        last bar.
+        """
+        t = len(self.x) - 2
+        mean, cov = kf_correct(KF_MEAN, KF_COV, self._xs[t], self._ys[t])
+        mean, cov = kf_predict(mean, cov)
+        return kf_correct(mean, cov, self._xs[t + 1], self._ys[t + 1])[0][0]
+
+    def free(self, zperiod):
+        """
+        Returns the hedge ratios, spreads and z scores of every bar when
+        no position is ever open, for a z score period.
+
+        Outputs:
+        - hedge_ratios:     (np array, float)
+        - spreads:          (np array, float)
+        - zscores:          (np array, float) NaN before bar zperiod
+        """
+        if zperiod not in self._free:
+            n = len(self.x)
+            hedge_ratios = self.step_hr.copy()
+            warmup = min(zperiod, n)
+            hedge_ratios[:warmup] = self.runningHedgeRatios(warmup)
+            spreads = self.y - self.x*hedge_ratios
+            zscores = np.full(n, np.nan)
+            if zperiod < n:
+                with timing.phase('zscore'):
+                    zscores[zperiod:] = window_zscores(spreads, zperiod,
+                                                       zperiod, n)
+            self._free[zperiod] = (hedge_ratios, spreads, zscores)
+        return self._free[zperiod]
+
+
+class regressionSpread(pairSpread):
+    """
+    Hedge ratios of a rolling regression of a pair's smoothed prices,
+    with the spreads and z scores they give. Every bar's hedge ratio
+    is the regression up to that bar, so the first bars and the last
+    are read as any other.
+
+    Initialisation:
+    - x, y:             (pandas Series) price series of the pair
+    - estimator:        (str) 'ols' for rolling_ols_hedge_ratios or
+                        'ewma' for ewma_hedge_ratios
+    - window:           (int) regression window of the estimator
+
+    Members:
+    - self.x, self.y:   (np array, float) price series
+    - self.xMA, yMA:    (pandas Series) smoothed prices, as pairsTrader
+    - self.step_hr:     (np array, float) hedge ratio of each bar
+    - self.nbytes:      (int) bytes of the arrays held
+    """
+
+    def __init__(self, x, y, estimator, window):
+        if estimator not in _ESTIMATORS:
+            raise ValueError("Hedge ratio estimator not recognised")
+
+        with timing.phase('indicators'):
+            self.xMA = expMovingAverage(x, 10).values
+            self.yMA = expMovingAverage(y, 10).values
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        with timing.phase('hedge_ratio'):
+            self.step_hr = _ESTIMATORS[estimator](self.xMA, self.yMA, window)
+        self._free = {}
+
+    @property
+    def nbytes(self):
+        arrays = [self.x, self.y, self.step_hr]
+        arrays += [array for free in self._free.values() for array in free]
+        return sum(array.nbytes for array in arrays) + 2*self.xMA.nbytes
+
+    def runningHedgeRatios(self, n):
+        return self.step_hr[:n].copy()
+
+    def lastHedgeRatio(self):
+        return self.step_hr[-1]
+
+
+class spreadCache():
+    """
+    Least recently used pairSpreads, keyed by the pair's symbols and a
+    fingerprint of its prices, held within a memory bound.
+
+    Initialisation:
+    - max_bytes:        (int) bytes of pairSpreads kept. The bound is
+                        applied on each get, never evicting the pair
+                        returned.
+
+    Members:
+    - self.hits:        (int) gets answered from the cache
+    - self.misses:      (int) gets that computed a new pairSpread
+    """
+
+    def __init__(self, max_bytes=_CACHE_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._spreads = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._spreads)
+
+    @property
+    def nbytes(self):
+        return sum(spread.nbytes for spread in self._spreads.values())
+
+    def get(self, x, y, asset1, asset2, estimator='kalman', window=None):
+        """
+        Returns the pairSpread of price series x, y, or the
+        regressionSpread of a regression estimator and window, computing
+        it if it is not cached.
+        """
+        prices = pd.DataFrame({'x': np.asarray(x), 'y': np.asarray(y)})
+        key = (asset1, asset2, estimator, window, data_fingerprint(prices))
+        if key in self._spreads:
+            self.hits += 1
+            self._spreads.move_to_end(key)
+        else:
+            self.misses += 1
+            if estimator == 'kalman':
+                spread = pairSpread(x, y)
+            else:
+                spread = regressionSpread(x, y, estimator, window)
+            self._spreads[key] = spread
+
+        while len(self._spreads) > 1 and self.nbytes > self.max_bytes:
+            self._spreads.popitem(last=False)
+        return self._spreads[key]
+
+    def clear(self):
+        self._spreads.clear()
+
+
+def window_zscores(values, period, start, end):
+    """
+    Returns window_zscore(values[t - period:t + 1], period) for every t
+    in [start, end), with the operations of rollingMean and
+    rollingVariance applied to all windows at once.
+
+    Inputs:
+    - values:           (np array, float) series, e.g. a spread
+    - period:           (int) lookback period for z score
+    - start, end:       (int) bars scored, start >= period
+    """
+    if start < period:
+        raise ValueError("start must be at least period")
+    if end <= start:
+        return np.zeros(0)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        values[start - period:end], period + 1)
+    scalar = np.isnan(windows).any(axis=1)
+    if period == 1:
+        scalar[:] = True
+    zscores = np.empty(len(windows))
+    # NaN windows follow the scalar path
+    zscores[scalar] = [window_zscore(window, period)
+                       for window in windows[scalar]]
+    if not scalar.all():
+        zscores[~scalar] = _window_zscores(windows[~scalar], period)
+    return zscores
+
+
+def _window_zscores(windows, period):
+    mean = _window_means(windows, period)
+    var = _window_variances(windows, period)
+    last = windows[:, period]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.where(var > 0, np.sqrt(np.where(var > 0, var, 0.0)), 0.0)
+        diff = last - mean
+        zscores = diff/std
+        zero = np.where((diff == 0) | np.isnan(diff), np.nan,
+                        np.copysign(np.inf, diff))
+    zscores = np.where(std == 0, zero, zscores)
+    return np.where(np.isnan(var) | np.isnan(mean), np.nan, zscores)
+
+
+# Vectorised rollingMean and rollingVariance over windows of period + 1
+# values, started afresh at the first value of each window.
+# These mirror roll_mean (add_mean, remove_mean, calc_mean) and roll_var
+# (add_var, remove_var, calc_var) of pandas/_libs/window/aggregations.pyx
+# as of pandas 3.0 (checked against 3.0.6): the Kahan compensations, the
+# negative and repeated value counts and the recompute of ill-conditioned
+# variances. A pandas release changing those functions breaks the exact
+# match with the uncached pairsTrader, see test_pandas_rolling.
+# -----------------------------------------------------------------------------
+def _window_means(windows, period):
+    first = windows[:, 0]
+    total = np.zeros(len(windows))
+    comp = np.zeros(len(windows))
+    neg = np.zeros(len(windows), dtype=np.int64)
+    same = np.zeros(len(windows), dtype=np.int64)
+    prev = first
+
+    def add(x, total, comp, neg, same, prev):
+        y = x - comp
+        t = total + y
+        comp = t - total - y
+        neg = neg + np.signbit(x)
+        same = np.where(x == prev, same + 1, 1)
+        return t, comp, neg, same, x
+
+    for k in range(period):
+        total, comp, neg, same, prev = add(windows[:, k], total, comp, neg,
+                                           same, prev)
+    # the first value leaves the window as the last one enters
+    total = total + (-first - 0.0)
+    neg = neg - np.signbit(first)
+    total, comp, neg, same, prev = add(windows[:, period], total, comp, neg,
+                                       same, prev)
+
+    mean = total/period
+    mean = np.where(((neg == 0) & (mean < 0)) | ((neg == period) & (mean > 0)),
+                    0.0, mean)
+    return np.where(same >= period, prev, mean)
+
+
+class _windowVariance():
+    """
+    rollingVariance state of many windows.
+    """
+
+    def __init__(self, size):
+        self.nobs = 0
+        self.mean = np.zeros(size)
+        self.ssqdm = np.zeros(size)
+        self.add_comp = np.zeros(size)
+        self.remove_comp = np.zeros(size)
+        self.unstable = np.zeros(size, dtype=bool)
+
+    def add(self, x):
+        prev_m2 = self.ssqdm
+        self.nobs += 1
+        prev_mean = self.mean - self.add_comp
+        y = x - self.add_comp
+        t = y - self.mean
+        self.add_comp = t + self.mean - y
+        self.mean = self.mean + t/self.nobs
+        self.ssqdm = self.ssqdm + (x - prev_mean)*(x - self.mean)
+        self.unstable |= prev_m2*INV_COND_TOL > self.ssqdm
+
+    def remove(self, x):
+        prev_m2 = self.ssqdm
+        self.nobs -= 1
+        prev_mean = self.mean - self.remove_comp
+        y = x - self.remove_comp
+        t = y - self.mean
+        self.remove_comp = t + self.mean - y
+        self.mean = self.mean - t/self.nobs
+        self.ssqdm = self.ssqdm - (x - prev_mean)*(x - self.mean)
+        self.unstable |= prev_m2*INV_COND_TOL > self.ssqdm
+
+    def rebuild(self, values):
+        """
+        Rebuilds the sums of the unstable windows from their values,
+        oldest first.
+        """
+        rows = np.flatnonzero(self.unstable)
+        if len(rows) == 0:
+            return
+        sub = _windowVariance(len(rows))
+        for k in range(values.shape[1]):
+            sub.add(values[rows, k])
+        self.mean[rows] = sub.mean
+        self.ssqdm[rows] = sub.ssqdm
+        self.add_comp[rows] = sub.add_comp
+        self.remove_comp[rows] = 0.0
+        self.unstable[:] = False
+
+
+def _window_variances(windows, period):
+    state = _windowVariance(len(windows))
+    state.add(windows[:, 0])
+    state.unstable[:] = False
+    for k in range(1, period):
+        state.add(windows[:, k])
+        state.rebuild(windows[:, :k + 1])
+    state.remove(windows[:, 0])
+    state.add(windows[:, period])
+    state.rebuild(windows[:, 1:])
+    return state.ssqdm/(state.nobs - 1)
+# -----------------------------------------------------------------------------
@@ -1,8 +1,13 @@
-from matplotlib import pyplot as plt
+import numpy as np
 import pandas as pd
 
 from .abstract_MA import movingAverageTrader
+from ..types.position import Position
+from . import event_kernels as kernels
 from ..types.zscore import zScore
+from ..instrumentation import timing, memory
+from ..reporting.plotting import (plot_series, trade_markers,
+                                  show_or_save)
 
 
 class zScoreTrader(movingAverageTrader):
@@ -27,10 +32,16 @@ class zScoreTrader(movingAverageTrader):
                         to determine the trend
     - zscore_period:    lookback period for calculating z score
     - bandwidth:        bandwidth of zscore values on which trading
-                        logic is executed.
+                        logic is executed. A list of bandwidths runs
+                        one state machine per bandwidth over the same
+                        indicators, see trade.
     - fast_MA:          A MA period shorter than slow_MA that will
                         determine trend. If not specified period=0
                         (i.e. spotprice is used)
+    - event_skipping:   (bool) if True trade only visits the bars where
+                        a position opens or closes, found with
+                        vectorised comparisons, rather than every bar.
+                        Trades and returns are identical.
 
     Members:
     - self.df:          df (see initialisation)
@@ -47,24 +58,41 @@ class zScoreTrader(movingAverageTrader):
     - self.bandwidth:   (float) bandwidth for trading logic
     - self.opentimes:   (list, int) holds indeces of trade opening times
     - self.closetimes:  (list, int) holds indeces of trade closing times
+    - self.events:      (int) number of bars visited by the last trade
+    - self.bandwidths:  (np array, float) bandwidths if a list was given,
+                        otherwise None
+    - self.returns:     (np array, float) with several bandwidths, trade
+                        returns at closing bars, one column per
+                        bandwidth. opentimes and closetimes then hold a
+                        list per bandwidth.
 
     Notes:
     - Currently designed to only open one positon at a time
     """
 
     def __init__(self, df, asset_symbol, MA_type, slow_MA, zscore_period,
-                 bandwidth, fast_MA=1, trading_fee=0.0):
+                 bandwidth, fast_MA=1, trading_fee=0.0,
+                 event_skipping=False):
         if not isinstance(zscore_period, int) or zscore_period <= 0:
             raise ValueError("Z score period must be positive integer")
 
         args = (df, asset_symbol, MA_type, slow_MA)
         kwargs = {"fast_MA": fast_MA, "trading_fee": trading_fee}
-        super(zScoreTrader, self).__init__(*args, **kwargs)
-
-        self.zscore = zScore(df[self.sym], zscore_period)
+        with memory.measure('construct.zscore'):
+            super(zScoreTrader, self).__init__(*args, **kwargs)
+            with timing.phase('indicators'):
+                self.zscore = zScore(df[self.sym], zscore_period)
         self.bandwith = bandwidth
+        self.bandwidths = None
+        if np.ndim(bandwidth) > 0:
+            self.bandwidths = np.asarray(bandwidth, dtype=np.float64).ravel()
+            if self.bandwidths.size == 0:
+                raise ValueError("bandwidth must have at least one value")
+        self.event_skipping = event_skipping
         self.opentimes = []
         self.closetimes = []
+        self.returns = None
+        self.events = 0
 
     def trade(self, plot=False):
         """
@@ -73,51 +101,189 @@ class zScoreTrader(movingAverageTrader):
 
         Inputs:
         - plot:             (bool) optional arg to plot trading results
+
+        Outputs:
+        - cum_returns:      (float) cumulative returns, or with several
+                            bandwidths an (bandwidths,) np array of them
+
+        Notes:
+        - Several bandwidths are always traded by event skipping and
+        their trading cannot be plotted.
         """
 
+        if self.bandwidths is not None:
+            if plot:
+                raise ValueError("Can only plot trading of one bandwidth")
+            return self._tradeBandwidths()
+
         self.opentimes = []
         self.closetimes = []
+        self.events = 0
+
+        if self.event_skipping:
+            prices = self.df[self.sym].to_numpy(dtype=np.float64)
+            returns = np.zeros(self.df.shape[0])
+            self.opentimes, self.closetimes = self._tradeEvents(
+                self.bandwith, self.position, prices, returns)
+            with timing.phase('dataframe_write'):
+                self.df['returns'] = returns
+            if plot:
+                with timing.phase('plotting'):
+                    self.plotTrading()
+            return self.df['returns'].cumsum().iloc[-1]
+
+        t0 = self.slowMA.period
+        self.events = max(self.df.shape[0] - t0, 0)
+        with timing.phase('bar_loop', bars=self.events):
+            for t in range(t0, self.df.shape[0]):
+                slowMA_t = self.slowMA.getValue(t)
+                fastMA_t = self.fastMA.getValue(t)
+                Z_t = self.zscore.getValue(t)
+                Z_t_1 = self.zscore.getValue(t-1)
+
+                if fastMA_t > slowMA_t:
+                    uptrend = True
+                else:
+                    uptrend = False
 
-        for t in range(self.slowMA.period, self.df.shape[0]):
-            slowMA_t = self.slowMA.getValue(t)
-            fastMA_t = self.fastMA.getValue(t)
-            Z_t = self.zscore.getValue(t)
-            Z_t_1 = self.zscore.getValue(t-1)
-
-            if fastMA_t > slowMA_t:
-                uptrend = True
-            else:
-                uptrend = False
-
-            # Open position logic
-            # -----------------------------------------------------------------
-            if uptrend and self.position.position == 0:
-                if Z_t > -self.bandwith and Z_t_1 < -self.bandwith:
-                    self.openPosition(t, 'L')
-                    self.opentimes.append(t)
-
-            if not uptrend and self.position.position == 0:
-                if Z_t < self.bandwith and Z_t_1 > self.bandwith:
-                    self.openPosition(t, 'S')
-                    self.opentimes.append(t)
-            # -----------------------------------------------------------------
-
-            # Close position logic
-            # -----------------------------------------------------------------
-            if self.position.position == 1 and Z_t > 0 and Z_t_1 < 0:
-                self.closePosition(t)
-                self.closetimes.append(t)
-
-            if self.position.position == -1 and Z_t < 0 and Z_t_1 > 0:
-                self.closePosition(t)
-                self.closetimes.append(t)
-            # -----------------------------------------------------------------
+                # Open position logic
+                # -------------------------------------------------------------
+                if uptrend and self.position.position == 0:
+                    if Z_t > -self.bandwith and Z_t_1 < -self.bandwith:
+                        self.openPosition(t, 'L')
+                        self.opentimes.append(t)
+
+                if not uptrend and self.position.position == 0:
+                    if Z_t < self.bandwith and Z_t_1 > self.bandwith:
+                        self.openPosition(t, 'S')
+                        self.opentimes.append(t)
+                # -------------------------------------------------------------
+
+                # Close position logic
+                # -------------------------------------------------------------
+                if self.position.position == 1 and Z_t > 0 and Z_t_1 < 0:
+                    self.closePosition(t)
+                    self.closetimes.append(t)
+
+                if self.position.position == -1 and Z_t < 0 and Z_t_1 > 0:
+                    self.closePosition(t)
+                    self.closetimes.append(t)
+                # -------------------------------------------------------------
 
         if plot:
-            self.plotTrading()
+            with timing.phase('plotting'):
+                self.plotTrading()
 
         return self.df['returns'].cumsum().iloc[-1]
 
+    def eventTimes(self, bandwidth=None):
+        """
+        Finds every bar from the slow MA period where a position could
+        open or close: z score crossings of -bandwidth upwards in an
+        uptrend, of +bandwidth downwards in a downtrend and of zero.
+        The trend only gates openings, so its flips are folded into
+        the band crossings rather than visited on their own.
+
+        Inputs:
+        - bandwidth:        (float) optional bandwidth, defaults to the
+                            strategy's
+
+        Outputs:
+        - index:            (np array, int) candidate bars
+        - codes:            (np array, int) bitmask of
+                            event_kernels.LONG_OPEN, SHORT_OPEN,
+                            LONG_CLOSE and SHORT_CLOSE for each bar
+        """
+        with timing.phase('events'):
+            return kernels.zscore_events(
+                self.fastMA.values.to_numpy(dtype=float),
+                self.slowMA.values.to_numpy(dtype=float),
+                self.zscore.values.to_numpy(dtype=float),
+                self.bandwith if bandwidth is None else bandwidth,
+                self.slowMA.period)
+
+    def _tradeEvents(self, bandwidth, position, prices, returns):
+        """
+        Runs the trading logic of trade for one bandwidth over the bars
+        of eventTimes only. While flat the next opening is jumped to
+        and while in a position the next crossing of zero that closes
+        it, so the loop costs O(trades) after the vectorised
+        comparisons.
+
+        Inputs:
+        - bandwidth:        (float) bandwidth for trading logic
+        - position:         (Position) position traded
+        - prices:           (np array) asset prices
+        - returns:          (np array) trade returns are stored at the
+                            closing bars
+
+        Outputs:
+        - opentimes:        (list, int) bars positions were opened
+        - closetimes:       (list, int) bars positions were closed
+        """
+        index, codes = self.eventTimes(bandwidth)
+        opening = kernels.LONG_OPEN | kernels.SHORT_OPEN
+        opens = index[(codes & opening) != 0]
+        closes = {1: index[(codes & kernels.LONG_CLOSE) != 0],
+                  -1: index[(codes & kernels.SHORT_CLOSE) != 0]}
+
+        opentimes, closetimes = [], []
+        t = 0
+        with timing.phase('event_loop', bars=len(index)):
+            while True:
+                # Open position logic
+                # -------------------------------------------------------------
+                i = np.searchsorted(opens, t)
+                if i == len(opens):
+                    break
+                t = int(opens[i])
+                code = codes[np.searchsorted(index, t)]
+                pos_type = 'L' if code & kernels.LONG_OPEN else 'S'
+                with timing.phase('position'):
+                    position.open(prices[t], pos_type, fee=self.trading_fee)
+                opentimes.append(t)
+                # -------------------------------------------------------------
+
+                # Close position logic
+                # -------------------------------------------------------------
+                # a fee scaled position is never +-1 so is never closed
+                if position.position not in closes:
+                    break
+                closing = closes[position.position]
+                i = np.searchsorted(closing, t)
+                if i == len(closing):
+                    break
+                t = int(closing[i])
+                with timing.phase('position'):
+                    position.close(prices[t], fee=self.trading_fee)
+                returns[t] = position.tradereturn
+                closetimes.append(t)
+                # -------------------------------------------------------------
+
+                # the close bar was checked for openings with a position
+                t += 1
+
+        self.events += len(opentimes) + len(closetimes)
+        return opentimes, closetimes
+
+    def _tradeBandwidths(self):
+        """
+        Trades every bandwidth of self.bandwidths from a fresh position
+        over the indicators computed once on construction.
+        """
+        prices = self.df[self.sym].to_numpy(dtype=np.float64)
+        self.returns = np.zeros((self.df.shape[0], len(self.bandwidths)))
+        self.opentimes, self.closetimes = [], []
+        self.events = 0
+
+        for k, bandwidth in enumerate(self.bandwidths.tolist()):
+            opentimes, closetimes = self._tradeEvents(
+                bandwidth, Position(), prices, self.returns[:, k])
+            self.opentimes.append(opentimes)
+            self.closetimes.append(closetimes)
+
+        return self.returns.cumsum(axis=0)[-1]
+
     def plotTrading(self):
         """
         Plots the executed trading.
@@ -133,6 +299,7 @@ class zScoreTrader(movingAverageTrader):
         - Will only open longs in uptrend (spotprice > longer MA)
         and only enter shorts in downtrend (spotprice < longer MA)
         """
+        from matplotlib import pyplot as plt
 
         bw = self.bandwith
         t0 = self.slowMA.period
@@ -140,30 +307,33 @@ class zScoreTrader(movingAverageTrader):
         zscore_MA = (self.df[self.sym]
                      .rolling(window=self.zscore.period)
                      .mean())
+        trades = self.opentimes + self.closetimes
 
         plt.subplot(311)
-        self.df.loc[t0:T, self.sym].plot(label=self.sym)
-        self.slowMA.values.loc[t0:T].plot(label=self.slowMA.name)
-        zscore_MA.loc[t0:T].plot(label=self.zscore.name)
+        plot_series(self.df.loc[t0:T, self.sym], trades, label=self.sym)
+        plot_series(self.slowMA.values.loc[t0:T], trades,
+                    label=self.slowMA.name)
+        plot_series(zscore_MA.loc[t0:T], trades, label=self.zscore.name)
         if self.fastMA.period > 1:
-            self.fastMA.values.loc[t0:T].plot(label=self.fastMA.name)
+            plot_series(self.fastMA.values.loc[t0:T], trades,
+                        label=self.fastMA.name)
         plt.ylabel('{}/BTC'.format(self.sym))
-        [plt.axvline(x, c='g', lw=0.5, ls='--') for x in self.opentimes]
-        [plt.axvline(x, c='r', lw=0.5, ls='--') for x in self.closetimes]
+        trade_markers(self.opentimes, 'g')
+        trade_markers(self.closetimes, 'r')
         plt.legend()
 
         plt.subplot(312)
-        self.zscore.values.loc[t0:T].plot()
+        plot_series(self.zscore.values.loc[t0:T], trades)
         plt.plot([t0, T], [bw, bw], c='k', ls='--', lw=0.5)
         plt.plot([t0, T], [-bw, -bw], c='k', ls='--', lw=0.5)
         plt.plot([t0, T], [0, 0], c='k', ls='--', lw=0.5)
-        [plt.axvline(x, c='g', lw=0.5, ls='--') for x in self.opentimes]
-        [plt.axvline(x, c='r', lw=0.5, ls='--') for x in self.closetimes]
+        trade_markers(self.opentimes, 'g')
+        trade_markers(self.closetimes, 'r')
         plt.ylabel('Z Score')
 
         plt.subplot(313)
         returns = self.df.loc[t0:T, 'returns'].cumsum()*100
-        returns.plot()
+        plot_series(returns, trades)
         plt.ylabel('Returns (%)')
         plt.xlabel('Hours')
-        plt.show()
+        show_or_save()
@@ -1,3 +1,5 @@
+from .instrumentation import timing
+
 
 class backtest():
     """
@@ -35,6 +37,7 @@ class backtest():
         zscore_trading_strategy.py for more details.
         """
 
-        cum_returns = self._strategy.trade(plot=self.plot_results)
+        with timing.phase('backtest.trade'):
+            cum_returns = self._strategy.trade(plot=self.plot_results)
 
         return cum_returns
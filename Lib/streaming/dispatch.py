@@ -0,0 +1,71 @@
+"""
+Subscriptions of streaming strategies shared by liveFeed and rawReplay:
+bars of several symbols are combined into one on_bar call per time, and
+the feed to decision latency of each bar is recorded.
+
+Example usage:
+```
+sub = barSubscription(strategy, strategy_symbols(strategy), callback)
+sub.add('ETH', bar_time, close, time.perf_counter(), latency)
+p50, p99 = latency_percentiles(latency['ETH'])
+```
+"""
+
+import time
+
+import numpy as np
+
+
+class barSubscription():
+    """
+    A strategy subscribed to a liveFeed or rawReplay and its incomplete
+    bars.
+    """
+
+    def __init__(self, strategy, symbols, callback):
+        self.strategy = strategy
+        self.symbols = list(symbols)
+        self.callback = callback
+        self.last_time = None
+        self._pending = {}  # time: {symbol: (close, received)}
+
+    def add(self, symbol, bar_time, close, received, latency):
+        if self.last_time is not None and bar_time <= self.last_time:
+            return
+        bar = self._pending.setdefault(bar_time, {})
+        bar[symbol] = (close, received)
+        if len(bar) < len(self.symbols):
+            return
+
+        # complete, earlier incomplete bars can no longer be traded
+        for pending_time in [t for t in self._pending if t <= bar_time]:
+            del self._pending[pending_time]
+        self.last_time = bar_time
+        prices = {sym: value[0] for sym, value in bar.items()}
+        orders = self.strategy.on_bar(bar_time, prices)
+        decided = time.perf_counter()
+        for sym, value in bar.items():
+            latency[sym].append(decided - value[1])
+        if orders and self.callback is not None:
+            self.callback(self.strategy, orders)
+
+
+def latency_percentiles(samples):
+    """
+    p50 and p99 in ms of latencies in seconds, NaN if there are none.
+    """
+    if len(samples) == 0:
+        return np.nan, np.nan
+    p50, p99 = np.percentile(np.array(samples)*1e3, [50, 99])
+    return float(p50), float(p99)
+
+
+def strategy_symbols(strategy):
+    """
+    Symbols traded by a streaming strategy.
+    """
+    if hasattr(strategy, 'xsym'):
+        return [strategy.xsym, strategy.ysym]
+    if hasattr(strategy, 'sym'):
+        return [strategy.sym]
+    raise ValueError("Strategy symbols not known, pass symbols")
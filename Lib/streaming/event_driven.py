@@ -0,0 +1,539 @@
+"""
+Event driven versions of the crossover, z score and pairs strategies
+for paper trading.
+
+A strategy receives one bar at a time through on_bar(timestamp, prices)
+and returns the orders it executed on that bar. Indicators are updated
+in O(1) (see indicators.py) and only a fixed window of recent values is
+kept, so memory stays constant however many bars are streamed. Fed a
+whole history the strategies take the same trades at the same bars and
+end with the same cumulative returns as the batch trade() methods,
+except that pairsTrader.trade() never trades the final bar of its
+history: pairsStream matches it fed every bar but the last.
+
+Example usage:
+```
+strategy = crossoverStream('ETH', 'SMA', 40, fast_MA=10)
+for timestamp, prices in feed:
+    for order in strategy.on_bar(timestamp, prices):
+        broker.send(order)
+print(strategy.cum_returns)
+```
+"""
+
+import abc
+import collections
+
+import numpy as np
+
+from .indicators import (rollingMean, expWeightedMean, rollingZScore,
+                         window_zscore)
+from ..types.position import Position
+from ..types.numerics import (kf_predict, kf_correct, KF_MEAN, KF_COV,
+                              KF_SCALE)
+
+
+class order():
+    """
+    An order executed by a streaming strategy.
+
+    Members:
+    - self.timestamp:   timestamp of the bar the order was executed on
+    - self.symbol:      (str) asset traded
+    - self.action:      (str) 'open' or 'close'
+    - self.side:        (str) 'L' or 'S', side of the position opened
+                        or closed
+    - self.price:       (float) execution price
+    """
+
+    __slots__ = ('timestamp', 'symbol', 'action', 'side', 'price')
+
+    def __init__(self, timestamp, symbol, action, side, price):
+        self.timestamp = timestamp
+        self.symbol = symbol
+        self.action = action
+        self.side = side
+        self.price = price
+
+    def __eq__(self, other):
+        return (isinstance(other, order)
+                and all(getattr(self, name) == getattr(other, name)
+                        for name in self.__slots__))
+
+    def __repr__(self):
+        return "order({!r}, {!r}, {!r}, {!r}, {!r})".format(
+            self.timestamp, self.symbol, self.action, self.side, self.price)
+
+
+class barStrategy(metaclass=abc.ABCMeta):
+    """
+    Base class of event driven strategies.
+
+    Initialisation:
+    - ledger_size:      (int) number of closed trades kept in the ledger
+
+    Members:
+    - self.bars:        (int) number of bars received
+    - self.cum_returns: (float) sum of closed trade returns, as returned
+                        by the batch trade()
+    - self.num_trades:  (int) number of closed trades
+    - self.ledger:      (deque) (timestamp, trade return) of the latest
+                        closed trades
+    - self.last_timestamp: timestamp of the latest bar received
+
+    Notes:
+    - getState() and setState() save and restore everything needed to
+    carry on from the latest bar, see snapshots.py.
+    """
+
+    def __init__(self, ledger_size=1000):
+        if not isinstance(ledger_size, int) or ledger_size < 0:
+            raise ValueError("ledger_size must be a non negative int")
+
+        self.bars = 0
+        self.last_timestamp = None
+        self.cum_returns = 0.0
+        self.num_trades = 0
+        self.ledger = collections.deque(maxlen=ledger_size)
+
+    def _recordTrade(self, timestamp, tradereturn):
+        """
+        Adds a closed trade's return to the running totals and ledger.
+        """
+        self.cum_returns += tradereturn
+        self.num_trades += 1
+        self.ledger.append((timestamp, tradereturn))
+
+    def params(self):
+        """
+        Returns the keyword arguments the strategy was constructed with.
+        """
+        return {'ledger_size': self.ledger.maxlen}
+
+    def getState(self):
+        """
+        Returns the strategy's state as a dict of numbers, strings and
+        lists.
+        """
+        return {'bars': self.bars, 'last_timestamp': self.last_timestamp,
+                'cum_returns': self.cum_returns,
+                'num_trades': self.num_trades,
+                'ledger_times': [t for t, _ in self.ledger],
+                'ledger_returns': [r for _, r in self.ledger]}
+
+    def setState(self, state):
+        """
+        Restores a state returned by getState.
+        """
+        self.bars = state['bars']
+        self.last_timestamp = state['last_timestamp']
+        self.cum_returns = state['cum_returns']
+        self.num_trades = state['num_trades']
+        self.ledger.clear()
+        self.ledger.extend(zip(state['ledger_times'],
+                               state['ledger_returns']))
+
+    @abc.abstractmethod
+    def on_bar(self, timestamp, prices):
+        """
+        Processes the next bar and returns the orders executed on it.
+
+        Inputs:
+        - timestamp:        time of the bar, any type
+        - prices:           (dict like) symbol: price of the bar
+
+        Outputs:
+        - orders:           (list, order) empty if nothing was traded
+        """
+
+
+class _singleAssetStream(barStrategy):
+    """
+    Shared position handling of the single asset strategies, as in
+    movingAverageTrader.
+    """
+
+    def __init__(self, asset_symbol, MA_type, slow_MA, fast_MA=1,
+                 trading_fee=0.0, ledger_size=1000):
+        if not isinstance(asset_symbol, str):
+            raise ValueError("asset symbol must be a string")
+        if slow_MA < fast_MA:
+            raise ValueError("Slower MA must have the shorter period")
+        if MA_type != "EMA" and MA_type != "SMA":
+            raise ValueError("MA type not supported. Try 'SMA' or 'EMA")
+        if trading_fee < 0 or trading_fee > 1:
+            raise ValueError("Trading fee must be between 0 and 1.")
+        super(_singleAssetStream, self).__init__(ledger_size=ledger_size)
+
+        self.sym = asset_symbol
+        self.MA_type = MA_type
+        self.trading_fee = trading_fee
+        self.position = Position()
+        indicator = rollingMean if MA_type == 'SMA' else expWeightedMean
+        self.fastMA = indicator(fast_MA)
+        self.slowMA = indicator(slow_MA)
+
+    def params(self):
+        params = super(_singleAssetStream, self).params()
+        params.update(asset_symbol=self.sym, MA_type=self.MA_type,
+                      slow_MA=self.slowMA.period, fast_MA=self.fastMA.period,
+                      trading_fee=self.trading_fee)
+        return params
+
+    def getState(self):
+        state = super(_singleAssetStream, self).getState()
+        state.update(position=self.position.getState(),
+                     fastMA=self.fastMA.getState(),
+                     slowMA=self.slowMA.getState())
+        return state
+
+    def setState(self, state):
+        super(_singleAssetStream, self).setState(state)
+        self.position.setState(state['position'])
+        self.fastMA.setState(state['fastMA'])
+        self.slowMA.setState(state['slowMA'])
+
+    def _open(self, timestamp, price, pos_type, orders):
+        self.position.open(price, pos_type, fee=self.trading_fee)
+        orders.append(order(timestamp, self.sym, 'open', pos_type, price))
+
+    def _close(self, timestamp, price, orders):
+        side = 'L' if self.position.position > 0 else 'S'
+        self.position.close(price, fee=self.trading_fee)
+        self._recordTrade(timestamp, self.position.tradereturn)
+        orders.append(order(timestamp, self.sym, 'close', side, price))
+
+
+class crossoverStream(_singleAssetStream):
+    """
+    Event driven crossoverTrader. Goes long when the fast MA crosses
+    above the slow MA and short when it crosses below, closing any open
+    position first.
+
+    Initialisation:
+    - asset_symbol:     (str) symbol of the traded asset in each bar
+    - MA_type:          (str) 'SMA' or 'EMA'
+    - slow_MA:          (int) period of longer, slower MA
+    - fast_MA:          (int) period of shorter, faster MA
+    - trading_fee:      (double) fractional trading fee between 0 and 1
+    - ledger_size:      (int) number of closed trades kept
+
+    Notes:
+    - As crossoverTrader, trading starts at bar slow_MA + 1
+    """
+
+    def __init__(self, asset_symbol, MA_type, slow_MA, fast_MA=1,
+                 trading_fee=0.0, ledger_size=1000):
+        super(crossoverStream, self).__init__(
+            asset_symbol, MA_type, slow_MA, fast_MA=fast_MA,
+            trading_fee=trading_fee, ledger_size=ledger_size)
+        self._prev = (np.nan, np.nan)  # (fast, slow) MAs of previous bar
+
+    def getState(self):
+        state = super(crossoverStream, self).getState()
+        state['prev'] = list(self._prev)
+        return state
+
+    def setState(self, state):
+        super(crossoverStream, self).setState(state)
+        self._prev = tuple(state['prev'])
+
+    def on_bar(self, timestamp, prices):
+        price = prices[self.sym]
+        fastMA_t = self.fastMA.update(price)
+        slowMA_t = self.slowMA.update(price)
+        fastMA_t_1, slowMA_t_1 = self._prev
+        self._prev = (fastMA_t, slowMA_t)
+        t = self.bars
+        self.bars += 1
+        self.last_timestamp = timestamp
+
+        orders = []
+        if t < self.slowMA.period + 1:
+            return orders
+
+        if fastMA_t > slowMA_t and fastMA_t_1 < slowMA_t_1:
+            if self.position.position != 0:
+                self._close(timestamp, price, orders)
+            self._open(timestamp, price, 'L', orders)
+
+        if fastMA_t < slowMA_t and fastMA_t_1 > slowMA_t_1:
+            if self.position.position != 0:
+                self._close(timestamp, price, orders)
+            self._open(timestamp, price, 'S', orders)
+        return orders
+
+
+class zScoreStream(_singleAssetStream):
+    """
+    Event driven zScoreTrader. Trades reversions of the price's z score
+    through the bandwidth in the direction of the MA trend and closes
+    when the z score crosses zero.
+
+    Initialisation:
+    - asset_symbol:     (str) symbol of the traded asset in each bar
+    - MA_type:          (str) 'SMA' or 'EMA'
+    - slow_MA:          (int) period of the trend MA
+    - zscore_period:    (int) lookback period of the z score
+    - bandwidth:        (float) z score bandwidth
+    - fast_MA:          (int) period of the faster trend MA
+    - trading_fee:      (double) fractional trading fee between 0 and 1
+    - ledger_size:      (int) number of closed trades kept
+
+    Notes:
+    - As zScoreTrader, trading starts at bar slow_MA
+    """
+
+    def __init__(self, asset_symbol, MA_type, slow_MA, zscore_period,
+                 bandwidth, fast_MA=1, trading_fee=0.0, ledger_size=1000):
+        if not isinstance(zscore_period, int) or zscore_period <= 0:
+            raise ValueError("Z score period must be positive integer")
+        super(zScoreStream, self).__init__(
+            asset_symbol, MA_type, slow_MA, fast_MA=fast_MA,
+            trading_fee=trading_fee, ledger_size=ledger_size)
+
+        self.zscore = rollingZScore(zscore_period)
+        self.bandwidth = bandwidth
+        self._prev_z = np.nan
+
+    def params(self):
+        params = super(zScoreStream, self).params()
+        params.update(zscore_period=self.zscore.period,
+                      bandwidth=self.bandwidth)
+        return params
+
+    def getState(self):
+        state = super(zScoreStream, self).getState()
+        state.update(zscore=self.zscore.getState(), prev_z=self._prev_z)
+        return state
+
+    def setState(self, state):
+        super(zScoreStream, self).setState(state)
+        self.zscore.setState(state['zscore'])
+        self._prev_z = state['prev_z']
+
+    def on_bar(self, timestamp, prices):
+        price = prices[self.sym]
+        fastMA_t = self.fastMA.update(price)
+        slowMA_t = self.slowMA.update(price)
+        Z_t = self.zscore.update(price)
+        Z_t_1, self._prev_z = self._prev_z, Z_t
+        t = self.bars
+        self.bars += 1
+        self.last_timestamp = timestamp
+
+        orders = []
+        if t < self.slowMA.period:
+            return orders
+
+        bw = self.bandwidth
+        uptrend = fastMA_t > slowMA_t
+
+        # Open position logic
+        # ---------------------------------------------------------------------
+        if uptrend and self.position.position == 0:
+            if Z_t > -bw and Z_t_1 < -bw:
+                self._open(timestamp, price, 'L', orders)
+
+        if not uptrend and self.position.position == 0:
+            if Z_t < bw and Z_t_1 > bw:
+                self._open(timestamp, price, 'S', orders)
+        # ---------------------------------------------------------------------
+
+        # Close position logic
+        # ---------------------------------------------------------------------
+        if self.position.position == 1 and Z_t > 0 and Z_t_1 < 0:
+            self._close(timestamp, price, orders)
+
+        if self.position.position == -1 and Z_t < 0 and Z_t_1 > 0:
+            self._close(timestamp, price, orders)
+        # ---------------------------------------------------------------------
+        return orders
+
+
+class pairsStream(barStrategy):
+    """
+    Event driven pairsTrader. Trades the z score of the spread
+    y - HR*x, where the hedge ratio HR comes from a Kalman filter
+    regression of the smoothed prices and is held while a position is
+    open.
+
+    Initialisation:
+    - asset1, asset2:   (str) symbols of the x and y assets in each bar
+    - zperiod:          (int) lookback period of the spread z score
+    - bandwidth:        (float) z score bandwidth
+    - fee:              (float) fractional trading fee
+    - ledger_size:      (int) number of closed trades kept
+
+    Members:
+    - self.hedge_ratio: (float) hedge ratio of the latest bar
+    - self.spread:      (float) spread of the latest bar
+    - self.zscore:      (float) z score of the latest bar
+
+    Notes:
+    - The Kalman filter steps repeat pykalman's operations, so hedge
+      ratios match pairsTrader bit for bit.
+    - pairsTrader.trade() does not trade the final bar of its history,
+      whereas every bar is traded here.
+    """
+
+    def __init__(self, asset1, asset2, zperiod, bandwidth=2.0, fee=0.0,
+                 ledger_size=1000):
+        if not isinstance(zperiod, int) or zperiod < 1:
+            raise ValueError("zperiod must be a positive int")
+        super(pairsStream, self).__init__(ledger_size=ledger_size)
+
+        self.name = asset1 + "/" + asset2
+        self.xsym, self.ysym = asset1, asset2
+        self.zperiod = zperiod
+        self.bw = bandwidth
+        self.trading_fee = fee
+        self.spreadPosition = Position()
+        self.xPosition = Position()
+        self.yPosition = Position()
+        self.xMA = expWeightedMean(10)
+        self.yMA = expWeightedMean(10)
+        self.hedge_ratio = np.nan
+        self.spread = np.nan
+        self.zscore = 0.0
+        self._spreads = collections.deque(maxlen=zperiod + 1)
+        # filter state over the warm up bars
+        self._kf_mean, self._kf_cov = KF_MEAN, KF_COV
+
+    def params(self):
+        params = super(pairsStream, self).params()
+        params.update(asset1=self.xsym, asset2=self.ysym,
+                      zperiod=self.zperiod, bandwidth=self.bw,
+                      fee=self.trading_fee)
+        return params
+
+    def getState(self):
+        state = super(pairsStream, self).getState()
+        state.update(spreadPosition=self.spreadPosition.getState(),
+                     xPosition=self.xPosition.getState(),
+                     yPosition=self.yPosition.getState(),
+                     xMA=self.xMA.getState(), yMA=self.yMA.getState(),
+                     hedge_ratio=self.hedge_ratio, spread=self.spread,
+                     zscore=self.zscore, spreads=list(self._spreads),
+                     kf_mean=self._kf_mean.tolist(),
+                     kf_cov=self._kf_cov.ravel().tolist())
+        return state
+
+    def setState(self, state):
+        super(pairsStream, self).setState(state)
+        self.spreadPosition.setState(state['spreadPosition'])
+        self.xPosition.setState(state['xPosition'])
+        self.yPosition.setState(state['yPosition'])
+        self.xMA.setState(state['xMA'])
+        self.yMA.setState(state['yMA'])
+        self.hedge_ratio = state['hedge_ratio']
+        self.spread = state['spread']
+        self.zscore = state['zscore']
+        self._spreads.clear()
+        self._spreads.extend(state['spreads'])
+        self._kf_mean = np.array(state['kf_mean'], dtype=np.float64)
+        self._kf_cov = np.array(state['kf_cov'],
+                                dtype=np.float64).reshape(2, 2)
+
+    def on_bar(self, timestamp, prices):
+        x, y = float(prices[self.xsym]), float(prices[self.ysym])
+        xMA = self.xMA.update(x)*KF_SCALE
+        yMA = self.yMA.update(y)*KF_SCALE
+        t = self.bars
+        self.bars += 1
+        self.last_timestamp = timestamp
+
+        if t < self.zperiod:
+            # pairsTrader filters the first zperiod bars in one run
+            if t > 0:
+                self._kf_mean, self._kf_cov = kf_predict(self._kf_mean,
+                                                         self._kf_cov)
+            self._kf_mean, self._kf_cov = kf_correct(
+                self._kf_mean, self._kf_cov, xMA, yMA)
+            self.hedge_ratio = self._kf_mean[0]
+        elif self.spreadPosition.position == 0:
+            # then restarts the filter from its prior every bar
+            self.hedge_ratio = kf_correct(KF_MEAN, KF_COV, xMA, yMA)[0][0]
+
+        self.spread = y - x*self.hedge_ratio
+        self._spreads.append(self.spread)
+        if t < self.zperiod:
+            return []
+
+        z_t_1 = self.zscore
+        z_t = window_zscore(self._spreads, self.zperiod)
+        self.zscore = z_t
+        position_t = self.spreadPosition.position
+
+        orders = []
+        # Open logic
+        # ---------------------------------------------------------------------
+        if (position_t == 0):
+            if (z_t > - self.bw) and (z_t_1 < -self.bw) and (z_t < 0):
+                self._open(timestamp, x, y, 'L', orders)
+
+            if (z_t < self.bw) and (z_t_1 > self.bw) and (z_t > 0):
+                self._open(timestamp, x, y, 'S', orders)
+        # ---------------------------------------------------------------------
+
+        # Close logic
+        # ---------------------------------------------------------------------
+        if (position_t == 1):
+            if (z_t >= 0) and (z_t_1 < 0):
+                self._close(timestamp, x, y, orders)
+
+        if (position_t == -1):
+            if (z_t <= 0) and (z_t_1 > 0):
+                self._close(timestamp, x, y, orders)
+        # ---------------------------------------------------------------------
+        return orders
+
+    def _open(self, timestamp, x, y, pos_type, orders):
+        xside = 'S' if pos_type == 'L' else 'L'
+        fee = self.trading_fee
+        self.spreadPosition.open(self.spread, pos_type, fee=fee)
+        self.yPosition.open(y, pos_type, fee=fee)
+        self.xPosition.open(x, xside, fee=fee)
+        orders.append(order(timestamp, self.ysym, 'open', pos_type, y))
+        orders.append(order(timestamp, self.xsym, 'open', xside, x))
+
+    def _close(self, timestamp, x, y, orders):
+        yside = 'L' if self.yPosition.position > 0 else 'S'
+        xside = 'S' if yside == 'L' else 'L'
+        fee = self.trading_fee
+        self.spreadPosition.close(self.spread, fee=fee)
+        self.yPosition.close(y, fee=fee)
+        self.xPosition.close(x, fee=fee)
+
+        # as pairsTrader._storeTradeReturns
+        HR = self.hedge_ratio
+        yratio, xratio = 1.0 / (1.0 + HR), HR / (1.0 + HR)
+        yreturn = self.yPosition.tradereturn*yratio
+        xreturn = self.yPosition.tradereturn*xratio
+        self._recordTrade(timestamp, yreturn + xreturn)
+        orders.append(order(timestamp, self.ysym, 'close', yside, y))
+        orders.append(order(timestamp, self.xsym, 'close', xside, x))
+
+
+def replay(strategy, df, symbols=None):
+    """
+    Feeds every row of a price DataFrame to a streaming strategy, with
+    the row index as timestamp.
+
+    Inputs:
+    - strategy:         (barStrategy) strategy to feed
+    - df:               (pandas DataFrame) price history
+    - symbols:          (list, str) optional columns passed in each bar,
+                        defaults to all numeric columns
+
+    Outputs:
+    - orders:           (list, order) all executed orders
+    """
+    if symbols is None:
+        symbols = list(df.select_dtypes('number').columns)
+    columns = [df[symbol].to_numpy(dtype=np.float64) for symbol in symbols]
+
+    orders = []
+    for timestamp, row in zip(df.index, zip(*columns)):
+        orders.extend(strategy.on_bar(timestamp, dict(zip(symbols, row))))
+    return orders
@@ -0,0 +1,408 @@
+"""
+Constant memory, O(1) per bar versions of the moving average and z
+score types.
+
+Each indicator is fed one value at a time with update(), which returns
+the indicator's current value. The updates follow the online algorithms
+pandas uses for rolling(period).mean(), rolling(period).std() and
+ewm(period).mean(), including their Kahan compensations, so a series
+fed through an indicator gives the same values bit for bit as the batch
+types in Lib/types.
+
+Example usage:
+```
+sma = rollingMean(40)
+for price in prices:
+    value = sma.update(price)
+```
+"""
+
+import math
+
+from ..types.numerics import INV_COND_TOL
+
+_NAN = float('nan')
+
+
+class rollingMean():
+    """
+    Simple moving average updated one value at a time.
+
+    Initialisation:
+    - period:           (int) period of moving average
+
+    Members:
+    - self.period:      (int) period of moving average
+    - self.value:       (float) latest moving average, NaN until period
+                        values have been seen
+    - self.name:        (str) plot label, as simpleMovingAverage
+    """
+
+    _STATE = ('value', '_window', '_count', '_nobs', '_sum', '_add_comp',
+              '_remove_comp', '_neg', '_same', '_prev')
+
+    def __init__(self, period):
+        if not isinstance(period, int) or period < 1:
+            raise ValueError("Period must be a positive int")
+
+        self.period = period
+        self.name = '{} SMA'.format(period)
+        self.value = _NAN
+        self._window = [_NAN]*period  # ring buffer of the last values
+        self._count = 0
+        self._nobs = 0
+        self._sum = 0.0
+        self._add_comp = 0.0
+        self._remove_comp = 0.0
+        self._neg = 0
+        self._same = 0
+        self._prev = _NAN
+
+    def update(self, x):
+        """
+        Adds the next value and returns the moving average.
+        """
+        x = float(x)
+        if self.period == 1:
+            # pandas starts a new window every value
+            self.value = x
+            return x
+        if self._count == 0:
+            self._prev = x
+
+        slot = self._count % self.period
+        if self._count >= self.period:
+            old = self._window[slot]
+            if old == old:
+                self._nobs -= 1
+                y = -old - self._remove_comp
+                t = self._sum + y
+                self._remove_comp = t - self._sum - y
+                self._sum = t
+                if math.copysign(1.0, old) < 0:
+                    self._neg -= 1
+        if x == x:
+            self._nobs += 1
+            y = x - self._add_comp
+            t = self._sum + y
+            self._add_comp = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, x) < 0:
+                self._neg += 1
+            self._same = self._same + 1 if x == self._prev else 1
+            self._prev = x
+        self._window[slot] = x
+        self._count += 1
+
+        nobs = self._nobs
+        if nobs < self.period or nobs == 0:
+            self.value = _NAN
+        elif self._same >= nobs:
+            self.value = self._prev
+        else:
+            value = self._sum/nobs
+            if (self._neg == 0 and value < 0) or \
+                    (self._neg == nobs and value > 0):
+                value = 0.0
+            self.value = value
+        return self.value
+
+    def getState(self):
+        """
+        Returns the indicator's state, see snapshots.py.
+        """
+        return _get_state(self, self._STATE)
+
+    def setState(self, state):
+        """
+        Restores a state returned by getState.
+        """
+        _set_state(self, state, self._STATE)
+
+
+class rollingVariance():
+    """
+    Sample variance (ddof=1) of a rolling window updated one value at a
+    time.
+
+    Initialisation:
+    - period:           (int) length of the window
+
+    Members:
+    - self.period:      (int) length of the window
+    - self.value:       (float) latest variance, NaN until period
+                        values have been seen
+
+    Notes:
+    - As pandas, the sums are rebuilt from the window when removing a
+    value cancels all but a few significant digits of them.
+    """
+
+    _STATE = ('value', '_window', '_count', '_nobs', '_mean', '_ssqdm',
+              '_add_comp', '_remove_comp', '_unstable')
+
+    def __init__(self, period):
+        if not isinstance(period, int) or period < 1:
+            raise ValueError("Period must be a positive int")
+
+        self.period = period
+        self.value = _NAN
+        self._window = [_NAN]*period
+        self._count = 0
+        self._nobs = 0
+        self._mean = 0.0
+        self._ssqdm = 0.0
+        self._add_comp = 0.0
+        self._remove_comp = 0.0
+        self._unstable = False
+
+    def _add(self, x):
+        """
+        Welford's update with Kahan summation, adding x.
+        """
+        if x != x:
+            return
+        prev_m2 = self._ssqdm
+        self._nobs += 1
+        prev_mean = self._mean - self._add_comp
+        y = x - self._add_comp
+        t = y - self._mean
+        self._add_comp = t + self._mean - y
+        self._mean = self._mean + t/self._nobs
+        self._ssqdm = self._ssqdm + (x - prev_mean)*(x - self._mean)
+        if prev_m2*INV_COND_TOL > self._ssqdm:
+            self._unstable = True
+
+    def _remove(self, x):
+        """
+        Welford's update with Kahan summation, removing x.
+        """
+        if x != x:
+            return
+        prev_m2 = self._ssqdm
+        self._nobs -= 1
+        if self._nobs:
+            prev_mean = self._mean - self._remove_comp
+            y = x - self._remove_comp
+            t = y - self._mean
+            self._remove_comp = t + self._mean - y
+            self._mean = self._mean - t/self._nobs
+            self._ssqdm = self._ssqdm - (x - prev_mean)*(x - self._mean)
+            if prev_m2*INV_COND_TOL > self._ssqdm:
+                self._unstable = True
+        else:
+            self._mean = 0.0
+            self._ssqdm = 0.0
+            self._unstable = False
+
+    def update(self, x):
+        """
+        Adds the next value and returns the variance.
+        """
+        x = float(x)
+        slot = self._count % self.period
+        recompute = self._count == 0 or self.period == 1
+        if not recompute:
+            if self._count >= self.period:
+                self._remove(self._window[slot])
+            self._add(x)
+        self._window[slot] = x
+        self._count += 1
+
+        if recompute or self._unstable:
+            # rebuild the sums from the window, oldest value first
+            self._nobs = 0
+            self._mean = self._ssqdm = 0.0
+            self._add_comp = self._remove_comp = 0.0
+            n = min(self._count, self.period)
+            first = self._count - n
+            for i in range(first, self._count):
+                self._add(self._window[i % self.period])
+            self._unstable = False
+
+        nobs = self._nobs
+        if nobs < self.period or nobs <= 1:
+            self.value = _NAN
+        else:
+            self.value = self._ssqdm/(nobs - 1)
+        return self.value
+
+    def getState(self):
+        """
+        Returns the indicator's state, see snapshots.py.
+        """
+        return _get_state(self, self._STATE)
+
+    def setState(self, state):
+        """
+        Restores a state returned by getState.
+        """
+        _set_state(self, state, self._STATE)
+
+
+class expWeightedMean():
+    """
+    Exponential moving average updated one value at a time, matching
+    series.ewm(period).mean() as used by expMovingAverage.
+
+    Initialisation:
+    - period:           (int) centre of mass of the weights
+
+    Members:
+    - self.period:      (int) centre of mass of the weights
+    - self.value:       (float) latest moving average
+    - self.name:        (str) plot label, as expMovingAverage
+    """
+
+    _STATE = ('value', '_old_weight', '_started')
+
+    def __init__(self, period):
+        if not isinstance(period, int) or period < 1:
+            raise ValueError("Period must be a positive int")
+
+        self.period = period
+        self.name = '{} EMA'.format(period)
+        self.value = _NAN
+        self._decay = 1.0 - 1.0/(1.0 + period)
+        self._old_weight = 1.0
+        self._started = False
+
+    def update(self, x):
+        """
+        Adds the next value and returns the moving average.
+        """
+        x = float(x)
+        if not self._started or self.value != self.value:
+            self._started = True
+            self._old_weight = 1.0
+            self.value = x
+            return x
+
+        self._old_weight *= self._decay
+        if x == x:
+            if self.value != x:
+                self.value = (self._old_weight*self.value + x) \
+                    / (self._old_weight + 1.0)
+            self._old_weight += 1.0
+        return self.value
+
+    def getState(self):
+        """
+        Returns the indicator's state, see snapshots.py.
+        """
+        return _get_state(self, self._STATE)
+
+    def setState(self, state):
+        """
+        Restores a state returned by getState.
+        """
+        _set_state(self, state, self._STATE)
+
+
+class rollingZScore():
+    """
+    Z score of each value against the mean and standard deviation of
+    the last period values, matching zScore.
+
+    Initialisation:
+    - period:           (int) lookback period for z score
+
+    Members:
+    - self.period:      (int) lookback period for z score
+    - self.value:       (float) latest z score
+    - self.name:        (str) plot label, as zScore
+    """
+
+    def __init__(self, period):
+        if not isinstance(period, int) or period < 1:
+            raise ValueError("Period must be a positive int")
+
+        self.period = period
+        self.name = '{} Zscr'.format(period)
+        self.value = _NAN
+        self._mean = rollingMean(period)
+        self._var = rollingVariance(period)
+
+    def update(self, x):
+        """
+        Adds the next value and returns its z score.
+        """
+        x = float(x)
+        mean = self._mean.update(x)
+        var = self._var.update(x)
+        self.value = _zscore(x, mean, var)
+        return self.value
+
+    def getState(self):
+        """
+        Returns the indicator's state, see snapshots.py.
+        """
+        return {'value': self.value, 'mean': self._mean.getState(),
+                'var': self._var.getState()}
+
+    def setState(self, state):
+        """
+        Restores a state returned by getState.
+        """
+        self._mean.setState(state['mean'])
+        self._var.setState(state['var'])
+        self.value = float(state['value'])
+
+
+def window_zscore(values, period):
+    """
+    Returns the z score of the last of values computed the way
+    zScore(pd.Series(values), period) computes it, i.e. with the rolling
+    mean and variance started afresh at values[0]. Used where a batch
+    strategy recomputes the z score over a short window every bar.
+
+    Inputs:
+    - values:           (list, float) window, at least period long
+    - period:           (int) lookback period for z score
+    """
+    mean = rollingMean(period)
+    var = rollingVariance(period)
+    for x in values:
+        m = mean.update(x)
+        v = var.update(x)
+    return _zscore(float(values[-1]), m, v)
+
+
+def _zscore(x, mean, var):
+    """
+    (x - mean)/std with NumPy's handling of a zero standard deviation.
+    """
+    if var != var or mean != mean:
+        return _NAN
+    std = math.sqrt(var) if var > 0 else 0.0
+    diff = x - mean
+    if std == 0.0:
+        if diff == 0.0 or diff != diff:
+            return _NAN
+        return math.copysign(math.inf, diff)
+    return diff/std
+
+
+def _get_state(indicator, names):
+    """
+    The named members of an indicator as a dict, windows as lists.
+    """
+    state = {name.lstrip('_'): getattr(indicator, name) for name in names}
+    if 'window' in state:
+        state['window'] = list(state['window'])
+    return state
+
+
+def _set_state(indicator, state, names):
+    """
+    Sets the named members of an indicator from a getState dict.
+    """
+    missing = [name for name in names if name.lstrip('_') not in state]
+    if missing:
+        raise ValueError("State is missing {}".format(missing))
+    if 'window' in state and len(state['window']) != indicator.period:
+        raise ValueError("State window does not match the period")
+    for name in names:
+        value = state[name.lstrip('_')]
+        setattr(indicator, name,
+                list(value) if name == '_window' else value)
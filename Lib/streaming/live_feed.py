@@ -0,0 +1,289 @@
+"""
+Polls the latest bars of many symbols concurrently with asyncio and
+feeds them to streaming strategies (see event_driven.py).
+
+Requests go to the CryptoCompare histominute, histohour and histoday
+endpoints built by webLoading, or to a stubServer replaying recorded
+bars. Requests are made with requests in a thread pool, at most
+max_requests at once. Each poll asks for the last few bars of a symbol,
+so consecutive polls overlap; bars already received are dropped and
+every new bar is dispatched to the strategies subscribed to its symbol
+exactly once, in time order. The newest bar of a response is still
+forming, so it is held back until a later bar supersedes it or its tick
+has passed, and strategies only ever see final closes.
+
+Example usage:
+```
+feed = liveFeed(api_key, ['ETH', 'LTC', 'NEO'], ticksize='minute')
+feed.subscribe(crossoverStream('ETH', 'SMA', 40, fast_MA=10),
+               callback=lambda strategy, orders: print(orders))
+feed.run(duration=3600)
+print(feed.latency_report())
+```
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import time
+import urllib.parse
+
+import pandas as pd
+
+from ..data_loading.web_loading_strategies import API_URL, construct_url
+from .dispatch import (barSubscription, strategy_symbols,
+                       latency_percentiles)
+
+_TICK_SECONDS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class liveFeed():
+    """
+    Polls the latest bars of a list of symbols and dispatches new bars
+    to subscribed strategies.
+
+    Initialisation:
+    - api_key:          (str) cryptocompare api key
+    - symbols:          (list, str) symbols polled
+    - ticksize:         (str) "day", "hour" or "minute"
+    - limit:            (int) bars requested by each poll. Only has to
+                        cover the bars that can close between two polls
+    - history:          (int) bars requested by the first poll of each
+                        symbol to warm up indicators, defaults to limit
+    - interval:         (float) seconds between polls of each symbol,
+                        defaults to the ticksize
+    - base_url:         (str) address of the API, e.g. a stubServer's url
+    - max_requests:     (int) maximum number of requests in flight
+    - timeout:          (float) seconds before a request is abandoned
+    - latency_window:   (int) latencies kept per symbol for the report
+    - clock:            (function) returns the unix time that decides
+                        whether the newest bar is complete, defaults to
+                        time.time. Pass a stubServer's now.
+
+    Members:
+    - self.last_time:   (dict) symbol: time of the latest bar received
+    - self.bars:        (dict) symbol: number of new bars received
+    - self.errors:      (dict) symbol: number of failed polls
+    - self.last_error:  (dict) symbol: message of the latest failure
+
+    Notes:
+    - A strategy trading several symbols (e.g. pairsStream) receives a
+    bar once every one of its symbols has a bar at that time. Times
+    missing for one of its symbols are skipped.
+    - Latency is measured from the moment a poll's response is read to
+    the moment on_bar returns the decision on that bar.
+    """
+
+    def __init__(self, api_key, symbols, ticksize="minute", limit=10,
+                 history=None, interval=None, base_url=API_URL,
+                 max_requests=50, timeout=10.0, latency_window=10000,
+                 clock=time.time):
+        if not all(isinstance(symbol, str) for symbol in symbols):
+            raise ValueError("Symbols must be list of string types")
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("Symbols must be unique")
+        if ticksize not in _TICK_SECONDS:
+            raise ValueError(("Ticksize not compatible."
+                              + "Use: 'day', 'hour', 'minute'"))
+        if history is None:
+            history = limit
+        for name, value in (('limit', limit), ('history', history),
+                            ('max_requests', max_requests),
+                            ('latency_window', latency_window)):
+            if not isinstance(value, int) or value < 1:
+                raise ValueError("{} must be a positive int".format(name))
+        if interval is None:
+            interval = _TICK_SECONDS[ticksize]
+        if interval <= 0 or timeout <= 0:
+            raise ValueError("interval and timeout must be positive")
+
+        self._key = api_key
+        self.symbols = list(symbols)
+        self.ticksize = ticksize
+        self.limit = limit
+        self.history = history
+        self.interval = interval
+        self.base_url = base_url
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.clock = clock
+
+        self.subscriptions = []
+        self._subscribers = {symbol: [] for symbol in self.symbols}
+        self._latency = {symbol: collections.deque(maxlen=latency_window)
+                         for symbol in self.symbols}
+        self.last_time = {}
+        self.bars = dict.fromkeys(self.symbols, 0)
+        self.errors = dict.fromkeys(self.symbols, 0)
+        self.last_error = {}
+
+    def subscribe(self, strategy, symbols=None, callback=None):
+        """
+        Subscribes a strategy to the bars of some of the polled symbols.
+
+        Inputs:
+        - strategy:         (barStrategy) receives on_bar(time, prices)
+                            with prices a dict of close prices
+        - symbols:          (list, str) symbols the strategy trades,
+                            defaults to its sym or xsym and ysym
+        - callback:         (function) optional, called as
+                            callback(strategy, orders) when a bar
+                            executes orders
+        """
+        if symbols is None:
+            symbols = strategy_symbols(strategy)
+        missing = [symbol for symbol in symbols
+                   if symbol not in self._subscribers]
+        if missing:
+            raise ValueError("Symbols not polled: {}".format(missing))
+
+        subscription = barSubscription(strategy, symbols, callback)
+        for symbol in symbols:
+            self._subscribers[symbol].append(subscription)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def run(self, polls=None, duration=None):
+        """
+        Polls until stopped, see serve.
+        """
+        return asyncio.run(self.serve(polls=polls, duration=duration))
+
+    async def serve(self, polls=None, duration=None):
+        """
+        Polls every symbol each interval.
+
+        Inputs:
+        - polls:            (int) optional number of polls per symbol
+        - duration:         (float) optional seconds to poll for
+        """
+        loop = asyncio.get_running_loop()
+        end = None if duration is None else loop.time() + duration
+        with self._requests():
+            tasks = [asyncio.ensure_future(self._pollSymbol(symbol, polls,
+                                                            end))
+                     for symbol in self.symbols]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def poll_once(self):
+        """
+        Polls every symbol once, concurrently.
+        """
+        with self._requests():
+            await asyncio.gather(*[self._poll(symbol)
+                                   for symbol in self.symbols])
+
+    def _requests(self):
+        """
+        Starts the semaphore and thread pool of a serve or poll_once,
+        the returned pool is shut down by its with block.
+        """
+        self._semaphore = asyncio.Semaphore(self.max_requests)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_requests)
+        return self._executor
+
+    async def _pollSymbol(self, symbol, polls, end):
+        loop = asyncio.get_running_loop()
+        count = 0
+        while True:
+            started = loop.time()
+            await self._poll(symbol)
+            count += 1
+            if polls is not None and count >= polls:
+                break
+            if end is not None and loop.time() >= end:
+                break
+            wait = self.interval - (loop.time() - started)
+            if end is not None:
+                wait = min(wait, end - loop.time())
+            await asyncio.sleep(max(wait, 0.0))
+
+    async def _poll(self, symbol):
+        """
+        Requests the latest bars of symbol and dispatches the new ones.
+        Failed requests are counted in self.errors.
+        """
+        limit = self.limit if symbol in self.last_time else self.history
+        url = construct_url(self.ticksize, symbol, limit, self._key,
+                            base_url=self.base_url)
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._semaphore:
+                # bars complete before the request are complete in it
+                requested = self.clock()
+                content = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, _get_json, url,
+                                         self.timeout),
+                    self.timeout)
+            received = time.perf_counter()
+            if content.get("Response") == "Error":
+                raise RuntimeError(content.get("Message"))
+            bars = content["Data"]
+        except (OSError, EOFError, ValueError, KeyError, RuntimeError,
+                asyncio.TimeoutError) as error:
+            self.errors[symbol] += 1
+            self.last_error[symbol] = str(error) or type(error).__name__
+            return
+        self._dispatch(symbol, bars, received, requested)
+
+    def _dispatch(self, symbol, bars, received, requested):
+        """
+        Sends the bars newer than the last received to the subscribers.
+        The newest bar is only sent if its tick had passed when it was
+        requested, otherwise it is sent from the poll where a later bar
+        supersedes it.
+        """
+        bars = sorted(bars, key=lambda bar: bar['time'])
+        tick = _TICK_SECONDS[self.ticksize]
+        if bars and bars[-1]['time'] + tick > requested:
+            bars = bars[:-1]
+
+        last = self.last_time.get(symbol)
+        for bar in bars:
+            if last is not None and bar['time'] <= last:
+                continue
+            last = bar['time']
+            self.bars[symbol] += 1
+            for subscription in self._subscribers[symbol]:
+                subscription.add(symbol, bar['time'], bar['close'],
+                                 received, self._latency)
+        if last is not None:
+            self.last_time[symbol] = last
+
+    def latency_report(self):
+        """
+        Returns the feed to decision latency of each symbol.
+
+        Outputs:
+        - report:           (pandas DataFrame) indexed by symbol with
+                            columns bars, errors, decisions, p50_ms and
+                            p99_ms
+        """
+        rows = []
+        for symbol in self.symbols:
+            p50, p99 = latency_percentiles(self._latency[symbol])
+            rows.append({'symbol': symbol, 'bars': self.bars[symbol],
+                         'errors': self.errors[symbol],
+                         'decisions': len(self._latency[symbol]),
+                         'p50_ms': p50, 'p99_ms': p99})
+        return pd.DataFrame(rows).set_index('symbol')
+
+
+def _get_json(url, timeout):
+    """
+    GETs url with requests and decodes its JSON body. Blocking, so run
+    in an executor.
+    """
+    import requests
+
+    response = requests.get(url, timeout=timeout,
+                            headers={'Accept': 'application/json'})
+    if response.status_code != 200:
+        raise RuntimeError("HTTP {} from {}".format(
+            response.status_code, urllib.parse.urlsplit(url).hostname))
+    return response.json()
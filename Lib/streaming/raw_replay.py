@@ -0,0 +1,331 @@
+"""
+Replays recorded raw OHLCV JSON (webLoading's outfile_raw, as read by
+fileLoadingRaw) through streaming strategies as one time ordered stream
+of bars, at real time, N times real time or unthrottled.
+
+The file is never loaded whole. A first pass indexes the byte ranges
+of each symbol's bars, then every symbol is read back a chunk at a time
+and the symbols are combined with a k-way merge on the bar time, so
+memory is bounded by one chunk per symbol however large the dump.
+
+Example usage:
+```
+replay = rawReplay("raw.json", speed=3600)  # an hour of bars a second
+replay.subscribe(crossoverStream('ETH', 'SMA', 40, fast_MA=10))
+replay.run()
+print(replay.report())
+```
+"""
+
+import asyncio
+import collections
+import heapq
+import json
+import re
+import time
+
+from .dispatch import (barSubscription, strategy_symbols,
+                       latency_percentiles)
+
+_CHUNK = 1 << 16
+# longest key or "time" entry the index pass has to see whole
+_TOKEN = 256
+_TIME = re.compile(rb'"time"\s*:\s*(-?\d+)')
+
+
+def index_raw_json(path, chunk_size=_CHUNK):
+    """
+    Finds the bars of each symbol in a raw JSON file without loading it.
+
+    webLoading stores each symbol's bars as the 2000 bar responses of
+    the API from the latest backwards, so a symbol's bars are a number
+    of runs, each in ascending time.
+
+    Inputs:
+    - path:             (str) raw JSON file
+    - chunk_size:       (int) bytes read at a time
+
+    Outputs:
+    - index:            (dict) symbol: list of (start, end, first_time,
+                        bars) byte ranges of its ascending runs, in file
+                        order
+
+    Notes:
+    - Bars must be flat objects, as stored by webLoading.
+    """
+    index = {}
+    runs = None  # runs of the symbol being read
+    run = None   # [start, first_time, last_time, bars] of current run
+    base = 0     # file offset of buf[0]
+    buf = b''
+    done = 0     # buf[:done] has been indexed
+
+    def close_run(end):
+        if run is not None and run[3] > 0:
+            runs.append((run[0], end, run[1], run[3]))
+
+    with open(path, 'rb') as infile:
+        eof = False
+        while not eof:
+            chunk = infile.read(chunk_size)
+            eof = len(chunk) == 0
+            buf += chunk
+            cut = len(buf) if eof else max(len(buf) - _TOKEN, 0)
+
+            # the few array brackets, then every bar's time, in file order
+            marks = sorted(_find_all(buf, b'[', done, cut)
+                           + _find_all(buf, b']', done, cut))
+            times = [match for match in _TIME.finditer(buf, done)
+                     if match.start() < cut]
+            times.append(None)
+            m = 0
+            for match in times:
+                position = cut if match is None else match.start()
+                while m < len(marks) and marks[m] < position:
+                    at = marks[m]
+                    m += 1
+                    if buf[at] == ord('[') and runs is None:
+                        # symbol key is the string before its array
+                        quote = buf.rfind(b'"', 0, at)
+                        key = buf[buf.rfind(b'"', 0, quote) + 1:quote]
+                        runs = index.setdefault(
+                            json.loads(b'"' + key + b'"'), [])
+                        run = [base + at + 1, None, None, 0]
+                    elif buf[at] == ord(']') and runs is not None:
+                        close_run(base + at)
+                        runs, run = None, None
+                if match is None or runs is None:
+                    continue
+
+                bar_time = int(match.group(1))
+                if run[2] is not None and bar_time < run[2]:
+                    # a new run starts at this bar
+                    start = buf.rfind(b'{', 0, match.start())
+                    if start < 0:
+                        raise ValueError("Unexpected bar format")
+                    close_run(base + start)
+                    run = [base + start, None, None, 0]
+                if run[1] is None:
+                    run[1] = bar_time
+                run[2] = bar_time
+                run[3] += 1
+
+            # keep the bars' openings before cut
+            keep = max(cut - _TOKEN, 0)
+            buf = buf[keep:]
+            base += keep
+            done = cut - keep
+    return index
+
+
+def _find_all(buf, char, start, end):
+    """
+    Positions of char in buf[start:end].
+    """
+    found = []
+    at = buf.find(char, start, end)
+    while at >= 0:
+        found.append(at)
+        at = buf.find(char, at + 1, end)
+    return found
+
+
+def iter_bars(infile, start, end, chunk_size=_CHUNK):
+    """
+    Yields the bars stored between two offsets of an open binary file.
+    The file may be shared with other iterators.
+    """
+    buf = b''
+    at = 0
+    pos = start
+    while True:
+        open_at = buf.find(b'{', at)
+        close_at = buf.find(b'}', open_at) if open_at >= 0 else -1
+        if close_at >= 0:
+            yield json.loads(buf[open_at:close_at + 1])
+            at = close_at + 1
+            continue
+
+        if pos >= end:
+            return
+        infile.seek(pos)
+        chunk = infile.read(min(chunk_size, end - pos))
+        if len(chunk) == 0:
+            return
+        pos += len(chunk)
+        buf = (buf[open_at:] if open_at >= 0 else b'') + chunk
+        at = 0
+
+
+class rawReplay():
+    """
+    Replays a raw JSON file through subscribed streaming strategies.
+
+    Initialisation:
+    - infile:           (str) raw JSON file
+    - symbols:          (list, str) optional symbols replayed, defaults
+                        to every symbol in infile
+    - speed:            (float) simulated seconds per real second, e.g.
+                        1 for real time, None for unthrottled
+    - chunk_size:       (int) bytes read at a time for each symbol
+
+    Members:
+    - self.events:      (int) bars emitted by the last run
+    - self.elapsed:     (float) seconds taken by the last run
+    - self.dropped:     (int) bars dropped as duplicates or out of order
+    - self.index:       (dict) see index_raw_json
+
+    Notes:
+    - Bars of one time are emitted together, in symbol order, and a
+    strategy trading several symbols receives the times at which all
+    of its symbols have a bar, as with liveFeed.
+    """
+
+    def __init__(self, infile, symbols=None, speed=None, chunk_size=_CHUNK):
+        if not infile.endswith('.json'):
+            raise ValueError("Infile must be json format")
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive int")
+
+        self.infile = infile
+        self.speed = speed
+        self.chunk_size = chunk_size
+        self.index = index_raw_json(infile, chunk_size=chunk_size)
+        if symbols is None:
+            symbols = list(self.index)
+        missing = [symbol for symbol in symbols if symbol not in self.index]
+        if missing:
+            raise ValueError("Symbols not in infile: {}".format(missing))
+        self.symbols = list(symbols)
+
+        self.subscriptions = []
+        self._subscribers = {symbol: [] for symbol in self.symbols}
+        self._latency = {symbol: collections.deque(maxlen=10000)
+                         for symbol in self.symbols}
+        self.events = 0
+        self.elapsed = 0.0
+        self.dropped = 0
+
+    def subscribe(self, strategy, symbols=None, callback=None):
+        """
+        Subscribes a strategy to the bars of some of the replayed
+        symbols, see liveFeed.subscribe.
+        """
+        if symbols is None:
+            symbols = strategy_symbols(strategy)
+        missing = [symbol for symbol in symbols
+                   if symbol not in self._subscribers]
+        if missing:
+            raise ValueError("Symbols not replayed: {}".format(missing))
+
+        subscription = barSubscription(strategy, symbols, callback)
+        for symbol in symbols:
+            self._subscribers[symbol].append(subscription)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def bars(self):
+        """
+        Yields (time, symbol, bar) for every bar of self.symbols in
+        time order, unthrottled.
+        """
+        with open(self.infile, 'rb') as infile:
+            streams = [self._symbolBars(infile, symbol)
+                       for symbol in self.symbols]
+            yield from heapq.merge(*streams, key=lambda event: event[0])
+
+    def _symbolBars(self, infile, symbol):
+        """
+        Yields the bars of a symbol in time order, reading its runs one
+        after another.
+        """
+        last = None
+        for start, end, _, _ in sorted(self.index[symbol],
+                                       key=lambda run: run[2]):
+            for bar in iter_bars(infile, start, end, self.chunk_size):
+                if last is not None and bar['time'] <= last:
+                    self.dropped += 1
+                    continue
+                last = bar['time']
+                yield last, symbol, bar
+
+    def run(self, max_events=None):
+        """
+        Replays the file, sleeping between bars unless unthrottled.
+
+        Inputs:
+        - max_events:       (int) optional number of bars to stop after
+
+        Outputs:
+        - events:           (int) number of bars emitted
+        """
+        self._start()
+        for bar_time, symbol, bar in self.bars():
+            wait = self._wait(bar_time)
+            if wait > 0:
+                time.sleep(wait)
+            self._emit(bar_time, symbol, bar)
+            if max_events is not None and self.events >= max_events:
+                break
+        self.elapsed = time.perf_counter() - self._t0
+        return self.events
+
+    async def serve(self, max_events=None, yield_every=1000):
+        """
+        Replays the file in an asyncio event loop, yielding to other
+        tasks between bars, or every yield_every bars when unthrottled.
+        """
+        self._start()
+        for bar_time, symbol, bar in self.bars():
+            wait = self._wait(bar_time)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            elif self.events % yield_every == 0:
+                await asyncio.sleep(0)
+            self._emit(bar_time, symbol, bar)
+            if max_events is not None and self.events >= max_events:
+                break
+        self.elapsed = time.perf_counter() - self._t0
+        return self.events
+
+    @property
+    def events_per_second(self):
+        return self.events/self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+        """
+        Returns the throughput of the last run and the p50/p99 time
+        from emitting a bar to each strategy's decision on it.
+        """
+        samples = [value for symbol in self.symbols
+                   for value in self._latency[symbol]]
+        p50, p99 = latency_percentiles(samples)
+        return {'events': self.events, 'seconds': self.elapsed,
+                'events_per_second': self.events_per_second,
+                'dropped': self.dropped, 'p50_ms': p50, 'p99_ms': p99}
+
+    def _start(self):
+        self.events = 0
+        self.dropped = 0
+        self._first = None
+        self._t0 = time.perf_counter()
+
+    def _wait(self, bar_time):
+        """
+        Seconds until a bar is due at the replay speed.
+        """
+        if self.speed is None:
+            return 0.0
+        if self._first is None:
+            self._first = bar_time
+        due = self._t0 + (bar_time - self._first)/self.speed
+        return due - time.perf_counter()
+
+    def _emit(self, bar_time, symbol, bar):
+        self.events += 1
+        emitted = time.perf_counter()
+        for subscription in self._subscribers[symbol]:
+            subscription.add(symbol, bar_time, bar['close'], emitted,
+                             self._latency)
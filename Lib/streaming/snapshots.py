@@ -0,0 +1,223 @@
+"""
+Saves and restores the complete state of a streaming strategy, so a
+daily job can carry on from yesterday's snapshot and process only the
+new bars rather than the whole history.
+
+A snapshot holds the strategy's parameters, indicator windows, open
+positions, ledger tail and, for pairsStream, the Kalman filter mean and
+covariance. It is a small versioned binary format written with struct,
+not pickle, so loading a snapshot never runs code:
+
+    magic b'STSN' | version (uint16) | value | crc32 (uint32)
+
+where value is the tagged encoding of {'type': class name, 'params':
+constructor arguments, 'state': getState()}. Lists of floats, such as
+indicator windows, are packed as float64 arrays and dict keys are
+stored with a one byte length.
+
+Example usage:
+```
+strategy, orders = resume("eth.snap", df,
+                          lambda: crossoverStream('ETH', 'SMA', 40))
+```
+"""
+
+import datetime
+import numbers
+import os
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .event_driven import crossoverStream, zScoreStream, pairsStream, replay
+
+MAGIC = b'STSN'
+VERSION = 1
+
+STRATEGIES = {cls.__name__: cls
+              for cls in (crossoverStream, zScoreStream, pairsStream)}
+
+_HEADER = struct.Struct('<4sH')
+_CRC = struct.Struct('<I')
+_LENGTH = struct.Struct('<I')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+
+
+def dumps(strategy):
+    """
+    Returns the snapshot of a streaming strategy as bytes.
+    """
+    name = type(strategy).__name__
+    if name not in STRATEGIES:
+        raise ValueError("No snapshot format for {}".format(name))
+    parts = [_HEADER.pack(MAGIC, VERSION)]
+    _encode({'type': name, 'params': strategy.params(),
+             'state': strategy.getState()}, parts)
+    data = b''.join(parts)
+    return data + _CRC.pack(zlib.crc32(data))
+
+
+def loads(data):
+    """
+    Returns the strategy stored in a snapshot made by dumps.
+    """
+    if len(data) < _HEADER.size + _CRC.size:
+        raise ValueError("Snapshot is truncated")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a strategy snapshot")
+    if version > VERSION:
+        raise ValueError("Snapshot version {} is newer than {}"
+                         .format(version, VERSION))
+    (crc,) = _CRC.unpack_from(data, len(data) - _CRC.size)
+    if crc != zlib.crc32(data[:-_CRC.size]):
+        raise ValueError("Snapshot is corrupt")
+
+    snapshot, end = _decode(data, _HEADER.size)
+    if end != len(data) - _CRC.size:
+        raise ValueError("Snapshot is corrupt")
+    cls = STRATEGIES.get(snapshot['type'])
+    if cls is None:
+        raise ValueError("Unknown strategy {}".format(snapshot['type']))
+    strategy = cls(**snapshot['params'])
+    strategy.setState(snapshot['state'])
+    return strategy
+
+
+def save_snapshot(strategy, path):
+    """
+    Writes the snapshot of a strategy to path, replacing any previous
+    snapshot only once the new one is complete.
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as outfile:
+        outfile.write(dumps(strategy))
+    os.replace(tmp, path)
+
+
+def load_snapshot(path):
+    """
+    Returns the strategy stored at path by save_snapshot.
+    """
+    with open(path, 'rb') as infile:
+        return loads(infile.read())
+
+
+def resume(path, df, new_strategy=None, symbols=None):
+    """
+    Carries a strategy on from its snapshot over the bars of df after
+    its last bar, then saves the snapshot again.
+
+    Inputs:
+    - path:             (str) snapshot file
+    - df:               (pandas DataFrame) price history, indexed by
+                        increasing timestamps. Only rows after the
+                        strategy's last_timestamp are processed.
+    - new_strategy:     (function) returns the strategy to start with
+                        when there is no snapshot yet
+    - symbols:          (list, str) optional columns passed in each bar
+
+    Outputs:
+    - strategy:         (barStrategy) the strategy after the new bars
+    - orders:           (list, order) orders executed on the new bars
+    """
+    if os.path.exists(path):
+        strategy = load_snapshot(path)
+    elif new_strategy is not None:
+        strategy = new_strategy()
+    else:
+        raise ValueError("No snapshot at {}".format(path))
+
+    if strategy.last_timestamp is not None:
+        df = df[df.index > strategy.last_timestamp]
+    orders = replay(strategy, df, symbols=symbols)
+    save_snapshot(strategy, path)
+    return strategy, orders
+
+
+# Tagged encoding of None, bools, ints, floats, strings, datetimes and
+# lists and dicts of them.
+# -----------------------------------------------------------------------------
+def _encode(value, parts):
+    if value is None:
+        parts.append(b'N')
+    elif isinstance(value, (bool, np.bool_)):
+        parts.append(b'T' if value else b'F')
+    elif isinstance(value, numbers.Integral):
+        parts.append(b'i' + _INT.pack(int(value)))
+    elif isinstance(value, numbers.Real):
+        parts.append(b'f' + _FLOAT.pack(float(value)))
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        parts.append(b's' + _LENGTH.pack(len(encoded)) + encoded)
+    elif isinstance(value, datetime.datetime):
+        encoded = value.isoformat().encode('utf-8')
+        parts.append(b't' + _LENGTH.pack(len(encoded)) + encoded)
+    elif isinstance(value, (list, tuple)):
+        if len(value) > 0 and all(isinstance(x, float) for x in value):
+            parts.append(b'a' + _LENGTH.pack(len(value))
+                         + np.asarray(value, dtype='<f8').tobytes())
+        else:
+            parts.append(b'l' + _LENGTH.pack(len(value)))
+            for item in value:
+                _encode(item, parts)
+    elif isinstance(value, dict):
+        parts.append(b'd' + _LENGTH.pack(len(value)))
+        for key, item in value.items():
+            if not isinstance(key, str) or len(key.encode('utf-8')) > 255:
+                raise ValueError("Snapshot keys must be short strings")
+            encoded = key.encode('utf-8')
+            parts.append(bytes([len(encoded)]) + encoded)
+            _encode(item, parts)
+    else:
+        raise ValueError("Cannot snapshot a {}".format(type(value).__name__))
+
+
+def _decode(data, offset):
+    """
+    Returns the value encoded at offset and the offset after it.
+    """
+    try:
+        tag = data[offset:offset + 1]
+        offset += 1
+        if tag == b'N':
+            return None, offset
+        if tag in (b'T', b'F'):
+            return tag == b'T', offset
+        if tag == b'i':
+            return _INT.unpack_from(data, offset)[0], offset + _INT.size
+        if tag == b'f':
+            return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if tag in (b's', b't'):
+            text = data[offset:offset + length].decode('utf-8')
+            value = text if tag == b's' else pd.Timestamp(text)
+            return value, offset + length
+        if tag == b'a':
+            end = offset + 8*length
+            if end > len(data):
+                raise ValueError("Snapshot is truncated")
+            values = np.frombuffer(data[offset:end], dtype='<f8')
+            return values.tolist(), end
+        if tag == b'l':
+            values = []
+            for _ in range(length):
+                value, offset = _decode(data, offset)
+                values.append(value)
+            return values, offset
+        if tag == b'd':
+            values = {}
+            for _ in range(length):
+                end = offset + 1 + data[offset]
+                key = data[offset + 1:end].decode('utf-8')
+                values[key], offset = _decode(data, end)
+            return values, offset
+    except struct.error:
+        raise ValueError("Snapshot is truncated")
+    raise ValueError("Unknown snapshot tag {!r}".format(tag))
+# -----------------------------------------------------------------------------
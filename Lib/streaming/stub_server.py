@@ -0,0 +1,185 @@
+import bisect
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+
+_TICK_SECONDS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class stubServer():
+    """
+    A local stand in for the CryptoCompare histominute, histohour and
+    histoday endpoints, replaying recorded bars on a simulated clock.
+
+    Each request is answered with the last limit + 1 recorded bars of
+    the symbol at or before the simulated time (or toTs if earlier), in
+    the API's response format, so a liveFeed polling the server sees
+    new bars appear as the clock advances. As with the API the last bar
+    is still forming until its tick has passed: its close moves from
+    its open to the recorded close over the tick.
+
+    Initialisation:
+    - raw:              (dict or str) recorded bars as stored by
+                        webLoading's outfile_raw, {symbol: [bar, ...]},
+                        or the path of such a JSON file
+    - ticksize:         (str) "day", "hour" or "minute", requests for
+                        other ticksizes get an error response
+    - speed:            (float) simulated seconds per real second, 0
+                        holds the clock at start
+    - start:            (int) unix time of the simulated clock when the
+                        server starts, defaults to the first recorded bar
+    - host, port:       (str, int) address served, port 0 picks a free
+                        port
+
+    Members:
+    - self.url:         (str) base url of the server, pass as liveFeed's
+                        base_url. Set by start()
+    - self.requests:    (int) number of requests answered
+
+    Example usage:
+    ```
+    with stubServer("raw.json", ticksize="hour", speed=3600) as server:
+        feed = liveFeed(key, symbols, "hour", base_url=server.url,
+                        clock=server.now)
+        feed.run(duration=60)
+    ```
+    """
+
+    def __init__(self, raw, ticksize="hour", speed=1.0, start=None,
+                 host="127.0.0.1", port=0):
+        if isinstance(raw, str):
+            with open(raw) as infile:
+                raw = json.load(infile)
+        if ticksize not in _TICK_SECONDS:
+            raise ValueError(("Ticksize not compatible."
+                              + "Use: 'day', 'hour', 'minute'"))
+        if speed < 0:
+            raise ValueError("speed must be non negative")
+
+        self._bars = {symbol: sorted(bars, key=lambda bar: bar['time'])
+                      for symbol, bars in raw.items()}
+        self._times = {symbol: [bar['time'] for bar in bars]
+                       for symbol, bars in self._bars.items()}
+        if start is None:
+            first = [times[0] for times in self._times.values() if times]
+            start = min(first) if first else 0
+        self.ticksize = ticksize
+        self.speed = speed
+        self.start_time = start
+        self.url = None
+        self.requests = 0
+        self._address = (host, port)
+        self._server = None
+        self._thread = None
+        self._t0 = None
+
+    def now(self):
+        """
+        Returns the simulated unix time.
+        """
+        if self._t0 is None:
+            return self.start_time
+        return self.start_time + (time.monotonic() - self._t0)*self.speed
+
+    def respond(self, path):
+        """
+        Returns the response content of a request path, e.g.
+        '/data/histohour?fsym=ETH&tsym=BTC&limit=10&api_key=...'
+        """
+        parts = urllib.parse.urlsplit(path)
+        query = urllib.parse.parse_qs(parts.query)
+        if parts.path != "/data/histo" + self.ticksize:
+            return _error("Path not served: {}".format(parts.path))
+        symbol = query.get('fsym', [None])[0]
+        if symbol not in self._bars:
+            return _error("There is no data for the symbol {}."
+                          .format(symbol))
+        try:
+            limit = int(query.get('limit', ['1440'])[0])
+            to_ts = float(query.get('toTs', ['inf'])[0])
+        except ValueError:
+            return _error("limit and toTs must be numbers")
+
+        now = self.now()
+        end = bisect.bisect_right(self._times[symbol], min(now, to_ts))
+        data = self._bars[symbol][max(end - limit - 1, 0):end]
+        if data:
+            data[-1] = _forming(data[-1], now, _TICK_SECONDS[self.ticksize])
+        return {"Response": "Success", "Message": "", "HasWarning": False,
+                "Type": 100, "Aggregated": False,
+                "TimeFrom": data[0]['time'] if data else None,
+                "TimeTo": data[-1]['time'] if data else None,
+                "Data": data}
+
+    def start(self):
+        """
+        Starts serving in a background thread and the simulated clock.
+        """
+        if self._server is not None:
+            raise RuntimeError("Server already started")
+        stub = self
+
+        class handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = json.dumps(stub.respond(self.path)).encode()
+                stub.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(body)
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(self._address,
+                                                       handler)
+        self._server.daemon_threads = True
+        host, port = self._server.server_address[:2]
+        self.url = "http://{}:{}".format(host, port)
+        self._t0 = time.monotonic()
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _forming(bar, now, tick):
+    """
+    Returns bar as served at time now, with its close part way from its
+    open to its recorded close if its tick has not passed.
+    """
+    elapsed = (now - bar['time'])/tick
+    if elapsed >= 1:
+        return bar
+    bar = dict(bar)
+    opened = bar.get('open', bar['close'])
+    bar['close'] = opened + (bar['close'] - opened)*max(elapsed, 0.0)
+    return bar
+
+
+def _error(message):
+    return {"Response": "Error", "Message": message, "HasWarning": False,
+            "Type": 1, "Data": []}
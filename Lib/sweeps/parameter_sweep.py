@@ -0,0 +1,497 @@
+import multiprocessing as mp
+import os.path
+import shutil
+import tempfile
+import numpy as np
+
+from .shared_price_matrix import sharedPriceMatrix
+from .results_store import data_fingerprint, run_key
+from ..strategies.crossover import crossoverTrader
+from ..strategies.zscore_trend import zScoreTrader
+from ..strategies.pairs import pairsTrader
+from ..strategies.pairs_cache import spreadCache
+from ..strategy_backtester import backtest
+from ..instrumentation import timing, memory
+
+# Price view attached once per worker process by _init_worker
+_worker_prices = None
+# Free running spreads of the pairs traded by the worker process
+_worker_spreads = None
+# Whether workers ship their instrumentation back with each result
+_worker_instrumented = False
+
+# Rough memory estimates used to fit a sweep into its memory budget:
+# resident bytes of an idle worker process and bytes per bar of a run
+# (its DataFrame columns, indicators and temporaries)
+_WORKER_BYTES = 96*2**20
+_JOB_BYTES_PER_BAR = {'crossover': 64, 'zscore': 80, 'pairs': 160}
+
+
+class parameterSweep():
+    """
+    Runs a grid of backtests over a loaded price DataFrame, optionally
+    across a pool of worker processes.
+
+    The DataFrame is published once through a sharedPriceMatrix. Each
+    worker attaches to it by name on start up and afterwards only
+    receives small job descriptions, so worker start up time and
+    memory stay roughly flat as the number of workers grows.
+
+    A job is a tuple (strategy, symbols, params) where:
+    - strategy:         (str) 'crossover', 'zscore' or 'pairs'
+    - symbols:          (tuple, str) one symbol, or two for 'pairs'
+    - params:           (dict) keyword arguments of the strategy's
+                        constructor, e.g. for 'crossover':
+                        {'MA_type': 'SMA', 'slow_MA': 40, 'fast_MA': 10}
+
+    Initialisation:
+    - df:               (pandas DataFrame) containing asset price
+                        history. Non numeric columns are ignored.
+    - workers:          (int) number of worker processes. 1 runs all
+                        jobs in the calling process.
+    - start_method:     (str) optional multiprocessing start method,
+                        'fork', 'spawn' or 'forkserver'.
+    - memory_budget:    (int) optional bytes the sweep may use. run()
+                        lowers the number of workers to fit the
+                        estimated memory of the price matrix, workers
+                        and results into it, and spills kept returns to
+                        disk once they would exceed it.
+    - spill_dir:        (str) directory of spilled returns. Each run()
+                        spills into a new subdirectory of it, or of the
+                        system's temporary directory by default. The
+                        subdirectories are only removed by close().
+
+    Members:
+    - self.effective_workers:   (int) workers used by the last run()
+    - self.spilled:             (int) returns arrays spilled to disk by
+                                the last run(). They are returned as
+                                read only memory mapped arrays.
+    - self.spill_path:          (str) directory the last run() spilled
+                                into, None if it spilled nothing
+    - self.spill_paths:         (list, str) directories spilled into by
+                                every run() since the last close()
+
+    Example usage:
+    ```
+    jobs = [('crossover', ('ETH',), {'MA_type': 'SMA', 'slow_MA': s,
+                                     'fast_MA': f})
+            for f, s in [(1, 10), (10, 40)]]
+    sweep = parameterSweep(df, workers=4)
+    results = sweep.run(jobs)
+    ```
+
+    A sweep that may spill is closed once its results are no longer
+    needed, to delete the spilled files:
+    ```
+    with parameterSweep(df, memory_budget=2**30) as sweep:
+        results = sweep.run(jobs, keep_returns=True)
+        ...
+    ```
+
+    Notes:
+    - zscore jobs that differ only in their bandwidth are run together
+    by one zScoreTrader with a list of bandwidths, so their indicators
+    are computed once. The pairs jobs of a pair are run together by one
+    worker sharing a spreadCache, so the pair is filtered once. With
+    fewer pairs than workers each pair's jobs are split into enough
+    chunks to keep every worker busy. Results are the same as run one
+    by one.
+    - If timing or memory instrumentation is enabled (see
+    instrumentation.timing and instrumentation.memory) when run() is
+    called, the workers record their timings and memory too and they
+    are merged into the caller's recorder and tracker as results
+    arrive.
+    """
+
+    def __init__(self, df, workers=1, start_method=None, memory_budget=None,
+                 spill_dir=None):
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive int")
+        if memory_budget is not None:
+            num_prices = df.select_dtypes('number').size
+            if memory_budget <= 8*num_prices:
+                raise ValueError("memory_budget is smaller than the prices")
+
+        self.df = df
+        self.workers = workers
+        self.start_method = start_method
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.effective_workers = workers
+        self.spilled = 0
+        self.spill_path = None
+        self.spill_paths = []
+
+    def close(self):
+        """
+        Deletes the returns spilled by every run(). It is the caller's
+        job to call it, or to use the sweep in a with block, once it has
+        released the memory mapped returns of the results. Safe to call
+        more than once.
+        """
+        for path in self.spill_paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+        self.spill_paths = []
+        self.spill_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run(self, jobs, keep_returns=False, chunksize=1, store=None):
+        """
+        Executes all jobs and returns their results in job order.
+
+        Inputs:
+        - jobs:             (list) of (strategy, symbols, params) tuples
+        - keep_returns:     (bool) also return each run's df['returns']
+        - chunksize:        (int) number of jobs sent to a worker at once
+        - store:            (resultsStore) optional store. Each finished
+                            run is committed to it straight away and
+                            runs already completed in it are skipped.
+
+        Outputs:
+        - results:          (list) cumulative returns of each job, or
+                            (cum_returns, returns array) tuples if
+                            keep_returns
+        """
+        for job in jobs:
+            validate_job(job)
+
+        results = [None]*len(jobs)
+        pending = list(range(len(jobs)))
+        keys, fingerprint = None, None
+        if store is not None:
+            fingerprint = data_fingerprint(self.df)
+            keys = [run_key(job, fingerprint) for job in jobs]
+            completed = store.completedKeys()
+            pending = [n for n in pending if keys[n] not in completed]
+            for n in set(range(len(jobs))) - set(pending):
+                results[n] = store.getCumReturns(keys[n])
+                if keep_returns:
+                    results[n] = (results[n], store.getReturns(keys[n]))
+
+        store_returns = keep_returns or store is not None
+        groups = _group_jobs(jobs, pending, self.workers)
+        items = [(_grouped_job(jobs, group), store_returns)
+                 for group in groups]
+        if len(items) == 0:
+            return results
+        pending = [n for group in groups for n in group]
+
+        self.spilled = 0
+        self.spill_path = None
+        with sharedPriceMatrix(self.df) as prices:
+            workers, results_budget = self._budgetWorkers(
+                prices.nbytes, [jobs[n] for n in pending], keep_returns)
+            self.effective_workers = workers
+
+            if workers == 1 or len(items) == 1:
+                _init_worker(prices.spec)
+                try:
+                    outputs = _ungroup(map(_run_job, items), groups)
+                    self._collect(outputs, pending, results, jobs,
+                                  keep_returns, store, keys, fingerprint,
+                                  results_budget)
+                finally:
+                    _close_worker()
+            else:
+                recorder = timing.get_recorder()
+                tracker = memory.get_tracker()
+                instrumentation = (
+                    None if recorder is None else recorder.trace,
+                    None if tracker is None else tracker.snapshots)
+                ctx = mp.get_context(self.start_method)
+                with ctx.Pool(workers, initializer=_init_worker,
+                              initargs=(prices.spec,) + instrumentation
+                              ) as pool:
+                    outputs = pool.imap(_run_job, items, chunksize=chunksize)
+                    if recorder is not None or tracker is not None:
+                        outputs = _merge_instrumentation(outputs, recorder,
+                                                         tracker)
+                    outputs = _ungroup(outputs, groups)
+                    self._collect(outputs, pending, results, jobs,
+                                  keep_returns, store, keys, fingerprint,
+                                  results_budget)
+
+        return results
+
+    def _budgetWorkers(self, matrix_bytes, jobs, keep_returns):
+        """
+        Returns the number of workers that fit the memory budget and
+        the bytes left for kept results.
+        """
+        if self.memory_budget is None:
+            return self.workers, None
+
+        num_bars = self.df.shape[0]
+        job_bytes = max(_JOB_BYTES_PER_BAR[job[0]] for job in jobs)*num_bars
+        results_bytes = 8*num_bars*len(jobs) if keep_returns else 0
+        available = self.memory_budget - matrix_bytes
+
+        workers = self.workers
+        while workers > 1:
+            needed = workers*(_WORKER_BYTES + job_bytes)
+            if needed + min(results_bytes, available//2) <= available:
+                break
+            workers -= 1
+        if workers == 1:
+            # runs in this process, no worker overhead
+            return 1, available - job_bytes
+        return workers, available - workers*(_WORKER_BYTES + job_bytes)
+
+    def _collect(self, outputs, pending, results, jobs, keep_returns,
+                 store, keys, fingerprint, results_budget=None):
+        """
+        Stores worker outputs as they arrive, committing each one to
+        the results store so an interrupted sweep loses no finished run.
+        Kept returns are spilled to disk once they exceed
+        results_budget bytes, or the process's resident memory nears
+        the memory budget.
+        """
+        held = 0
+        for n, output in zip(pending, outputs):
+            if store is not None:
+                cum_returns, returns = output
+                store.append(keys[n], jobs[n], fingerprint,
+                             cum_returns, returns)
+                if not keep_returns:
+                    output = cum_returns
+            if keep_returns and results_budget is not None:
+                cum_returns, returns = output
+                rss = memory.current_rss()
+                if (held + returns.nbytes > results_budget
+                        or (rss is not None
+                            and rss > 0.9*self.memory_budget)):
+                    output = cum_returns, self._spill(n, returns)
+                else:
+                    held += returns.nbytes
+            results[n] = output
+
+    def _spill(self, n, returns):
+        """
+        Writes the returns of job n to the run's spill directory and
+        returns them memory mapped. Every run spills into a new
+        directory, so it never overwrites arrays an earlier run's
+        results still map.
+        """
+        if self.spill_path is None:
+            if self.spill_dir is not None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            self.spill_path = tempfile.mkdtemp(prefix="sweep_spill_",
+                                               dir=self.spill_dir)
+            self.spill_paths.append(self.spill_path)
+        path = os.path.join(self.spill_path, "returns_{}.npy".format(n))
+        np.save(path, returns)
+        self.spilled += 1
+        return np.load(path, mmap_mode='r')
+
+
+def build_strategy(strategy, prices, symbols, params, spread_cache=None):
+    """
+    Constructs a strategy object from a sharedPriceView.
+
+    Inputs:
+    - strategy:         (str) 'crossover', 'zscore' or 'pairs'
+    - prices:           (sharedPriceView) attached price matrix
+    - symbols:          (tuple, str) symbols traded by the job
+    - params:           (dict) constructor keyword arguments
+    - spread_cache:     (spreadCache) optional cache for pairs jobs
+    """
+    if strategy == 'crossover':
+        df = prices.getFrame(symbols)
+        return crossoverTrader(df, symbols[0], **params)
+    elif strategy == 'zscore':
+        df = prices.getFrame(symbols)
+        return zScoreTrader(df, symbols[0], **params)
+    elif strategy == 'pairs':
+        df = prices.getFrame(symbols)
+        x, y = df[symbols[0]], df[symbols[1]]
+        return pairsTrader(x, y, symbols[0], symbols[1],
+                           spread_cache=spread_cache, **params)
+    else:
+        raise ValueError("Strategy not recognised")
+
+
+def validate_job(job):
+    """
+    Checks the shape of a job before it is sent to a worker, raising a
+    ValueError if it cannot be run.
+
+    Inputs:
+    - job:              (tuple) (strategy, symbols, params) as taken by
+                        parameterSweep.run
+    """
+    strategy, symbols, params = job
+    if strategy not in ('crossover', 'zscore', 'pairs'):
+        raise ValueError("Strategy not recognised: {}".format(strategy))
+    num_symbols = 2 if strategy == 'pairs' else 1
+    if len(symbols) != num_symbols:
+        raise ValueError("{} jobs need {} symbol(s)"
+                         .format(strategy, num_symbols))
+    if not isinstance(params, dict):
+        raise ValueError("Job params must be a dict")
+    if strategy == 'zscore' and np.ndim(params.get('bandwidth')) > 0:
+        raise ValueError("zscore jobs take one bandwidth each")
+
+
+def _group_jobs(jobs, pending, workers=1):
+    """
+    Groups the pending zscore jobs that differ only in bandwidth, and
+    the pending pairs jobs of each pair. Every other job, and repeats
+    of a zscore job, are kept on their own. If there are fewer pairs
+    than workers the jobs of each pair are split into
+    ceil(workers/pairs) groups.
+
+    Outputs:
+    - groups:           (list, list) job indices of each group, in order
+                        of their first job
+    """
+    groups, grouped = [], {}
+    for n in pending:
+        strategy, symbols, params = jobs[n]
+        if strategy == 'pairs':
+            key = ('pairs', tuple(symbols))
+            if key not in grouped:
+                grouped[key] = []
+                groups.append(grouped[key])
+            grouped[key].append(n)
+            continue
+        if strategy != 'zscore':
+            groups.append([n])
+            continue
+        others = sorted((key, value) for key, value in params.items()
+                        if key != 'bandwidth')
+        key = (tuple(symbols), repr(others))
+        bandwidths = [jobs[m][2]['bandwidth'] for m in grouped.get(key, [])]
+        if key in grouped and params['bandwidth'] not in bandwidths:
+            grouped[key].append(n)
+        else:
+            # repeated jobs run again, as without grouping
+            grouped[key] = [n]
+            groups.append(grouped[key])
+
+    num_pairs = sum(key[0] == 'pairs' for key in grouped)
+    if num_pairs == 0 or num_pairs >= workers:
+        return groups
+    parts = -(-workers // num_pairs)
+    split = []
+    for group in groups:
+        if jobs[group[0]][0] != 'pairs':
+            split.append(group)
+            continue
+        size = -(-len(group) // parts)
+        split.extend(group[k:k + size] for k in range(0, len(group), size))
+    return split
+
+
+def _grouped_job(jobs, group):
+    """
+    Returns the job run for a group: for several zscore jobs the job
+    with a list of the group's bandwidths and for several pairs jobs the
+    pair with a list of the params of each job.
+    """
+    if len(group) == 1:
+        return jobs[group[0]]
+    strategy, symbols, params = jobs[group[0]]
+    if strategy == 'pairs':
+        return strategy, symbols, [jobs[n][2] for n in group]
+    params = dict(params)
+    params['bandwidth'] = [jobs[n][2]['bandwidth'] for n in group]
+    return strategy, symbols, params
+
+
+def _ungroup(outputs, groups):
+    """
+    Yields the output of each job from the outputs of their groups.
+    """
+    for group, output in zip(groups, outputs):
+        if len(group) == 1:
+            yield output
+        else:
+            yield from output
+
+
+def _init_worker(spec, timing_trace=None, memory_snapshots=None):
+    """
+    Attaches the worker process to the published price matrix. If
+    timing_trace (memory_snapshots) is not None phase timing (memory
+    accounting) is enabled in the worker, with tracing (snapshots) if
+    it is True.
+    """
+    global _worker_prices, _worker_spreads, _worker_instrumented
+    _worker_prices = sharedPriceMatrix.attach(spec)
+    _worker_spreads = spreadCache()
+    # a forked worker inherits the parent's recorder and tracker, so
+    # always start afresh
+    if timing_trace is not None:
+        timing.disable()
+        timing.enable(trace=timing_trace)
+        _worker_instrumented = True
+    if memory_snapshots is not None:
+        memory.disable()
+        memory.enable(snapshots=memory_snapshots)
+        _worker_instrumented = True
+
+
+def _close_worker():
+    """
+    Detaches the calling process from the published price matrix.
+    """
+    global _worker_prices, _worker_spreads
+    if _worker_prices is not None:
+        _worker_prices.close()
+    _worker_prices = None
+    _worker_spreads = None
+
+
+def _run_job(item):
+    """
+    Runs a single job, or a group of jobs, in a worker process.
+    """
+    (strategy, symbols, params), keep_returns = item
+    if isinstance(params, list):
+        # the pairs jobs of a pair
+        output = [_run_one(strategy, symbols, job_params, keep_returns)
+                  for job_params in params]
+    else:
+        output = _run_one(strategy, symbols, params, keep_returns)
+    if _worker_instrumented:
+        return output, (timing.drain(), memory.drain())
+    return output
+
+
+def _run_one(strategy, symbols, params, keep_returns):
+    """
+    Runs the backtest of a job and returns its output.
+    """
+    # the strategies measure their own construction
+    trader = build_strategy(strategy, _worker_prices, symbols, params,
+                            spread_cache=_worker_spreads)
+    cum_returns = backtest(trader).trade()
+    output = cum_returns
+    if strategy == 'zscore' and trader.bandwidths is not None:
+        # one output per bandwidth of a grouped job
+        output = list(cum_returns)
+        if keep_returns:
+            output = [(cum_returns[k], trader.returns[:, k].copy())
+                      for k in range(len(output))]
+    elif keep_returns:
+        output = cum_returns, trader.df['returns'].to_numpy()
+    return output
+
+
+def _merge_instrumentation(outputs, recorder, tracker):
+    """
+    Merges the timings and memory measurements shipped with worker
+    outputs into recorder and tracker and yields the outputs alone.
+    """
+    for output, (timings, measurements) in outputs:
+        if recorder is not None and timings is not None:
+            recorder.merge(timings)
+        if tracker is not None and measurements is not None:
+            tracker.merge(measurements)
+        yield output
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+
+
+class resultsStore():
+    """
+    Append-only SQLite store for the results of a parameter sweep.
+
+    Every completed run is committed as soon as it finishes under a
+    key that hashes (strategy, symbols, params, data fingerprint). A
+    sweep that is interrupted can therefore be restarted and will skip
+    every run already in the completion index. The database is opened
+    in write-ahead-log mode so that partial results can be queried from
+    another process while the sweep is still running.
+
+    Initialisation:
+    - path:             (str) file name of the sqlite database. Created
+                        if it does not exist.
+
+    Members:
+    - self.path:        path (see initialisation)
+
+    Example usage:
+    ```
+    with resultsStore("sweep.db") as store:
+        sweep.run(jobs, store=store)
+        summary = store.getResults(strategy='pairs')
+    ```
+
+    Notes:
+    - Trade returns are stored sparsely as the indices and values of
+    the non zero entries of a run's df['returns'].
+    """
+
+    def __init__(self, path):
+        if not isinstance(path, str):
+            raise ValueError("path must be a string")
+
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                key TEXT PRIMARY KEY,
+                strategy TEXT NOT NULL,
+                symbols TEXT NOT NULL,
+                params TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                cum_returns REAL,
+                length INTEGER,
+                trade_index BLOB,
+                trade_returns BLOB
+            )""")
+        self._conn.commit()
+
+    def isComplete(self, key):
+        """
+        Returns True if a run with key is in the completion index
+        """
+        row = self._conn.execute("SELECT 1 FROM runs WHERE key = ?",
+                                 (key,)).fetchone()
+        return row is not None
+
+    def completedKeys(self):
+        """
+        Returns the set of keys of all completed runs
+        """
+        return {row[0] for row in self._conn.execute("SELECT key FROM runs")}
+
+    def append(self, key, job, fingerprint, cum_returns, returns=None):
+        """
+        Commits the result of a completed run.
+
+        Inputs:
+        - key:              (str) key of the run, see run_key
+        - job:              (tuple) (strategy, symbols, params) of run
+        - fingerprint:      (str) fingerprint of the data, see
+                            data_fingerprint
+        - cum_returns:      (float) cumulative returns of the run
+        - returns:          (np array) optional df['returns'] of the run
+        """
+        strategy, symbols, params = job
+        if returns is None:
+            length, index, values = None, None, None
+        else:
+            returns = np.asarray(returns, dtype=np.float64)
+            nonzero = np.flatnonzero(returns)
+            length = returns.shape[0]
+            index = nonzero.astype(np.int64).tobytes()
+            values = returns[nonzero].tobytes()
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, strategy, json.dumps(list(symbols)),
+             json.dumps(params, sort_keys=True, default=_to_builtin),
+             fingerprint,
+             float(cum_returns), length, index, values))
+        self._conn.commit()
+
+    def getCumReturns(self, key):
+        """
+        Returns the cumulative returns of a completed run
+        """
+        row = self._conn.execute("SELECT cum_returns FROM runs WHERE key = ?",
+                                 (key,)).fetchone()
+        if row is None:
+            raise KeyError("No completed run with key {}".format(key))
+        return row[0]
+
+    def getReturns(self, key):
+        """
+        Rebuilds the full df['returns'] array of a completed run
+        """
+        row = self._conn.execute(
+            "SELECT length, trade_index, trade_returns FROM runs "
+            "WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError("No completed run with key {}".format(key))
+        length, index, values = row
+        if length is None:
+            raise ValueError("Returns were not stored for run {}".format(key))
+
+        returns = np.zeros(length)
+        returns[np.frombuffer(index, dtype=np.int64)] = np.frombuffer(values)
+        return returns
+
+    def getResults(self, strategy=None):
+        """
+        Returns a summary of all completed runs, one row per run, with
+        the run params expanded into columns.
+
+        Inputs:
+        - strategy:         (str) optional strategy name to filter on
+        """
+        query = ("SELECT key, strategy, symbols, params, fingerprint, "
+                 "cum_returns FROM runs")
+        args = ()
+        if strategy is not None:
+            query += " WHERE strategy = ?"
+            args = (strategy,)
+
+        rows = []
+        for key, strat, symbols, params, fingerprint, cum_returns in \
+                self._conn.execute(query, args):
+            row = {'key': key, 'strategy': strat,
+                   'symbols': '/'.join(json.loads(symbols)),
+                   'fingerprint': fingerprint, 'cum_returns': cum_returns}
+            row.update(json.loads(params))
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def close(self):
+        """
+        Closes the connection to the database
+        """
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def data_fingerprint(df):
+    """
+    Computes a short hash identifying the contents of a DataFrame.
+    Two DataFrames with the same headers and values give the same
+    fingerprint.
+    """
+    digest = hashlib.sha1()
+    for key in df.keys():
+        digest.update(str(key).encode())
+        values = df[key].to_numpy()
+        if values.dtype.kind in 'biuf':
+            digest.update(np.ascontiguousarray(values, dtype=np.float64)
+                          .tobytes())
+        else:
+            digest.update('\x1f'.join(map(str, values)).encode())
+    return digest.hexdigest()[:16]
+
+
+def run_key(job, fingerprint):
+    """
+    Computes the completion index key of a sweep job.
+
+    Inputs:
+    - job:              (tuple) (strategy, symbols, params)
+    - fingerprint:      (str) fingerprint of the data, see
+                        data_fingerprint
+    """
+    strategy, symbols, params = job
+    payload = json.dumps([strategy, list(symbols), params, fingerprint],
+                         sort_keys=True, default=_to_builtin)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _to_builtin(value):
+    """
+    Converts numpy scalars in job params to python types for json.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("{} is not json serialisable".format(type(value)))
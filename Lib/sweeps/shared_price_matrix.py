@@ -0,0 +1,178 @@
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+
+class sharedPriceMatrix():
+    """
+    Publishes the close prices of a loaded DataFrame once into a named
+    shared memory segment so that parallel sweep workers can read them
+    without each receiving a pickled copy of the DataFrame.
+
+    Prices are stored symbol-major, i.e. with shape (symbols x time),
+    so that the series of a single asset is contiguous in memory.
+
+    Initialisation:
+    - df:               (pandas DataFrame) containing asset price
+                        history, e.g. the output of dataLoader.get_data
+    - symbols:          (list, str) optional headers of df to publish.
+                        Defaults to every numeric column of df.
+
+    Members:
+    - self.name:        (str) name of the shared memory segment
+    - self.symbols:     (list, str) published symbols, one row each
+    - self.shape:       (tuple, int) shape of the published matrix
+    - self.values:      (np array) writeable view of the matrix owned
+                        by this process
+
+    Example usage:
+    ```
+    with sharedPriceMatrix(df) as prices:
+        spec = prices.spec  # small, picklable handle for workers
+        ...
+    # in a worker process:
+    view = sharedPriceMatrix.attach(spec)
+    eth = view.getSeries('ETH')
+    ```
+
+    Notes:
+    - The segment is unlinked when close() is called, when the object
+    is garbage collected or when the interpreter exits. If the owning
+    process is killed, multiprocessing's resource tracker unlinks the
+    segment on its behalf.
+    """
+
+    def __init__(self, df, symbols=None):
+        if not isinstance(df, pd.DataFrame):
+            raise ValueError("df must be a pandas DataFrame")
+        if symbols is None:
+            symbols = [key for key in df.keys()
+                       if pd.api.types.is_numeric_dtype(df[key])]
+        if not all(symbol in df.keys() for symbol in symbols):
+            raise ValueError("symbols must be headers of df")
+        if len(symbols) == 0:
+            raise ValueError("No numeric price series to publish")
+
+        self.symbols = list(symbols)
+        self.shape = (len(self.symbols), df.shape[0])
+        nbytes = max(int(np.prod(self.shape)) * 8, 1)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.name = self._shm.name
+        self.values = np.ndarray(self.shape, dtype=np.float64,
+                                 buffer=self._shm.buf)
+        for i, symbol in enumerate(self.symbols):
+            self.values[i, :] = df[symbol].to_numpy(dtype=np.float64)
+
+        self._finalizer = weakref.finalize(self, _release_segment,
+                                           self._shm, True)
+
+    @property
+    def spec(self):
+        """
+        Returns a picklable handle (name, shape, symbols) used by
+        worker processes to attach to the published matrix.
+        """
+        return (self.name, self.shape, tuple(self.symbols))
+
+    @property
+    def nbytes(self):
+        """
+        Returns the number of bytes held in shared memory
+        """
+        return self.values.nbytes
+
+    @staticmethod
+    def attach(spec):
+        """
+        Attaches to a published matrix by name.
+
+        Inputs:
+        - spec:             (tuple) handle returned by self.spec
+
+        Outputs:
+        - view:             (sharedPriceView) read only view of the
+                            published prices
+        """
+        return sharedPriceView(spec)
+
+    def close(self):
+        """
+        Releases and unlinks the shared memory segment. Safe to call
+        more than once.
+        """
+        self.values = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class sharedPriceView():
+    """
+    Read only view of a sharedPriceMatrix attached from another
+    process.
+
+    Initialisation:
+    - spec:             (tuple) handle returned by
+                        sharedPriceMatrix.spec
+
+    Members:
+    - self.symbols:     (list, str) published symbols
+    - self.values:      (np array) read only (symbols x time) prices
+    """
+
+    def __init__(self, spec):
+        name, shape, symbols = spec
+        self._shm = shared_memory.SharedMemory(name=name)
+        self.symbols = list(symbols)
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.values = np.ndarray(shape, dtype=np.float64,
+                                 buffer=self._shm.buf)
+        self.values.flags.writeable = False
+        self._finalizer = weakref.finalize(self, _release_segment,
+                                           self._shm, False)
+
+    def getSeries(self, symbol):
+        """
+        Returns the read only price array of symbol
+        """
+        if symbol not in self._rows:
+            raise ValueError("{} is not a published symbol".format(symbol))
+        return self.values[self._rows[symbol]]
+
+    def getFrame(self, symbols):
+        """
+        Builds a DataFrame holding copies of the given symbols only.
+        Strategies write into their DataFrame so they must never
+        receive the shared buffer itself.
+        """
+        return pd.DataFrame({symbol: np.array(self.getSeries(symbol))
+                             for symbol in symbols})
+
+    def close(self):
+        """
+        Detaches from the shared memory segment without unlinking it.
+        """
+        self.values = None
+        self._finalizer()
+
+
+def _release_segment(shm, unlink):
+    """
+    Closes a shared memory segment and optionally unlinks it.
+    """
+    try:
+        shm.close()
+    except BufferError:
+        # a numpy view is still alive, the mapping goes with the process
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
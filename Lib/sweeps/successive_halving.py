@@ -0,0 +1,168 @@
+import math
+import numpy as np
+import pandas as pd
+
+from ..strategies import event_kernels as kernels
+
+
+class successiveHalving():
+    """
+    Budgeted search over a crossoverTrader or zScoreTrader parameter
+    grid using successive halving.
+
+    All candidates are first evaluated on a small budget, either a
+    short prefix of the history or a subset of the symbols. The worst
+    candidates are dropped and only the best 1/eta of them are promoted
+    to the next rung, where the budget is eta times larger. The last
+    rung evaluates the remaining candidates on the full budget.
+
+    Candidates are scored by their cumulative returns averaged over the
+    symbols of the rung. Evaluation uses event_kernels, so a candidate
+    costs one indicator pass and a replay of its events per symbol.
+
+    Initialisation:
+    - df:               (pandas DataFrame) containing asset price
+                        history
+    - symbols:          (list, str) headers of df to trade
+    - strategy:         (str) 'crossover' or 'zscore'
+    - grid:             (list, dict) strategy constructor keyword
+                        arguments of each candidate
+    - resource:         (str) 'bars' to grow the history prefix,
+                        'symbols' to grow the number of symbols
+    - min_resource:     (int) budget of the first rung. Defaults to
+                        1000 bars or 1 symbol.
+    - eta:              (int) keep the best 1/eta candidates per rung
+
+    Members:
+    - self.rungs:       (list, tuple) (number of candidates, budget) of
+                        each rung
+    - self.compute:     (dict) bars evaluated by the search, bars a full
+                        grid would evaluate and the fraction saved. Set
+                        by run().
+
+    Example usage:
+    ```
+    search = successiveHalving(df, symbols, 'zscore', grid, eta=3)
+    ranking = search.run()
+    print(search.compute['saved'])
+    ```
+    """
+
+    def __init__(self, df, symbols, strategy, grid, resource='bars',
+                 min_resource=None, eta=2):
+        if not isinstance(df, pd.DataFrame):
+            raise ValueError("df must be a pandas DataFrame")
+        if not all(symbol in df.keys() for symbol in symbols):
+            raise ValueError("symbols must be headers of df")
+        if strategy not in ('crossover', 'zscore'):
+            raise ValueError("Strategy must be 'crossover' or 'zscore'")
+        if len(grid) == 0:
+            raise ValueError("Parameter grid is empty")
+        if resource not in ('bars', 'symbols'):
+            raise ValueError("resource must be 'bars' or 'symbols'")
+        if not isinstance(eta, int) or eta < 2:
+            raise ValueError("eta must be an int of at least 2")
+
+        if resource == 'bars':
+            max_resource = df.shape[0]
+            min_resource = 1000 if min_resource is None else min_resource
+        else:
+            max_resource = len(symbols)
+            min_resource = 1 if min_resource is None else min_resource
+        if not isinstance(min_resource, int) or min_resource < 1:
+            raise ValueError("min_resource must be a positive int")
+
+        self.df = df
+        self.symbols = list(symbols)
+        self.strategy = strategy
+        self.grid = list(grid)
+        self.resource = resource
+        self.eta = eta
+        self.compute = None
+        self.rungs = self._schedule(min(min_resource, max_resource),
+                                    max_resource)
+
+    def _schedule(self, min_resource, max_resource):
+        """
+        Builds the (number of candidates, budget) of each rung such
+        that the last rung runs on max_resource.
+        """
+        num_candidates = len(self.grid)
+        num_rungs = min(int(math.log(max_resource/min_resource, self.eta)
+                            + 1e-9),
+                        math.ceil(math.log(num_candidates, self.eta)))
+        rungs = []
+        for r in range(num_rungs + 1):
+            budget = int(max_resource / self.eta**(num_rungs - r))
+            survivors = math.ceil(num_candidates / self.eta**r)
+            rungs.append((survivors, budget))
+        return rungs
+
+    def _score(self, candidates, budget):
+        """
+        Scores candidates on the given budget.
+
+        Outputs:
+        - scores:           (np array) average cumulative returns
+        - bars:             (int) number of bars evaluated
+        """
+        if self.resource == 'bars':
+            symbols, bars = self.symbols, budget
+        else:
+            symbols, bars = self.symbols[:budget], self.df.shape[0]
+
+        grid = [self.grid[k] for k in candidates]
+        replay = kernels.replay_function(self.strategy)
+        scores = np.zeros(len(candidates))
+        for symbol in symbols:
+            series = self.df[symbol].iloc[:bars].reset_index(drop=True)
+            prices = series.to_numpy(dtype=np.float64)
+            events = kernels.grid_events(series, self.strategy, grid)
+            for n, (index, codes, fee) in enumerate(events):
+                _, _, returns = replay(prices, index, codes, 0, bars, fee)
+                scores[n] += returns.sum()
+
+        scores = np.nan_to_num(scores/len(symbols), nan=-np.inf)
+        return scores, len(candidates)*len(symbols)*bars
+
+    def run(self):
+        """
+        Runs the search.
+
+        Outputs:
+        - ranking:          (pandas DataFrame) every candidate, best
+                            first, with the last rung it reached, the
+                            budget of that rung and its score there.
+                            Candidates that reached a later rung rank
+                            above those dropped earlier.
+        """
+        candidates = np.arange(len(self.grid))
+        reached = np.zeros(len(self.grid), dtype=int)
+        budgets = np.zeros(len(self.grid), dtype=int)
+        scores = np.full(len(self.grid), -np.inf)
+        evaluated = 0
+
+        for rung, (survivors, budget) in enumerate(self.rungs):
+            if rung > 0:
+                order = np.argsort(-scores[candidates], kind='stable')
+                candidates = candidates[order[:survivors]]
+            rung_scores, bars = self._score(candidates, budget)
+            scores[candidates] = rung_scores
+            reached[candidates] = rung
+            budgets[candidates] = budget
+            evaluated += bars
+
+        full = len(self.grid)*len(self.symbols)*self.df.shape[0]
+        self.compute = {'evaluated_bars': evaluated, 'full_grid_bars': full,
+                        'saved': 1.0 - evaluated/full}
+
+        rows = []
+        for k, params in enumerate(self.grid):
+            row = {'candidate': k, 'rung': reached[k],
+                   self.resource: budgets[k], 'score': scores[k]}
+            row.update(params)
+            rows.append(row)
+        ranking = pd.DataFrame(rows)
+        ranking = ranking.sort_values(['rung', 'score'], ascending=False,
+                                      kind='stable')
+        return ranking.reset_index(drop=True)
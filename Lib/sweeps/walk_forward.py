@@ -0,0 +1,193 @@
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+from .shared_price_matrix import sharedPriceMatrix
+from ..strategies import event_kernels as kernels
+
+# State set up once per worker process by _init_worker
+_worker_state = None
+
+
+class walkForward():
+    """
+    Walk-forward optimisation of crossoverTrader or zScoreTrader
+    parameters.
+
+    The history is split into consecutive train/test windows. For each
+    window every parameter set of the grid is evaluated on the train
+    window, the best one (highest cumulative returns) is selected and
+    then evaluated on the following, out of sample, test window.
+
+    Indicators are computed once over the full series, using the same
+    moving average and z score types as the strategies, and the bars
+    on which each parameter set can trade are found once with
+    event_kernels. Each window then only replays the events falling in
+    it, so the cost grows with windows x grid rather than with
+    windows x grid x history length.
+
+    Initialisation:
+    - df:               (pandas DataFrame) containing asset price
+                        history
+    - asset_symbol:     (str) header of asset price history in df
+    - strategy:         (str) 'crossover' or 'zscore'
+    - grid:             (list, dict) constructor keyword arguments of
+                        each parameter set, e.g. for 'zscore':
+                        {'MA_type': 'SMA', 'slow_MA': 80,
+                         'zscore_period': 8, 'bandwidth': 1.5,
+                         'fast_MA': 27}
+    - train_size:       (int) number of bars in each train window
+    - test_size:        (int) number of bars in each test window
+    - step:             (int) bars between consecutive windows.
+                        Defaults to test_size.
+    - anchored:         (bool) if True every train window starts at the
+                        first bar, otherwise windows roll forward
+    - workers:          (int) number of processes evaluating windows
+
+    Members:
+    - self.windows:     (list, tuple) (train_start, train_end,
+                        test_start, test_end) bar indices of each window
+
+    Notes:
+    - Positions still open at the end of a window are not counted,
+    the same as a strategy's trade() at the end of the history.
+    - pairsTrader is not supported as its spread depends on the trades
+    made.
+    """
+
+    def __init__(self, df, asset_symbol, strategy, grid, train_size,
+                 test_size, step=None, anchored=False, workers=1):
+        if not isinstance(df, pd.DataFrame):
+            raise ValueError("df must be a pandas DataFrame")
+        if asset_symbol not in df.keys():
+            raise ValueError("asset symbol not in dataframe headers")
+        if strategy not in ('crossover', 'zscore'):
+            raise ValueError("Strategy must be 'crossover' or 'zscore'")
+        if len(grid) == 0:
+            raise ValueError("Parameter grid is empty")
+        if step is None:
+            step = test_size
+        for size in (train_size, test_size, step):
+            if not isinstance(size, int) or size < 1:
+                raise ValueError("Window sizes must be positive ints")
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive int")
+
+        self.df = df
+        self.sym = asset_symbol
+        self.strategy = strategy
+        self.grid = list(grid)
+        self.train_size = train_size
+        self.test_size = test_size
+        self.step = step
+        self.anchored = anchored
+        self.workers = workers
+        self.windows = self._buildWindows()
+        if len(self.windows) == 0:
+            raise ValueError("History too short for a single window")
+
+    def _buildWindows(self):
+        """
+        Builds the (train_start, train_end, test_start, test_end) bar
+        indices of every window.
+        """
+        windows = []
+        train_end = self.train_size
+        while train_end + self.test_size <= self.df.shape[0]:
+            train_start = 0 if self.anchored else train_end - self.train_size
+            windows.append((train_start, train_end,
+                            train_end, train_end + self.test_size))
+            train_end += self.step
+        return windows
+
+    def precomputeEvents(self):
+        """
+        Computes every indicator once over the full series and returns
+        the trading events of each parameter set in the grid.
+
+        Outputs:
+        - events:           (list, tuple) (index, side/codes, fee) of
+                            each parameter set
+        """
+        return kernels.grid_events(self.df[self.sym], self.strategy,
+                                   self.grid)
+
+    def run(self):
+        """
+        Runs the walk-forward optimisation.
+
+        Outputs:
+        - results:          (pandas DataFrame) one row per window with
+                            the window bounds, the index and params of
+                            the selected parameter set and its train
+                            and test cumulative returns
+        """
+        events = self.precomputeEvents()
+
+        with sharedPriceMatrix(self.df, symbols=[self.sym]) as prices:
+            initargs = (prices.spec, self.sym, self.strategy, events)
+            if self.workers == 1 or len(self.windows) == 1:
+                _init_worker(*initargs)
+                try:
+                    outputs = [_evaluate_window(w) for w in self.windows]
+                finally:
+                    _close_worker()
+            else:
+                ctx = mp.get_context()
+                with ctx.Pool(self.workers, initializer=_init_worker,
+                              initargs=initargs) as pool:
+                    outputs = pool.map(_evaluate_window, self.windows)
+
+        rows = []
+        for window, (best, train_returns, test_returns) in \
+                zip(self.windows, outputs):
+            row = dict(zip(('train_start', 'train_end',
+                            'test_start', 'test_end'), window))
+            row.update({'best': best, 'train_returns': train_returns,
+                        'test_returns': test_returns})
+            row.update(self.grid[best])
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def _init_worker(spec, symbol, strategy, events):
+    """
+    Attaches a worker to the published prices and stores the events
+    of the parameter grid.
+    """
+    global _worker_state
+    view = sharedPriceMatrix.attach(spec)
+    replay = kernels.replay_function(strategy)
+    _worker_state = (view, view.getSeries(symbol), replay, events)
+
+
+def _close_worker():
+    """
+    Detaches the calling process from the published prices.
+    """
+    global _worker_state
+    state, _worker_state = _worker_state, None
+    if state is not None:
+        view = state[0]
+        del state
+        view.close()
+
+
+def _evaluate_window(window):
+    """
+    Selects the best parameter set on a train window and evaluates it
+    on the test window.
+    """
+    _, prices, replay, events = _worker_state
+    train_start, train_end, test_start, test_end = window
+
+    train_returns = np.empty(len(events))
+    for k, (index, codes, fee) in enumerate(events):
+        _, _, returns = replay(prices, index, codes, train_start, train_end,
+                               fee)
+        train_returns[k] = returns.sum()
+
+    best = int(np.argmax(train_returns))
+    index, codes, fee = events[best]
+    _, _, returns = replay(prices, index, codes, test_start, test_end, fee)
+    return best, train_returns[best], returns.sum()
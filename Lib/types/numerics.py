@@ -0,0 +1,57 @@
+"""
+Numerical constants and steps shared by the batch, cached and streaming
+strategies. Each of pairsTrader, pairSpread, batch_kalman_filter and
+pairsStream reproduces the others' values to the last bit, so they all
+take their filter parameters and tolerances from here.
+
+Example usage:
+```
+mean, cov = kf_correct(KF_MEAN, KF_COV, x*KF_SCALE, y*KF_SCALE)
+mean, cov = kf_predict(mean, cov)
+```
+"""
+
+import sys
+
+import numpy as np
+
+# pandas treats a rolling variance update leaving 3 significant digits
+# as ill-conditioned and recomputes it
+INV_COND_TOL = sys.float_info.epsilon*1e3
+
+# Kalman filter regression y = beta*x + alpha of pairsTrader. Prices
+# are scaled to avoid underflow for small prices
+KF_SCALE = 10000000
+KF_DELTA = 1e-5
+# how much the random walk of (beta, alpha) moves
+KF_TRANS_COV = KF_DELTA / (1 - KF_DELTA) * np.eye(2)
+KF_OBS_COV = np.array([[2]])
+# prior (beta, alpha) = (0, 0) with a covariance of all ones
+KF_MEAN = np.zeros(2)
+KF_COV = np.ones((2, 2))
+
+
+def kf_predict(mean, cov):
+    """
+    Kalman filter prediction step with an identity transition.
+    """
+    transition = np.eye(2)
+    mean = np.dot(transition, mean) + np.zeros(2)
+    cov = (np.dot(transition, np.dot(cov, transition.T))
+           + KF_TRANS_COV)
+    return mean, cov
+
+
+def kf_correct(mean, cov, x, y):
+    """
+    Kalman filter correction step for observation y = (beta, alpha).(x, 1)
+    using the operations of pykalman's filter. The pseudo inverse of
+    the 1x1 predicted observation covariance is its reciprocal.
+    """
+    obs_mat = np.array([[x, 1.0]])
+    obs_mean = np.dot(obs_mat, mean) + np.zeros(1)
+    obs_cov = np.dot(obs_mat, np.dot(cov, obs_mat.T)) + KF_OBS_COV
+    gain = np.dot(cov, np.dot(obs_mat.T, 1.0/obs_cov))
+    mean = mean + np.dot(gain, np.array([y]) - obs_mean)
+    cov = cov - np.dot(gain, np.dot(obs_mat, cov))
+    return mean, cov
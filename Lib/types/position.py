@@ -79,6 +79,23 @@ class Position():
 
         self._exitprice = price
 
+    def getState(self):
+        """
+        Returns (position, entry price, exit price, trade return), e.g.
+        to save an open position.
+        """
+        return [self._pos, self._entryprice, self._exitprice,
+                self._tradereturn]
+
+    def setState(self, state):
+        """
+        Restores a state returned by getState.
+        """
+        if len(state) != 4:
+            raise ValueError("Position state must have 4 values")
+        (self._pos, self._entryprice, self._exitprice,
+         self._tradereturn) = state
+
     def calcTradeReturn(self):
         """
         Calculates the round trip trade return as a fraction.
@@ -1,8 +1,6 @@
 import numpy as np
 import pandas as pd
 import os.path
-from matplotlib import pyplot as plt
-from matplotlib.ticker import FuncFormatter
 from datetime import datetime
 
 from ..Lib.data_loading.data_loader import dataLoader
@@ -10,6 +8,7 @@ from ..Lib.data_loading.file_loading_strategies import fileLoadingDF
 from ..Lib.data_loading.file_loading_strategies import fileLoadingRaw
 from ..Lib.data_loading.web_loading_strategies import webLoading
 from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategies.grid_kernels import ma_matrix, crossover_grid_returns
 from ..Lib.strategy_backtester import backtest
 
 cpath = os.path.dirname(__file__) # current path
@@ -23,7 +22,7 @@ def main():
 
     # Load Dataframe
     #--------------------------------------------------------------------------
-    infile = cpath + "\\..\\Data\\mock_df.csv"    
+    infile = os.path.join(cpath, "..", "Data", "mock_df.csv")
     loading_strat = fileLoadingDF(infile)
     loader = dataLoader(loading_strat)
     df = loader.get_data()
@@ -41,22 +40,23 @@ def main():
     # Execute Trading
     #--------------------------------------------------------------------------
     for symbol in symbols:
-        for i in range(len(MA_list)):
-            for j in range(i+1, len(MA_list)):
-                fast_MA = MA_list[i]                
-                slow_MA = MA_list[j]
-                print("Trading {} for MA periods {}v{}"
-                      .format(symbol, fast_MA, slow_MA))
-                asset_df = df[['date', symbol]].reset_index()
-                strategy = crossoverTrader(asset_df, symbol, MA_type, slow_MA, 
-                                           fast_MA=fast_MA, trading_fee=0.0)
-                trader = backtest(strategy)
-                cum_returns = trader.trade()
-                
-                returns[j, i] += cum_returns
-                print("Cumulative Returns: {0:.2}%\n".format(cum_returns*100))
-                
-                if save_results:
+        # whole (fast, slow) grid evaluated at once from an MA matrix
+        print("Trading {} for MA periods {}".format(symbol, MA_list))
+        ma = ma_matrix(df[symbol], MA_list, MA_type)
+        returns += crossover_grid_returns(df[symbol].to_numpy(), ma, MA_list,
+                                          fee=0.0)
+
+        if save_results:
+            for i in range(len(MA_list)):
+                for j in range(i+1, len(MA_list)):
+                    fast_MA = MA_list[i]
+                    slow_MA = MA_list[j]
+                    asset_df = df[['date', symbol]].reset_index()
+                    strategy = crossoverTrader(asset_df, symbol, MA_type,
+                                               slow_MA, fast_MA=fast_MA,
+                                               trading_fee=0.0)
+                    trader = backtest(strategy)
+                    trader.trade()
                     header = '{}_{}_{}'.format(symbol, slow_MA, fast_MA)
                     df_csv[header] = asset_df['returns']
         
@@ -68,6 +68,9 @@ def main():
     returns = returns*100/num_symbols # average returns as a percentage
 
     if plot_results:
+        from matplotlib import pyplot as plt
+        from matplotlib.ticker import FuncFormatter
+
         plt.imshow(returns, cmap='RdBu')
         plt.colorbar(format=FuncFormatter(fmt))        
         max_ret = np.nanmax(abs(returns))
@@ -1,13 +1,11 @@
 import os.path
 import numpy as np
-from statsmodels.tsa.stattools import coint
-from matplotlib import pyplot as plt
-from matplotlib.ticker import FuncFormatter
 
 from ..Lib.data_loading.file_loading_strategies import fileLoadingDF
 from ..Lib.data_loading.data_loader import dataLoader
-from ..Lib.strategies.pairs import pairsTrader
-from ..Lib.strategy_backtester import backtest
+from ..Lib.pair_selection.cointegration import get_coint_pairs
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+from ..Lib.sweeps.results_store import resultsStore
 
 cpath = os.path.dirname(__file__)  # current path
 
@@ -15,8 +13,11 @@ def main():
 
     # Load data
     # -------------------------------------------------------------------------
-    infile = cpath + "\\..\\Data\\mock_df.csv" 
-    save_results = False   
+    infile = os.path.join(cpath, "..", "Data", "mock_df.csv")
+    results_db = os.path.join(cpath, "pairs_results.db")
+    coint_cache = os.path.join(cpath, "coint_cache")
+    save_results = False
+    workers = 1
     loading_strat = fileLoadingDF(infile)
     loader = dataLoader(loading_strat)
     df = loader.get_data()
@@ -27,7 +28,7 @@ def main():
 
     # Get Cointegrated Pairs
     # -------------------------------------------------------------------------
-    _, pairs = get_coint_pairs(df)    
+    _, pairs = get_coint_pairs(df, workers=workers, cache_dir=coint_cache)
     # -------------------------------------------------------------------------
 
     # Define trading params
@@ -39,28 +40,36 @@ def main():
 
     # Execute trading
     # -------------------------------------------------------------------------
+    jobs, locs = [], []
     for i in range(len(bandwidths)):
-        bandwidth = bandwidths[i]        
+        bandwidth = bandwidths[i]
         for j in range(len(zperiods)):
             period = zperiods[j]
             for pair in pairs:
-                asset1, asset2 = pair[0], pair[1]                
-                print("Trading {} against {} for BW: {}, Z period: {}"
-                      .format(asset1, asset2, bandwidth, period))
-
-                x = df.loc[:, asset1]
-                y = df.loc[:, asset2]
-                strategy = pairsTrader(x, y, asset1, asset2, 
-                                       period, bandwidth=bandwidth)
-                trader = backtest(strategy)
-                cum_returns = trader.trade()
-                returns[i, j] += cum_returns
-                print("Cumulative Returns: {0:.2f}%\n"
-                      .format(cum_returns*100))
-
-                if save_results:
-                    header = asset1+"_"+asset2+"_"+str(bandwidth)+"_"+ str(period)
-                    df_csv[header] = strategy.df['returns']
+                asset1, asset2 = pair[0], pair[1]
+                params = {'zperiod': period, 'bandwidth': bandwidth}
+                jobs.append(('pairs', (asset1, asset2), params))
+                locs.append((i, j))
+
+    # completed runs in results_db are skipped when a sweep is restarted
+    with resultsStore(results_db) as store:
+        sweep = parameterSweep(df, workers=workers)
+        results = sweep.run(jobs, keep_returns=save_results, store=store)
+
+    for (_, (asset1, asset2), params), loc, result in zip(jobs, locs, results):
+        if save_results:
+            cum_returns, trade_returns = result
+        else:
+            cum_returns = result
+        print("Traded {} against {} for BW: {}, Z period: {}"
+              .format(asset1, asset2, params['bandwidth'], params['zperiod']))
+        returns[loc] += cum_returns
+        print("Cumulative Returns: {0:.2f}%\n".format(cum_returns*100))
+
+        if save_results:
+            header = (asset1 + "_" + asset2 + "_" + str(params['bandwidth'])
+                      + "_" + str(params['zperiod']))
+            df_csv[header] = trade_returns
 
     if save_results:
         df_csv.to_csv("results.csv")
@@ -68,6 +77,9 @@ def main():
     
     # Plot
     # -------------------------------------------------------------------------
+    from matplotlib import pyplot as plt
+    from matplotlib.ticker import FuncFormatter
+
     returns = returns*100/len(pairs)
     plt.imshow(returns, cmap='RdBu')
     plt.colorbar(format=FuncFormatter(fmt))
@@ -81,51 +93,6 @@ def main():
     plt.show()
     # -------------------------------------------------------------------------
 
-def get_coint_pairs(df, threshold=0.05, plot=False):
-
-    """
-    Determines cointegrated pairs of 2 or more assets for a given 
-    theshold. 
-
-    Inputs:
-    - df:           (pandas Dataframe) dataframe storing asset price history
-    - threshold:    (float) cointegration threshold
-
-    Outputs:
-    - p_values:     (2D array, floats) storing pvalues between pairs 
-    - pairs:        (list) of cointegrated pairs w/ their coint factor. 
-    """
-
-    symbols = [symbol for symbol in df.keys()]
-    num_assets = len(symbols)
-    p_values = np.ones((num_assets, num_assets))
-    pairs = []
-
-    for j in range(num_assets):
-        for i in range(j+1, num_assets):
-            asset1 = symbols[i]
-            asset2 = symbols[j]            
-            _, pval, _ = coint(df[asset1], df[asset2])
-
-            if pval < threshold:
-                pairs.append([asset1, asset2, pval])
-                print("{} and {} are cointegrated with p value: {}\n"
-                      .format(asset1, asset2, pval))
-            
-            p_values[i, j] = pval
-    
-    if(plot):
-        mask = np.triu(p_values)
-        p_values = np.ma.array(p_values, mask=mask) 
-        plt.imshow(p_values, cmap = 'Spectral')
-        plt.colorbar()
-        plt.xticks(np.arange(num_assets), symbols, rotation=90)
-        plt.yticks(np.arange(num_assets), symbols)
-        plt.title("co-integration factor between top {} assets".format(num_assets))
-        plt.show()
-
-    return p_values, pairs
-
 def fmt(x, pos):
     """
     Formats colourbar to display as a percentage
@@ -0,0 +1,306 @@
+"""
+Runs a crossover, zscore or pairs parameter study from a JSON config,
+without a display, through parameterSweep.
+
+    python -m package.Main.run_study config.json --workers 8
+
+Config keys (relative paths are relative to the config file):
+- study:            'crossover', 'zscore' or 'pairs'
+- data:             {'source': 'csv', 'infile': ...},
+                    {'source': 'raw', 'infile', 'symbols', 'ticksize'} or
+                    {'source': 'web', 'api_key', 'symbols', 'ticksize',
+                    'end_date' (ISO format), 'lookback', 'outfile_raw',
+                    'outfile_df'}
+- symbols:          optional list of symbols, defaults to every price
+                    column
+- grid:             strategy keyword arguments, each a value or a list
+                    of values. A list of dicts gives parameters that
+                    vary together, e.g. "MAs": [{"slow_MA": 80,
+                    "fast_MA": 27}, ...]. Every combination is run,
+                    skipping those with fast_MA >= slow_MA.
+- pairs:            'auto' to trade the cointegrated pairs of symbols,
+                    a dict of get_coint_pairs keyword arguments, or a
+                    list of [asset1, asset2] pairs
+- workers:          worker processes of the sweep and cointegration
+- memory_budget:    optional sweep memory budget in MB
+- store:            optional resultsStore database, finished runs are
+                    skipped when a study is restarted
+- cache_dir:        optional cointegration p value cache directory
+- output:           optional csv of every run's parameters and returns
+- plot:             render a batchReport of the runs
+- report_dir:       directory of the report
+- heatmap:          [x, y] parameters of the report's heatmap
+
+Command line flags override the config. --dry-run prints the number
+of jobs without running them. For a pairs study screening for its pairs
+the cointegration screen is not run either, and every candidate pair of
+the screen is counted, so the number is an upper bound.
+"""
+
+import argparse
+import itertools
+import json
+import os.path
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from ..Lib.data_loading.data_loader import dataLoader
+from ..Lib.data_loading.file_loading_strategies import fileLoadingDF
+from ..Lib.data_loading.file_loading_strategies import fileLoadingRaw
+from ..Lib.data_loading.web_loading_strategies import webLoading
+from ..Lib.pair_selection.cointegration import (get_coint_pairs,
+                                                coint_candidates)
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+from ..Lib.sweeps.results_store import resultsStore
+
+DEFAULTS = {'study': None, 'data': None, 'symbols': None, 'grid': None,
+            'pairs': 'auto', 'workers': 1, 'start_method': None,
+            'memory_budget': None, 'store': None, 'cache_dir': None,
+            'output': None, 'plot': False, 'report_dir': 'report',
+            'heatmap': None}
+
+# config keys holding paths, resolved relative to the config file
+_PATHS = ('store', 'cache_dir', 'output', 'report_dir')
+_DATA_PATHS = ('infile', 'outfile', 'outfile_raw', 'outfile_df')
+
+
+def load_config(path, overrides=None):
+    """
+    Reads a study config and applies the defaults and overrides.
+
+    Inputs:
+    - path:             (str) JSON config file
+    - overrides:        (dict) optional values replacing the config's,
+                        None values are ignored
+
+    Outputs:
+    - config:           (dict) with every key of DEFAULTS, paths made
+                        relative to the current directory
+    """
+    with open(path) as infile:
+        config = json.load(infile)
+    unknown = set(config) - set(DEFAULTS)
+    if unknown:
+        raise ValueError("Unknown config keys: {}".format(sorted(unknown)))
+
+    config = dict(DEFAULTS, **config)
+    base = os.path.dirname(os.path.abspath(path))
+    for key in _PATHS:
+        if config[key] is not None:
+            config[key] = os.path.join(base, config[key])
+    if isinstance(config['data'], dict):
+        config['data'] = dict(config['data'])
+        for key in _DATA_PATHS:
+            if isinstance(config['data'].get(key), str):
+                config['data'][key] = os.path.join(base,
+                                                   config['data'][key])
+
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            config[key] = value
+
+    if config['study'] not in ('crossover', 'zscore', 'pairs'):
+        raise ValueError("study must be 'crossover', 'zscore' or 'pairs'")
+    if not isinstance(config['data'], dict):
+        raise ValueError("data must be a dict with a source")
+    if not isinstance(config['grid'], dict) or len(config['grid']) == 0:
+        raise ValueError("grid must be a dict of strategy parameters")
+    return config
+
+
+def load_prices(data):
+    """
+    Loads the price DataFrame described by a config's data entry.
+    """
+    data = dict(data)
+    source = data.pop('source', 'csv')
+    if source == 'csv':
+        strategy = fileLoadingDF(**data)
+    elif source == 'raw':
+        strategy = fileLoadingRaw(**data)
+    elif source == 'web':
+        if isinstance(data.get('end_date'), str):
+            data['end_date'] = datetime.fromisoformat(data['end_date'])
+        strategy = webLoading(**data)
+    else:
+        raise ValueError("data source must be 'csv', 'raw' or 'web'")
+    return dataLoader(strategy).get_data()
+
+
+def expand_grid(grid):
+    """
+    Returns every combination of a parameter grid as a list of dicts.
+    Values that are not lists are held fixed. A list of dicts gives
+    parameters that vary together, its key is only a label. Combinations
+    with fast_MA not below slow_MA are skipped.
+    """
+    values = []
+    for name, value in grid.items():
+        if not isinstance(value, list):
+            value = [value]
+        linked = [isinstance(v, dict) for v in value]
+        if any(linked) and not all(linked):
+            raise ValueError("grid entry {} mixes dicts and values"
+                             .format(name))
+        values.append(value if all(linked) and value
+                      else [{name: v} for v in value])
+    combos = []
+    for combo in itertools.product(*values):
+        params = {}
+        for linked in combo:
+            params.update(linked)
+        if ('fast_MA' in params and 'slow_MA' in params
+                and params['fast_MA'] >= params['slow_MA']):
+            continue
+        combos.append(params)
+    return combos
+
+
+def build_jobs(config, df, screen=True):
+    """
+    Builds the (strategy, symbols, params) jobs of a study.
+
+    Inputs:
+    - config:           (dict) see load_config
+    - df:               (pandas DataFrame) prices of the study
+    - screen:           (bool) run the cointegration screen of a pairs
+                        study with 'auto' or dict pairs. If False every
+                        candidate pair of the screen is traded instead
+    """
+    symbols = config['symbols']
+    if symbols is None:
+        symbols = list(df.select_dtypes('number').columns)
+    missing = [s for s in symbols if s not in df]
+    if missing:
+        raise ValueError("Symbols not in data: {}".format(missing))
+
+    study = config['study']
+    grid = expand_grid(config['grid'])
+    if study != 'pairs':
+        return [(study, (symbol,), params)
+                for params in grid for symbol in symbols]
+
+    pairs = config['pairs']
+    if pairs == 'auto' or isinstance(pairs, dict):
+        kwargs = {} if pairs == 'auto' else pairs
+        if not screen:
+            prefilter = {key: kwargs[key] for key in
+                         ('window', 'prefilter', 'prefilter_threshold')
+                         if key in kwargs}
+            return [('pairs', tuple(pair), params) for params in grid
+                    for pair in coint_candidates(df[symbols], **prefilter)]
+        _, found = get_coint_pairs(df[symbols], workers=config['workers'],
+                                   cache_dir=config['cache_dir'], **kwargs)
+        pairs = [(asset1, asset2) for asset1, asset2, _ in found]
+    return [('pairs', (pair[0], pair[1]), params)
+            for params in grid for pair in pairs]
+
+
+def run_study(config):
+    """
+    Runs a study and returns a table of its runs.
+
+    Inputs:
+    - config:           (dict) see load_config
+
+    Outputs:
+    - runs:             (pandas DataFrame) columns strategy, symbols,
+                        cum_returns and one per parameter
+    """
+    df = load_prices(config['data'])
+    jobs = build_jobs(config, df)
+    if len(jobs) == 0:
+        print("No jobs to run")
+        return pd.DataFrame(columns=['strategy', 'symbols', 'cum_returns'])
+
+    memory_budget = config['memory_budget']
+    if memory_budget is not None:
+        memory_budget = int(memory_budget*2**20)
+    sweep = parameterSweep(df, workers=config['workers'],
+                           start_method=config['start_method'],
+                           memory_budget=memory_budget)
+    print("Running {} {} jobs on {} workers"
+          .format(len(jobs), config['study'], config['workers']))
+    if config['store'] is not None:
+        with resultsStore(config['store']) as store:
+            results = sweep.run(jobs, store=store)
+    else:
+        results = sweep.run(jobs)
+
+    rows = []
+    for (strategy, symbols, params), cum_returns in zip(jobs, results):
+        row = {'strategy': strategy, 'symbols': "/".join(symbols),
+               'cum_returns': cum_returns}
+        row.update(params)
+        rows.append(row)
+    runs = pd.DataFrame(rows)
+    if config['output'] is not None:
+        runs.to_csv(config['output'], index=False)
+
+    if config['plot']:
+        from ..Lib.reporting.batch_report import batchReport
+
+        report = batchReport(df, config['report_dir'],
+                             workers=config['workers'],
+                             start_method=config['start_method'])
+        heatmaps = None if config['heatmap'] is None else [config['heatmap']]
+        index = report.run(jobs, heatmaps=heatmaps,
+                           title="{} study".format(config['study']))
+        print("Report written to {}".format(index))
+    return runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('config', help="JSON study config")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--start-method', dest='start_method',
+                        choices=['fork', 'spawn', 'forkserver'])
+    parser.add_argument('--memory-budget', dest='memory_budget', type=float,
+                        help="sweep memory budget in MB")
+    parser.add_argument('--store', help="resumable results database")
+    parser.add_argument('--no-store', action='store_true',
+                        help="do not read or write a results store")
+    parser.add_argument('--cache-dir', dest='cache_dir',
+                        help="cointegration p value cache directory")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="do not use the cointegration cache")
+    parser.add_argument('--output', help="csv of the runs")
+    parser.add_argument('--plot', action=argparse.BooleanOptionalAction,
+                        help="render a report of the runs")
+    parser.add_argument('--report-dir', dest='report_dir')
+    parser.add_argument('--dry-run', action='store_true',
+                        help=("print the number of jobs and exit, without "
+                              "running the cointegration screen"))
+    args = parser.parse_args(argv)
+
+    overrides = {key: getattr(args, key)
+                 for key in ('workers', 'start_method', 'memory_budget',
+                             'store', 'cache_dir', 'output', 'plot',
+                             'report_dir')}
+    config = load_config(args.config, overrides)
+    if args.no_store:
+        config['store'] = None
+    if args.no_cache:
+        config['cache_dir'] = None
+
+    if args.dry_run:
+        jobs = build_jobs(config, load_prices(config['data']), screen=False)
+        screened = (config['study'] == 'pairs'
+                    and (config['pairs'] == 'auto'
+                         or isinstance(config['pairs'], dict)))
+        print("{}{} {} jobs".format("at most " if screened else "",
+                                    len(jobs), config['study']))
+        return 0
+
+    runs = run_study(config)
+    if len(runs) > 0:
+        print(runs.sort_values('cum_returns', ascending=False)
+              .head(10).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
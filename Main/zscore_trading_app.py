@@ -1,12 +1,10 @@
 import pandas as pd
 import numpy as np
 import os.path
-from matplotlib import pyplot as plt
-from matplotlib.ticker import FuncFormatter
 
 from ..Lib.data_loading.file_loading_strategies import fileLoadingDF
-from ..Lib.strategies.zscore_trend import zScoreTrader
-from ..Lib.strategy_backtester import backtest
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+from ..Lib.sweeps.results_store import resultsStore
 
 cpath = os.path.dirname(__file__) # current path
 
@@ -15,7 +13,7 @@ def main():
 
     # Load Dataframe
     #--------------------------------------------------------------------------
-    infile = cpath+"\\..\\Data\\mock_df.csv"
+    infile = os.path.join(cpath, "..", "Data", "mock_df.csv")
     loader = fileLoadingDF(infile)
     df = loader.get_data()
     df_csv = df[['date']]
@@ -26,6 +24,8 @@ def main():
     save_results = False
     plot_results = True
     results_outfile = "dualSMAZscores"
+    results_db = os.path.join(cpath, "zscore_results.db")
+    workers = 1
 
     symbols = [key for key in df.keys() if key not in ['date']]
     bandwidths = [1.0, 1.5, 2.0]
@@ -36,59 +36,82 @@ def main():
     
     # Execute trading
     #--------------------------------------------------------------------------
+    # jobs of every bandwidth go in one sweep, which runs the bandwidths
+    # of each symbol and set of MAs together over shared indicators
+    returns = {bandwidth: np.zeros((len(MAs)*num_faster_MAs,
+                                    len(ZScore_MAs)))
+               for bandwidth in bandwidths}
+    ylabels = [] # plot labels
+    jobs, locs = [], []
+
+    for iter_cnt, symbol in enumerate(symbols):
+        for i in range(len(MAs)): 
+            MAslow = MAs[i]
+            faster_MAs = np.linspace(1, MAslow, num=num_faster_MAs, 
+                                     endpoint=False)
+            faster_MAs = [int(item) for item in faster_MAs]
+            for k in range(num_faster_MAs):    
+                MAfast = faster_MAs[k]
+                if iter_cnt == 0:     
+                    # only append for first symbol so no repetitions 
+                    if num_faster_MAs == 1:
+                        ylabels.append(MAslow)
+                    else:
+                        ylabels.append('{}v{}'.format(MAslow, MAfast))                        
+
+                for j in range(len(ZScore_MAs)):
+                    Z_MA = ZScore_MAs[j]
+                    for bandwidth in bandwidths:
+                        params = {'MA_type': "SMA", 'slow_MA': MAslow,
+                                  'zscore_period': Z_MA,
+                                  'bandwidth': bandwidth, 'fast_MA': MAfast}
+                        jobs.append(('zscore', (symbol,), params))
+                        locs.append((num_faster_MAs*i + k, j))
+
+    # completed runs in results_db are skipped on a restart
+    with resultsStore(results_db) as store:
+        sweep = parameterSweep(df, workers=workers)
+        results = sweep.run(jobs, keep_returns=save_results, store=store)
+
     for bandwidth in bandwidths:
         if save_results:
             df_csv = df[['date']]
-        returns = np.zeros((len(MAs)*num_faster_MAs, len(ZScore_MAs))) 
-        ylabels = [] # plot labels
-
-        for iter_cnt, symbol in enumerate(symbols):
-            for i in range(len(MAs)): 
-                MAslow = MAs[i]
-                faster_MAs = np.linspace(1, MAslow, num=num_faster_MAs, 
-                                         endpoint=False)
-                faster_MAs = [int(item) for item in faster_MAs]
-                for k in range(num_faster_MAs):    
-                    MAfast = faster_MAs[k]
-                    if iter_cnt == 0:     
-                        # only append for first symbol so no repetitions 
-                        if num_faster_MAs == 1:
-                            ylabels.append(MAslow)
-                        else:
-                            ylabels.append('{}v{}'.format(MAslow, MAfast))                        
-
-                    for j in range(len(ZScore_MAs)):
-                        Z_MA = ZScore_MAs[j]                        
-                        print("Trading {} for Z score: {}, SMAs: {}v{}"
-                              .format(symbol, Z_MA, MAfast, MAslow))
-
-                        asset_df = df.loc[:, ['date', symbol]].reset_index()
-                        strategy = zScoreTrader(asset_df, symbol, "SMA", 
-                                                MAslow, Z_MA, bandwidth, 
-                                                fast_MA=MAfast)
-                        trader = backtest(strategy)
-                        cum_returns = trader.trade()
-                        loc = num_faster_MAs*i + k, j 
-                        returns[loc] += cum_returns
-
-                        print("Cumulative returns: {0:.2}%\n"
-                              .format(cum_returns*100))
-
-                        if save_results:
-                            key = '{}_{}v{}_{}_{}'.format(symbol, MAslow, 
-                                                         MAfast, Z_MA, 
-                                                         bandwidth)
-                            df_csv[key] = asset_df['returns']
+
+        for (_, (symbol,), params), loc, result in zip(jobs, locs, results):
+            if params['bandwidth'] != bandwidth:
+                continue
+            if save_results:
+                cum_returns, trade_returns = result
+            else:
+                cum_returns = result
+            print("Traded {} for Z score: {}, SMAs: {}v{}, bandwidth: {}"
+                  .format(symbol, params['zscore_period'], params['fast_MA'],
+                          params['slow_MA'], bandwidth))
+            returns[bandwidth][loc] += cum_returns
+
+            print("Cumulative returns: {0:.2}%\n"
+                  .format(cum_returns*100))
+
+            if save_results:
+                key = '{}_{}v{}_{}_{}'.format(symbol, params['slow_MA'],
+                                             params['fast_MA'],
+                                             params['zscore_period'],
+                                             bandwidth)
+                df_csv[key] = trade_returns
         # ---------------------------------------------------------------------
 
         # Plot Results
         # ---------------------------------------------------------------------
         if plot_results:            
+            from matplotlib import pyplot as plt
+            from matplotlib.ticker import FuncFormatter
+
             num_symbols = len(symbols)
-            returns = returns*100/num_symbols # average percentage rets
-            plt.imshow(returns, cmap='RdBu')
+            # average percentage rets
+            bw_returns = returns[bandwidth]*100/num_symbols
+            plt.imshow(bw_returns, cmap='RdBu')
             plt.colorbar(format=FuncFormatter(fmt))
-            max_ret = max(returns.min(), returns.max(), key=abs)
+            max_ret = max(bw_returns.min(), bw_returns.max(), key=abs)
             plt.clim(vmin=-max_ret, vmax=max_ret)
             plt.yticks(np.arange(len(ylabels)), ylabels)
             plt.xticks(np.arange(len(ZScore_MAs)), ZScore_MAs)
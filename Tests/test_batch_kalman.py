@@ -0,0 +1,42 @@
+from pytest import raises
+import numpy as np
+
+from ..Lib.strategies.batch_kalman import batch_kalman_filter
+from ..Lib.strategies.pairs import pairsTrader
+from ..Lib.types.exponential_moving_average import expMovingAverage
+from ..Benchmarks.synthetic_data import cointegrated_pairs
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of mismatched price arrays
+    """
+
+    with raises(ValueError):
+        batch_kalman_filter(np.ones((2, 10)), np.ones((2, 9)))
+    with raises(ValueError):
+        batch_kalman_filter(np.ones((2, 2, 10)), np.ones((2, 2, 10)))
+
+
+def test_matches_pairs_filter():
+    """
+    Tests every pair of the batch is filtered as pairsTrader filters it
+    """
+
+    df, _ = cointegrated_pairs(300, 6, seed=2)
+    xMA = [expMovingAverage(df['X{:03d}'.format(p)], 10).values
+           for p in range(6)]
+    yMA = [expMovingAverage(df['Y{:03d}'.format(p)], 10).values
+           for p in range(6)]
+    strategy = pairsTrader(df['X000'].copy(), df['Y000'].copy(), 'X000',
+                           'Y000', 10)
+
+    hedge_ratios = batch_kalman_filter(np.array(xMA), np.array(yMA))
+    assert(hedge_ratios.shape == (6, 300))
+    for p in range(6):
+        expected = strategy._kf_linear_regression(xMA[p].copy(),
+                                                  yMA[p].copy())
+        assert(np.array_equal(hedge_ratios[p], expected))
+
+    single = batch_kalman_filter(xMA[3], yMA[3])
+    assert(np.array_equal(single, hedge_ratios[3]))
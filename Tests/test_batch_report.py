@@ -0,0 +1,85 @@
+from pytest import raises
+import os.path
+import pandas as pd
+
+from ..Lib.reporting import plotting
+from ..Lib.reporting.batch_report import batchReport
+from ..Lib.strategies.crossover import crossoverTrader
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+plotting.use_headless_backend()
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect inputs
+    """
+
+    df = pd.read_csv(mock_df)
+    with raises(ValueError):
+        batchReport(df, "report", workers=0)
+
+
+def test_trade_markers():
+    """
+    Tests trade markers are drawn as a single collection
+    """
+    from matplotlib import pyplot as plt
+
+    plt.figure()
+    assert(plotting.trade_markers([], 'g') is None)
+    lines = plotting.trade_markers([1, 5, 9], 'g')
+    assert(len(lines.get_segments()) == 3)
+    assert(len(plt.gca().collections) == 1)
+    plt.close('all')
+
+
+def test_saving_to(tmp_path):
+    """
+    Tests a strategy's plot is saved instead of shown
+    """
+
+    df = pd.read_csv(mock_df)
+    strategy = crossoverTrader(df, 'ETH', 'SMA', 40, fast_MA=10)
+    outfile = os.path.join(str(tmp_path), "ETH.png")
+    with plotting.saving_to(outfile):
+        strategy.trade(plot=True)
+    assert(os.path.getsize(outfile) > 0)
+    assert(plotting._output is None)
+
+
+def test_run(tmp_path):
+    """
+    Tests charts, heatmaps and the index are written serially and in
+    parallel with the same results
+    """
+
+    df = pd.read_csv(mock_df)
+    jobs = [('crossover', ('ETH',), {'MA_type': 'SMA', 'slow_MA': s,
+                                      'fast_MA': f})
+            for f in (5, 10) for s in (30, 40)]
+    jobs.append(('zscore', ('NEO',), {'MA_type': 'SMA', 'slow_MA': 20,
+                                      'zscore_period': 20, 'bandwidth': 1.5}))
+
+    runs = []
+    for workers in (1, 2):
+        out_dir = os.path.join(str(tmp_path), str(workers))
+        report = batchReport(df, out_dir, workers=workers)
+        index = report.run(jobs, heatmaps=[('fast_MA', 'slow_MA')])
+        assert(os.path.exists(index))
+        table = pd.read_csv(os.path.join(out_dir, "runs.csv"))
+        assert(len(table) == len(jobs))
+        for chart in table['chart']:
+            assert(os.path.getsize(os.path.join(out_dir, chart)) > 0)
+            assert(chart in open(index).read())
+        heatmap = "heatmap_crossover_slow_MA_fast_MA.png"
+        assert(os.path.exists(os.path.join(out_dir, heatmap)))
+        assert(not os.path.exists(os.path.join(
+            out_dir, "heatmap_zscore_slow_MA_fast_MA.png")))
+        runs.append(table)
+
+    expected = crossoverTrader(df, 'ETH', 'SMA', 30, fast_MA=5).trade()
+    assert(runs[0]['cum_returns'][0] == expected)
+    assert(runs[0]['cum_returns'].equals(runs[1]['cum_returns']))
@@ -0,0 +1,72 @@
+from pytest import raises, approx
+import numpy as np
+
+from ..Benchmarks import synthetic_data as synth
+from ..Benchmarks.run_benchmarks import run_benchmarks, compare_results
+
+
+def test_synthetic_data():
+    """
+    Tests synthetic data is deterministic and has the expected shape
+    """
+
+    df = synth.gbm_prices(500, 3, seed=1)
+    assert(list(df.keys()) == ['date', 'S000', 'S001', 'S002'])
+    assert(df.shape == (500, 4))
+    assert(df.equals(synth.gbm_prices(500, 3, seed=1)))
+    assert(not df.equals(synth.gbm_prices(500, 3, seed=2)))
+    assert((df['S000'] > 0).all() and df['S000'][0] == 1.0)
+    with raises(ValueError):
+        synth.gbm_prices(0, 3)
+
+
+def test_cointegrated_pairs():
+    """
+    Tests the known hedge ratios are recovered by a regression
+    """
+
+    df, hedge_ratios = synth.cointegrated_pairs(5000, 2, noise=0.001)
+    for (xsym, ysym), ratio in hedge_ratios.items():
+        slope = np.polyfit(df[xsym], df[ysym], 1)[0]
+        assert(slope == approx(ratio, rel=0.01))
+
+
+def test_raw_json():
+    """
+    Tests raw data has the CryptoCompare shape with gaps
+    """
+
+    raw = synth.raw_json(1000, 2, gap_fraction=0.1)
+    assert(list(raw.keys()) == ['S000', 'S001'])
+    bars = raw['S000']
+    assert(set(bars[0].keys()) == {'time', 'close', 'high', 'low', 'open',
+                                   'volumefrom', 'volumeto'})
+    assert(800 < len(bars) < 1000)
+    assert(bars[0]['time'] == synth.START_TIMESTAMP)
+    assert(bars[-1]['time'] == synth.START_TIMESTAMP + 999*synth.BAR_SECONDS)
+    assert(all(bar['low'] <= bar['close'] <= bar['high'] for bar in bars))
+
+
+def test_run_and_compare():
+    """
+    Tests a small benchmark run and its comparison against a baseline
+    """
+
+    results = run_benchmarks(names=['indicators', 'crossover', 'pairs'],
+                             repeats=1, cases=[(300, 2), (300, 10)])
+    timed = [(r['benchmark'], r['symbols']) for r in results['results']]
+    assert(timed == [('indicators', 2), ('crossover', 2), ('pairs', 2)])
+    assert(all(r['error'] is None and r['best'] > 0
+               for r in results['results']))
+
+    baseline = {'results': [dict(r) for r in results['results']]}
+    baseline['results'][0]['median'] = results['results'][0]['median']/2
+    baseline['results'][1]['median'] = results['results'][1]['median']*2
+    comparison = compare_results(results, baseline, tolerance=0.25)
+    assert(list(comparison['regression']) == [True, False, False])
+    assert(comparison['ratio'][0] == approx(2.0))
+
+    with raises(ValueError):
+        run_benchmarks(names=['unknown'])
+    with raises(ValueError):
+        run_benchmarks(suite='huge')
@@ -0,0 +1,73 @@
+from pytest import raises
+import numpy as np
+
+from ..Lib.pair_selection.candidates import (candidate_pairs, embed_prices,
+                                             cluster_pairs)
+from ..Benchmarks.synthetic_data import cointegrated_pairs
+
+
+def pair_indices(num_pairs, seed=0):
+    """
+    Prices of cointegrated pairs with the (row, col) index of each.
+    """
+    df, hedge_ratios = cointegrated_pairs(1000, num_pairs, seed=seed)
+    symbols = list(df.keys()[1:])
+    known = {(symbols.index(y), symbols.index(x)) for x, y in hedge_ratios}
+    return df[symbols].to_numpy(), known
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect methods and sizes
+    """
+
+    prices, _ = pair_indices(3)
+    with raises(ValueError):
+        candidate_pairs(prices, 'kmeans', 3)
+    with raises(ValueError):
+        candidate_pairs(prices, 'neighbours', 0)
+    with raises(ValueError):
+        embed_prices(prices[:1])
+    with raises(ValueError):
+        embed_prices(prices, dims=0)
+
+
+def test_embedding():
+    """
+    Tests embedded distances approximate price correlations
+    """
+
+    prices, _ = pair_indices(10)
+    embedding = embed_prices(prices, dims=20)
+    assert(embedding.shape == (20, 20))
+    corr = np.corrcoef(prices, rowvar=False)
+    sq_dist = ((embedding[:, None] - embedding[None])**2).sum(axis=2)
+    assert(np.allclose(sq_dist, 2*(1 - corr), atol=1e-8))
+
+
+def test_candidates():
+    """
+    Tests candidates grow linearly and include the cointegrated pairs
+    """
+
+    counts = {}
+    for num_pairs in [50, 200]:
+        prices, known = pair_indices(num_pairs, seed=1)
+        num_assets = 2*num_pairs
+        for method, size in [('neighbours', 3), ('clusters', 10)]:
+            rows, cols = candidate_pairs(prices, method, size)
+            assert((rows > cols).all())
+            assert(len(set(zip(rows, cols))) == len(rows))
+            assert(len(rows) <= num_assets*size)
+            counts[method, num_pairs] = len(rows)
+            found = known & set(zip(rows.tolist(), cols.tolist()))
+            if method == 'neighbours':
+                assert(found == known)
+            else:
+                assert(len(found) > 0.8*len(known))
+
+    for method in ['neighbours', 'clusters']:
+        assert(counts[method, 200] < 5*counts[method, 50])
+
+    rows, cols = cluster_pairs(np.zeros((7, 2)), 2)
+    assert(len(rows) <= 4)
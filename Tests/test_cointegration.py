@@ -0,0 +1,143 @@
+from pytest import raises, approx
+import os
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import coint
+
+from ..Lib.pair_selection.cointegration import (get_coint_pairs,
+                                                coint_candidates,
+                                                prefilter_misses)
+from ..Benchmarks.synthetic_data import cointegrated_pairs
+
+
+def synthetic_prices(num_bars=500, seed=0):
+    """
+    Builds prices of two random walks and two assets cointegrated with
+    the first one.
+    """
+    rng = np.random.default_rng(seed)
+    walk1 = 10 + np.cumsum(rng.normal(0, 0.1, num_bars))
+    walk2 = 10 + np.cumsum(rng.normal(0, 0.1, num_bars))
+    coint1 = 2*walk1 + rng.normal(0, 0.1, num_bars)
+    coint2 = 0.5*walk1 + rng.normal(0, 0.05, num_bars)
+    dates = np.arange(num_bars).astype(str)
+    return pd.DataFrame({'date': dates, 'A': walk1, 'B': walk2,
+                         'C': coint1, 'D': coint2})
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect inputs
+    """
+
+    df = synthetic_prices()
+    with raises(ValueError):
+        get_coint_pairs(df[['date', 'A']])
+    with raises(ValueError):
+        get_coint_pairs(df, workers=0)
+    with raises(ValueError):
+        get_coint_pairs(df, prefilter='cluster')
+
+
+def test_p_values():
+    """
+    Tests p values match statsmodels and are the same in parallel
+    """
+
+    df = synthetic_prices()
+    symbols = ['A', 'B', 'C', 'D']
+    p_values, pairs = get_coint_pairs(df)
+
+    for j in range(4):
+        for i in range(4):
+            if i > j:
+                _, expected, _ = coint(df[symbols[i]], df[symbols[j]])
+                assert(p_values[i, j] == approx(expected))
+            else:
+                assert(p_values[i, j] == 1.0)
+    assert(['C', 'A'] in [pair[:2] for pair in pairs])
+
+    parallel, _ = get_coint_pairs(df, workers=2)
+    assert(parallel == approx(p_values))
+
+    window, _ = get_coint_pairs(df, window=(100, 400))
+    _, expected, _ = coint(df['C'][100:400], df['A'][100:400])
+    assert(window[2, 0] == approx(expected))
+
+
+def test_cache(tmp_path):
+    """
+    Tests cached p values are reused for the same data and window
+    """
+
+    df = synthetic_prices()
+    p_values, _ = get_coint_pairs(df, cache_dir=str(tmp_path))
+    files = os.listdir(str(tmp_path))
+    assert(len(files) == 1)
+
+    # a fake cached value proves the pair is not tested again
+    cache_file = os.path.join(str(tmp_path), files[0])
+    cached = np.load(cache_file)['p_values']
+    cached[1, 0] = 0.001
+    np.savez(cache_file, p_values=cached)
+
+    p_values, pairs = get_coint_pairs(df, cache_dir=str(tmp_path))
+    assert(p_values[1, 0] == 0.001)
+    assert(['B', 'A', 0.001] in pairs)
+
+    get_coint_pairs(df, cache_dir=str(tmp_path), window=(0, 300))
+    assert(len(os.listdir(str(tmp_path))) == 2)
+
+
+def test_prefilter():
+    """
+    Tests prefilters skip pairs without losing cointegrated ones
+    """
+
+    df = synthetic_prices()
+    full, _ = get_coint_pairs(df)
+
+    filtered, pairs = get_coint_pairs(df, prefilter='correlation',
+                                      prefilter_threshold=0.9)
+    assert(['C', 'A'] in [pair[:2] for pair in pairs])
+    assert(filtered[2, 0] == approx(full[2, 0]))
+    assert((filtered == 1.0).sum() > (full == 1.0).sum())
+
+    filtered, _ = get_coint_pairs(df, prefilter='distance',
+                                  prefilter_threshold=0.5)
+    assert((filtered < 1.0).sum() == 3)
+
+
+def test_candidate_prefilters():
+    """
+    Tests the neighbour and cluster prefilters against the exhaustive
+    screen
+    """
+
+    df, hedge_ratios = cointegrated_pairs(1000, 20, seed=4)
+    full, _ = get_coint_pairs(df, method='batch', lag=2)
+    filtered, pairs = get_coint_pairs(df, method='batch', lag=2,
+                                      prefilter='neighbours',
+                                      prefilter_threshold=2)
+    tested = filtered < 1.0
+    assert(tested.sum() <= 40*2)
+    assert(filtered[tested] == approx(full[tested]))
+    found = {tuple(sorted(pair[:2])) for pair in pairs}
+    assert(found >= {tuple(sorted(pair)) for pair in hedge_ratios})
+
+    tests, missed, exhaustive = prefilter_misses(df, 'neighbours', 2, lag=2)
+    assert(tests == tested.sum())
+    assert(len(exhaustive) == (full < 0.05).sum())
+    assert(len(exhaustive) - len(missed) == len(pairs))
+
+    candidates = coint_candidates(df, prefilter='neighbours',
+                                  prefilter_threshold=2)
+    assert(len(candidates) == tests)
+    assert(set(map(tuple, candidates))
+           >= {tuple(pair[:2]) for pair in pairs})
+    assert(len(coint_candidates(df)) == 40*39//2)
+
+    tests, missed, _ = prefilter_misses(df, 'clusters', lag=2)
+    assert(tests <= 40*20)
+    with raises(ValueError):
+        prefilter_misses(df, 'clusters', 0.5)
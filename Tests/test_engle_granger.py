@@ -0,0 +1,92 @@
+from pytest import raises, approx
+import os.path
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import coint
+
+from ..Lib.pair_selection.engle_granger import batch_coint, coint_pvalues
+from ..Lib.pair_selection.cointegration import get_coint_pairs
+from .test_cointegration import synthetic_prices
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def expected_coint(prices, rows, cols, lag):
+    """
+    Statistics and p values of statsmodels' coint with a fixed lag.
+    """
+    results = [coint(prices[i], prices[j], maxlag=lag, autolag=None)[:2]
+               for i, j in zip(rows, cols)]
+    return np.array(results).T
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect lags
+    """
+
+    prices = np.random.default_rng(0).normal(size=(2, 20)).cumsum(axis=1)
+    with raises(ValueError):
+        batch_coint(prices, [1], [0], lag=-1)
+    with raises(ValueError):
+        batch_coint(prices, [1], [0], lag=10)
+    with raises(ValueError):
+        batch_coint(prices, [1], [0], lag=2.5)
+
+
+def test_mock_data():
+    """
+    Tests the batched test matches coint on the mock data
+    """
+
+    df = pd.read_csv(mock_df)
+    prices = df[['ETH', 'NEO']].to_numpy().T
+    for lag in [0, 1, 5, None]:
+        tstats, pvalues = batch_coint(prices, [1, 0], [0, 1], lag=lag)
+        maxlag = 22 if lag is None else lag  # default for 1000 bars
+        expected = expected_coint(prices, [1, 0], [0, 1], maxlag)
+        assert(tstats == approx(expected[0]))
+        assert(pvalues == approx(expected[1]))
+
+
+def test_synthetic_pairs():
+    """
+    Tests every pair of synthetic prices, in chunks and for colinear
+    pairs
+    """
+
+    df = synthetic_prices()
+    prices = df[['A', 'B', 'C', 'D']].to_numpy().T
+    rows, cols = np.tril_indices(4, k=-1)
+    expected = expected_coint(prices, rows, cols, 3)
+
+    tstats, pvalues = batch_coint(prices, rows, cols, lag=3)
+    assert(tstats == approx(expected[0]))
+    assert(pvalues == approx(expected[1]))
+
+    _, chunked = batch_coint(prices, rows, cols, lag=3, memory_budget=1)
+    assert(chunked == approx(pvalues))
+
+    colinear = np.vstack([prices[0], 3*prices[0] + 1])
+    tstats, pvalues = batch_coint(colinear, [1], [0], lag=2)
+    assert(tstats[0] == -np.inf and pvalues[0] == 0.0)
+
+
+def test_p_values():
+    """
+    Tests the vectorised MacKinnon p values and the screen's batch method
+    """
+
+    from statsmodels.tsa.adfvalues import mackinnonp
+    tstats = np.linspace(-30, 5, 200)
+    expected = [mackinnonp(t, regression='c', N=2) for t in tstats]
+    assert(coint_pvalues(tstats) == approx(expected))
+
+    df = synthetic_prices()
+    p_values, pairs = get_coint_pairs(df, method='batch', lag=3)
+    _, expected, _ = coint(df['C'], df['A'], maxlag=3, autolag=None)
+    assert(p_values[2, 0] == approx(expected))
+    assert(['C', 'A'] in [pair[:2] for pair in pairs])
+    with raises(ValueError):
+        get_coint_pairs(df, method='johansen')
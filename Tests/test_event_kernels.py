@@ -0,0 +1,134 @@
+from pytest import approx, raises
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Lib.strategies import event_kernels as kernels
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategies.zscore_trend import zScoreTrader
+from ..Lib.strategy_backtester import backtest
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def test_trade_returns():
+    """
+    Tests round trip returns follow Position
+    """
+
+    entry = np.array([5.0, 5.0, 5.0, 5.0])
+    exit = np.array([10.0, 2.5, 10.0, 5.0])
+    side = np.array([1, 1, -1, -1])
+    assert(kernels.trade_returns(entry, exit, side)
+           == approx([1.0, -0.5, -1.0, 0.0]))
+    assert(kernels.trade_returns([5.0], [10.0], [1], fee=0.1)
+           == approx([0.81]))
+
+
+def test_crossover_kernel():
+    """
+    Tests the crossover kernel reproduces crossoverTrader.trade
+    """
+
+    df = pd.read_csv(mock_df)
+    for MA_type, fast, slow in [('SMA', 1, 20), ('SMA', 10, 40),
+                                ('EMA', 5, 50)]:
+        asset_df = df[['date', 'ETH']].reset_index()
+        strategy = crossoverTrader(asset_df, 'ETH', MA_type, slow,
+                                   fast_MA=fast)
+        expected = backtest(strategy).trade()
+
+        prices = asset_df['ETH'].to_numpy()
+        fastMA = strategy.fastMA.values.to_numpy()
+        slowMA = strategy.slowMA.values.to_numpy()
+        index, side = kernels.crossover_events(fastMA, slowMA, slow + 1)
+        _, closes, returns = kernels.crossover_trades(prices, index, side,
+                                                      0, len(prices))
+
+        assert(returns.sum() == approx(expected))
+        trade_returns = asset_df['returns'].to_numpy()
+        assert(np.array_equal(np.flatnonzero(trade_returns),
+                              closes[returns != 0]))
+
+
+def test_zscore_kernel():
+    """
+    Tests the zscore kernel reproduces zScoreTrader.trade
+    """
+
+    df = pd.read_csv(mock_df)
+    for fast, slow, zperiod, bw in [(1, 80, 5, 1.0), (27, 80, 8, 1.5),
+                                    (34, 100, 12, 2.0)]:
+        asset_df = df[['date', 'NEO']].reset_index()
+        strategy = zScoreTrader(asset_df, 'NEO', 'SMA', slow, zperiod, bw,
+                                fast_MA=fast)
+        expected = backtest(strategy).trade()
+
+        prices = asset_df['NEO'].to_numpy()
+        index, codes = kernels.zscore_events(
+            strategy.fastMA.values.to_numpy(),
+            strategy.slowMA.values.to_numpy(),
+            strategy.zscore.values.to_numpy(), bw, slow)
+        opens, closes, returns = kernels.zscore_trades(prices, index, codes,
+                                                       0, len(prices))
+
+        assert(returns.sum() == approx(expected))
+        assert(list(opens) == strategy.opentimes[:len(opens)])
+        assert(list(closes) == strategy.closetimes)
+
+
+def test_zscore_event_skipping():
+    """
+    Tests zScoreTrader trades identically when only visiting events
+    """
+
+    df = pd.read_csv(mock_df)
+    for MA_type, fast, slow, zperiod, bw, fee in [
+            ('SMA', 1, 80, 5, 1.0, 0.0), ('SMA', 27, 80, 8, 0.5, 0.0),
+            ('EMA', 34, 100, 12, 2.0, 0.0), ('SMA', 10, 40, 5, 1.0, 0.001)]:
+        traders = []
+        for event_skipping in [False, True]:
+            asset_df = df[['date', 'ETH']].reset_index()
+            strategy = zScoreTrader(asset_df, 'ETH', MA_type, slow, zperiod,
+                                    bw, fast_MA=fast, trading_fee=fee,
+                                    event_skipping=event_skipping)
+            traders.append((strategy, backtest(strategy).trade()))
+
+        (loop, expected), (events, cum_returns) = traders
+        assert(cum_returns == expected)
+        assert(events.df['returns'].equals(loop.df['returns']))
+        assert(events.opentimes == loop.opentimes)
+        assert(events.closetimes == loop.closetimes)
+        assert(events.position.getState() == loop.position.getState())
+        assert(events.events == len(loop.opentimes) + len(loop.closetimes))
+
+
+def test_zscore_bandwidths():
+    """
+    Tests a list of bandwidths trades as one zScoreTrader per bandwidth
+    """
+
+    df = pd.read_csv(mock_df)
+    bandwidths = [1.0, 1.5, 2.0]
+    for fee in [0.0, 0.001]:
+        asset_df = df[['date', 'NEO']].reset_index()
+        strategy = zScoreTrader(asset_df, 'NEO', 'SMA', 80, 8, bandwidths,
+                                fast_MA=27, trading_fee=fee)
+        cum_returns = backtest(strategy).trade()
+        assert(cum_returns.shape == (3,))
+
+        for k, bw in enumerate(bandwidths):
+            asset_df = df[['date', 'NEO']].reset_index()
+            single = zScoreTrader(asset_df, 'NEO', 'SMA', 80, 8, bw,
+                                  fast_MA=27, trading_fee=fee)
+            assert(cum_returns[k] == backtest(single).trade())
+            assert(np.array_equal(strategy.returns[:, k],
+                                  single.df['returns'].to_numpy()))
+            assert(strategy.opentimes[k] == single.opentimes)
+            assert(strategy.closetimes[k] == single.closetimes)
+
+    with raises(ValueError):
+        strategy.trade(plot=True)
+    with raises(ValueError):
+        zScoreTrader(df, 'NEO', 'SMA', 80, 8, [])
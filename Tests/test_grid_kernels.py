@@ -0,0 +1,59 @@
+from pytest import raises, approx
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Lib.strategies.grid_kernels import ma_matrix, crossover_grid_returns
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategy_backtester import backtest
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+MA_list = [1, 10, 20, 40, 50, 80, 100]
+
+
+def expected_heatmap(df, symbol, MA_type, fee):
+    """
+    Builds the heatmap the MA trading app computes run by run
+    """
+    returns = np.zeros((len(MA_list), len(MA_list)))
+    for i in range(len(MA_list)):
+        for j in range(i+1, len(MA_list)):
+            asset_df = df[['date', symbol]].reset_index()
+            strategy = crossoverTrader(asset_df, symbol, MA_type, MA_list[j],
+                                       fast_MA=MA_list[i], trading_fee=fee)
+            returns[j, i] = backtest(strategy).trade()
+    return returns
+
+
+def test_ma_matrix_failure():
+    """
+    Tests for failure of an unknown MA type
+    """
+
+    series = pd.Series([1.0, 2.0, 3.0])
+    with raises(ValueError):
+        ma_matrix(series, [1, 2], 'WMA')
+
+
+def test_grid_returns():
+    """
+    Tests the broadcast kernel reproduces every crossoverTrader run,
+    whatever the chunking over time
+    """
+
+    df = pd.read_csv(mock_df)
+    for symbol, MA_type, fee in [('ETH', 'SMA', 0.0), ('NEO', 'EMA', 0.001)]:
+        expected = expected_heatmap(df, symbol, MA_type, fee)
+        ma = ma_matrix(df[symbol], MA_list, MA_type)
+        prices = df[symbol].to_numpy()
+
+        for chunk_size in [None, 1, 37]:
+            returns = crossover_grid_returns(prices, ma, MA_list, fee=fee,
+                                             chunk_size=chunk_size)
+            assert(returns == approx(expected))
+
+        returns = crossover_grid_returns(prices, ma, MA_list, fee=fee,
+                                         memory_budget=10000)
+        assert(returns == approx(expected))
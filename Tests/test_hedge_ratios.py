@@ -0,0 +1,106 @@
+from pytest import raises, approx
+import numpy as np
+
+from ..Lib.strategies.hedge_ratios import (rolling_ols_hedge_ratios,
+                                           ewma_hedge_ratios)
+from ..Lib.strategies.pairs import pairsTrader
+from ..Lib.strategies.pairs_cache import spreadCache
+from ..Benchmarks.synthetic_data import cointegrated_pairs
+from ..Benchmarks.hedge_estimators import compare_estimators
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect windows, series and estimators
+    """
+
+    x = np.arange(10.0)
+    with raises(ValueError):
+        rolling_ols_hedge_ratios(x, x, 1)
+    with raises(ValueError):
+        ewma_hedge_ratios(x, x, 2.5)
+    with raises(ValueError):
+        rolling_ols_hedge_ratios(x, x[:-1], 3)
+
+    df, _ = cointegrated_pairs(50, 1)
+    with raises(ValueError):
+        pairsTrader(df['X000'], df['Y000'], 'X', 'Y', 5, hedge_ratio='pca')
+    with raises(ValueError):
+        pairsTrader(df['X000'], df['Y000'], 'X', 'Y', 5, hedge_ratio='ols',
+                    hedge_window=1)
+
+
+def test_regressions():
+    """
+    Tests the estimators match least squares fits of each window
+    """
+
+    rng = np.random.default_rng(0)
+    x = 100 + np.cumsum(rng.normal(size=300))
+    y = 1.7*x + rng.normal(size=300)
+    window = 30
+
+    ols = rolling_ols_hedge_ratios(x, y, window)
+    assert(np.isnan(ols[:window - 1]).all())
+    for t in range(window - 1, 300):
+        rows = slice(t - window + 1, t + 1)
+        assert(ols[t] == approx(np.polyfit(x[rows], y[rows], 1)[0]))
+
+    ewma = ewma_hedge_ratios(x, y, window)
+    assert(np.isnan(ewma[:window - 1]).all())
+    alpha = 1.0/(1.0 + window)
+    for t in range(window - 1, 300, 7):
+        weights = (1 - alpha)**np.arange(t, -1, -1)
+        expected = np.polyfit(x[:t + 1], y[:t + 1], 1, w=np.sqrt(weights))
+        assert(ewma[t] == approx(expected[0]))
+
+    # a constant x has no hedge ratio
+    assert(np.isnan(rolling_ols_hedge_ratios(np.ones(20), y[:20], 5)).all())
+    assert(len(rolling_ols_hedge_ratios(x[:3], y[:3], 5)) == 3)
+
+
+def test_regression_trading():
+    """
+    Tests pairsTrader holds the regression hedge ratio while a position
+    is open and trades identically from a cache
+    """
+
+    df, hedge_ratios = cointegrated_pairs(1000, 1, seed=3)
+    x, y = df['X000'], df['Y000']
+    for estimator in ['ols', 'ewma']:
+        strategy = pairsTrader(x, y, 'X000', 'Y000', 10, 1.5,
+                               hedge_ratio=estimator, hedge_window=50)
+        cum_returns = strategy.trade()
+        assert(len(strategy.closetimes) > 1)
+
+        expected = strategy.spreads.step_hr
+        HR = strategy.df['HR'].to_numpy()
+        held = np.zeros(len(HR), dtype=bool)
+        # a position still open is held to the last bar
+        closetimes = strategy.closetimes + [len(HR) - 1]
+        for opened, closed in zip(strategy.opentimes, closetimes):
+            held[opened + 1:closed + 1] = True
+            assert((HR[opened:closed + 1] == HR[opened]).all())
+        # the last bar is filtered with the bar before
+        flat = ~held[:-1]
+        assert(np.array_equal(HR[:-1][flat], expected[:-1][flat],
+                              equal_nan=True))
+        assert(np.nanmedian(HR) == approx(hedge_ratios[('X000', 'Y000')],
+                                          rel=0.05))
+
+        cached = pairsTrader(x, y, 'X000', 'Y000', 10, 1.5,
+                             spread_cache=spreadCache(),
+                             hedge_ratio=estimator, hedge_window=50)
+        assert(cached.trade() == cum_returns)
+        assert(cached.opentimes == strategy.opentimes)
+
+
+def test_compare_estimators():
+    """
+    Tests the estimator comparison reports every estimator asked for
+    """
+
+    comparison = compare_estimators(500, 2, estimators=['ols', 'ewma'])
+    assert(list(comparison['estimator']) == ['ols', 'ewma'])
+    assert((comparison['seconds'] > 0).all())
+    assert((comparison['hedge_ratio_error'] < 0.1).all())
@@ -0,0 +1,12 @@
+from ..Benchmarks.import_time import measure_import, MODULES
+
+
+def test_lazy_imports():
+    """
+    Tests library modules import without their heavy dependencies
+    """
+
+    for module in MODULES:
+        _, heavy = measure_import(module, repeats=1)
+        assert(heavy == [])
+
@@ -0,0 +1,166 @@
+from pytest import raises
+import asyncio
+import json
+import urllib.request
+import numpy as np
+import pandas as pd
+
+from ..Lib.streaming.live_feed import liveFeed
+from ..Lib.streaming.stub_server import stubServer
+from ..Lib.streaming.event_driven import barStrategy, crossoverStream, replay
+from ..Benchmarks.synthetic_data import raw_json
+
+
+class recorder(barStrategy):
+    """
+    Records the bars it receives.
+    """
+
+    def __init__(self, symbols):
+        super(recorder, self).__init__()
+        self.symbols = symbols
+        self.received = []
+        self.closes = []
+
+    def on_bar(self, timestamp, prices):
+        assert(sorted(prices) == sorted(self.symbols))
+        self.received.append(timestamp)
+        self.closes.append(prices)
+        return []
+
+
+def test_stub_server():
+    """
+    Tests the stub serves the recorded bars up to its clock
+    """
+
+    raw = raw_json(50, 2, gap_fraction=0.0)
+    start = raw['S000'][20]['time']
+    with stubServer(raw, ticksize="hour", speed=0, start=start) as server:
+        url = server.url + "/data/histohour?fsym=S000&tsym=BTC&limit=5"
+        with urllib.request.urlopen(url) as response:
+            content = json.load(response)
+        assert(content['Response'] == "Success")
+        assert(content['Data'][:-1] == raw['S000'][15:20])
+        # the bar at the clock has only just opened
+        forming = dict(raw['S000'][20], close=raw['S000'][20]['open'])
+        assert(content['Data'][-1] == forming)
+
+        url = server.url + "/data/histohour?fsym=BTC&tsym=BTC&limit=5"
+        with urllib.request.urlopen(url) as response:
+            assert(json.load(response)['Response'] == "Error")
+        assert(server.requests == 2)
+
+
+def test_live_feed():
+    """
+    Tests every bar reaches its subscribers once and in order
+    """
+
+    raw = raw_json(100, 3, seed=1, gap_fraction=0.1)
+    symbols = list(raw)
+    start = raw['S000'][30]['time']
+    recorders = [recorder([symbol]) for symbol in symbols]
+    pair = recorder(symbols[:2])
+
+    df = pd.DataFrame({'S001': {bar['time']: bar['close']
+                                for bar in raw['S001']}})
+    live = crossoverStream('S001', 'SMA', 10, fast_MA=2)
+    orders = []
+
+    with stubServer(raw, ticksize="hour", speed=3600*250,
+                    start=start) as server:
+        feed = liveFeed("key", symbols, ticksize="hour", limit=100,
+                        interval=0.01, base_url=server.url,
+                        clock=server.now)
+        for strategy in recorders:
+            feed.subscribe(strategy, strategy.symbols)
+        feed.subscribe(pair, pair.symbols)
+        feed.subscribe(live,
+                       callback=lambda strategy, new: orders.extend(new))
+        feed.run(duration=1.0)
+
+    for strategy, symbol in zip(recorders, symbols):
+        assert(strategy.received == [bar['time'] for bar in raw[symbol]])
+        assert([prices[symbol] for prices in strategy.closes]
+               == [bar['close'] for bar in raw[symbol]])
+        assert(feed.bars[symbol] == len(raw[symbol]))
+    both = (set(bar['time'] for bar in raw['S000'])
+            & set(bar['time'] for bar in raw['S001']))
+    assert(pair.received == sorted(both))
+
+    assert(orders == replay(crossoverStream('S001', 'SMA', 10, fast_MA=2),
+                            df))
+    assert(len(orders) > 0)
+
+    report = feed.latency_report()
+    assert(list(report.index) == symbols)
+    assert((report['errors'] == 0).all())
+    assert((report['p50_ms'] <= report['p99_ms']).all())
+    assert(report.loc['S000', 'decisions'] == len(raw['S000']) + len(both))
+
+
+def test_forming_bars():
+    """
+    Tests a forming bar is held back and dispatched with its final close
+    """
+
+    raw = raw_json(50, 1, gap_fraction=0.0)
+    bars = raw['S000']
+    strategy = recorder(['S000'])
+    half_way = bars[20]['time'] + 1800
+    with stubServer(raw, ticksize="hour", speed=0, start=half_way) as server:
+        feed = liveFeed("key", ['S000'], ticksize="hour", limit=5,
+                        base_url=server.url, clock=server.now)
+        feed.subscribe(strategy, strategy.symbols)
+        asyncio.run(feed.poll_once())
+        asyncio.run(feed.poll_once())
+        forming = server.respond("/data/histohour?fsym=S000&limit=1")
+    assert(forming['Data'][-1]['close'] != bars[20]['close'])
+    assert(strategy.received == [bar['time'] for bar in bars[15:20]])
+
+    # the bar is superseded by the next one
+    with stubServer(raw, ticksize="hour", speed=0,
+                    start=half_way + 3600) as server:
+        feed.base_url = server.url
+        feed.clock = server.now
+        asyncio.run(feed.poll_once())
+    assert(strategy.received[-1] == bars[20]['time'])
+    assert(strategy.closes[-1]['S000'] == bars[20]['close'])
+    assert(feed.bars['S000'] == 6)
+
+
+def test_live_feed_errors():
+    """
+    Tests failed polls are counted without stopping the feed
+    """
+
+    raw = raw_json(20, 1, gap_fraction=0.0)
+    with stubServer(raw, ticksize="hour", speed=0) as server:
+        feed = liveFeed("key", ['S000', 'BTC'], ticksize="hour",
+                        base_url=server.url)
+        asyncio.run(feed.poll_once())
+    assert(feed.errors == {'S000': 0, 'BTC': 1})
+    assert(feed.bars == {'S000': 1, 'BTC': 0})
+    assert(np.isnan(feed.latency_report().loc['BTC', 'p50_ms']))
+
+    feed = liveFeed("key", ['S000'], ticksize="hour", timeout=1.0,
+                    base_url="http://127.0.0.1:9")
+    feed.run(polls=1)
+    assert(feed.errors['S000'] == 1)
+
+
+def test_validation():
+    """
+    Tests bad parameters are rejected
+    """
+
+    with raises(ValueError):
+        liveFeed("key", ['ETH', 'ETH'])
+    with raises(ValueError):
+        liveFeed("key", ['ETH'], ticksize="second")
+    with raises(ValueError):
+        liveFeed("key", ['ETH'], limit=0)
+    feed = liveFeed("key", ['ETH'])
+    with raises(ValueError):
+        feed.subscribe(crossoverStream('LTC', 'SMA', 10))
@@ -0,0 +1,154 @@
+from pytest import raises
+import os.path
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from ..Lib.instrumentation import memory
+from ..Lib.data_loading.data_loader import dataLoader
+from ..Lib.data_loading.file_loading_strategies import fileLoadingDF
+from ..Lib.strategies.zscore_trend import zScoreTrader
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategies.pairs import pairsTrader
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def test_measure():
+    """
+    Tests held and peak bytes of nested blocks
+    """
+
+    assert(memory.measure('a') is memory.measure('b'))
+    tracker = memory.enable()
+    try:
+        with memory.measure('outer'):
+            with memory.measure('inner'):
+                temporary = np.ones(10**6)
+                del temporary
+            held = np.ones(2*10**5)
+    finally:
+        assert(memory.disable() is tracker)
+
+    inner_calls, inner_held, inner_peak = tracker.stats['inner']
+    outer_calls, outer_held, outer_peak = tracker.stats['outer']
+    assert(inner_calls == 1 and outer_calls == 1)
+    assert(inner_peak >= 8*10**6 and abs(inner_held) < 10**5)
+    assert(outer_peak >= inner_peak)
+    assert(1.5*10**6 < outer_held < 2*10**6)
+    assert(tracker.summary().index[0] == 'outer')
+    assert(held.size > 0)
+
+
+def test_caller_tracing():
+    """
+    Tests disable leaves tracemalloc running if the caller started it
+    """
+
+    tracemalloc.start()
+    try:
+        memory.enable()
+        memory.disable()
+        assert(tracemalloc.is_tracing())
+    finally:
+        tracemalloc.stop()
+
+    memory.enable()
+    memory.disable()
+    assert(not tracemalloc.is_tracing())
+
+
+def test_loader_and_strategy():
+    """
+    Tests loaders and strategy construction are measured and strategy
+    bytes are itemised
+    """
+
+    tracker = memory.enable()
+    try:
+        df = dataLoader(fileLoadingDF(mock_df)).get_data()
+        strategy = zScoreTrader(df, 'ETH', 'SMA', 80, 8, 1.5, fast_MA=27)
+        crossoverTrader(df, 'ETH', 'SMA', 40)
+        pairsTrader(df['ETH'], df['NEO'], 'ETH', 'NEO', 10)
+    finally:
+        memory.disable()
+    assert(tracker.stats['load.fileLoadingDF'][1] > 0)
+    for name in ['zscore', 'crossover', 'pairs']:
+        calls, held, peak = tracker.stats['construct.' + name]
+        assert(calls == 1 and peak >= 8*df.shape[0])
+
+    usage = memory.strategy_memory(strategy)
+    indicators = usage[usage['kind'] == 'indicator']
+    assert(list(indicators['name']) == ['27 SMA', '80 SMA', '8 Zscr'])
+    assert((indicators['bytes'] >= 8*df.shape[0]).all())
+    columns = usage[usage['kind'] == 'column']
+    assert('returns' in list(columns['name']))
+    assert(memory.peak_rss() > 0)
+
+
+def test_sweep_workers():
+    """
+    Tests workers ship their measurements and peak RSS
+    """
+
+    df = pd.read_csv(mock_df)
+    jobs = [('crossover', (sym,), {'MA_type': 'SMA', 'slow_MA': 40})
+            for sym in ('ETH', 'NEO')]*2
+    tracker = memory.enable()
+    try:
+        parameterSweep(df, workers=2).run(jobs)
+    finally:
+        memory.disable()
+    assert(tracker.stats['construct.crossover'][0] == 4)
+    assert(0 < len(tracker.workers) <= 2)
+    assert(all(rss > 0 for rss in tracker.workers.values()))
+
+
+def test_memory_budget(tmp_path):
+    """
+    Tests a memory budget lowers concurrency and spills returns
+    """
+
+    df = pd.read_csv(mock_df)
+    jobs = [('crossover', ('ETH',), {'MA_type': 'SMA', 'slow_MA': s})
+            for s in (20, 40, 60, 80)]
+    expected = parameterSweep(df).run(jobs, keep_returns=True)
+
+    with raises(ValueError):
+        parameterSweep(df, memory_budget=1000)
+
+    # room for the prices, one run and two kept returns arrays
+    budget = 8*df.shape[0]*(2 + 8 + 2) + 1000
+    sweep = parameterSweep(df, workers=4, memory_budget=budget,
+                           spill_dir=str(tmp_path))
+    results = sweep.run(jobs, keep_returns=True)
+    assert(sweep.effective_workers == 1)
+    assert(sweep.spilled >= 2)
+    assert(os.path.dirname(sweep.spill_path) == str(tmp_path))
+    assert(len(os.listdir(sweep.spill_path)) == sweep.spilled)
+    assert(isinstance(results[-1][1], np.memmap))
+
+    # a second run leaves the first run's spilled returns alone
+    first_path = sweep.spill_path
+    sweep.run(jobs[::-1], keep_returns=True)
+    assert(sweep.spill_path != first_path)
+    assert(len(os.listdir(str(tmp_path))) == 2)
+    for (cum, returns), (exp_cum, exp_returns) in zip(results, expected):
+        assert(cum == exp_cum)
+        assert(np.array_equal(returns, exp_returns))
+
+    # closing deletes every run's spilled returns
+    del results, returns
+    sweep.close()
+    assert(os.listdir(str(tmp_path)) == [] and sweep.spill_paths == [])
+    with parameterSweep(df, memory_budget=budget,
+                        spill_dir=str(tmp_path)) as sweep:
+        sweep.run(jobs, keep_returns=True)
+        assert(len(os.listdir(str(tmp_path))) == 1)
+    assert(os.listdir(str(tmp_path)) == [])
+
+    sweep = parameterSweep(df, workers=4, memory_budget=2**40)
+    sweep.run(jobs, keep_returns=True)
+    assert(sweep.effective_workers == 4 and sweep.spilled == 0)
@@ -0,0 +1,153 @@
+from pytest import raises
+import numpy as np
+import pandas as pd
+
+from ..Lib.strategies.pairs import pairsTrader
+from ..Lib.strategies.pairs_cache import (spreadCache, window_zscores,
+                                          _window_means, _window_variances)
+from ..Lib.streaming.indicators import window_zscore
+from ..Lib.sweeps.parameter_sweep import parameterSweep, _group_jobs
+from ..Benchmarks.synthetic_data import cointegrated_pairs
+
+
+def test_window_zscores():
+    """
+    Tests the vectorised window z scores match window_zscore
+    """
+
+    rng = np.random.default_rng(0)
+    series = [rng.normal(size=200),
+              1e8 + rng.normal(size=200)*1e-6,  # ill-conditioned sums
+              np.repeat(rng.normal(size=20), 10),  # constant windows
+              -np.abs(rng.normal(size=200))]
+    nan_series = rng.normal(size=200)
+    nan_series[50] = np.nan
+    series.append(nan_series)
+
+    for values in series:
+        for period in [1, 2, 5, 12]:
+            expected = [window_zscore(values[t - period:t + 1], period)
+                        for t in range(period + 3, 200)]
+            assert(np.array_equal(window_zscores(values, period,
+                                                 period + 3, 200),
+                                  expected, equal_nan=True))
+
+    assert(len(window_zscores(series[0], 5, 10, 10)) == 0)
+    with raises(ValueError):
+        window_zscores(series[0], 5, 4, 10)
+
+
+def test_pandas_rolling():
+    """
+    Tests the window means and variances match pandas' rolling mean, var
+    and std bit for bit
+    """
+
+    rng = np.random.default_rng(1)
+    series = [rng.normal(size=150),
+              1e8 + rng.normal(size=150)*1e-6,  # ill-conditioned sums
+              np.repeat(rng.normal(size=15), 10),  # constant windows
+              -np.abs(rng.normal(size=150))]
+
+    for values in series:
+        for period in [2, 5, 12]:
+            windows = np.lib.stride_tricks.sliding_window_view(values,
+                                                               period + 1)
+            rolling = [pd.Series(window).rolling(period)
+                       for window in windows]
+            means = _window_means(windows, period)
+            variances = _window_variances(windows, period)
+            stds = np.sqrt(np.where(variances > 0, variances, 0.0))
+            assert(np.array_equal(means, [r.mean().iloc[-1]
+                                          for r in rolling]))
+            assert(np.array_equal(variances, [r.var().iloc[-1]
+                                              for r in rolling]))
+            assert(np.array_equal(stds, [r.std().iloc[-1]
+                                         for r in rolling]))
+
+
+def test_cached_trading():
+    """
+    Tests pairsTraders sharing a cache trade as pairsTrader
+    """
+
+    df, _ = cointegrated_pairs(400, 1, seed=3)
+    x, y = df['X000'], df['Y000']
+    cache = spreadCache()
+    for zperiod, bandwidth, fee in [(5, 1.0, 0.0), (20, 1.5, 0.0),
+                                    (5, 1.0, 0.001)]:
+        expected = pairsTrader(x.copy(), y.copy(), 'X000', 'Y000', zperiod,
+                               bandwidth, fee)
+        cum_returns = expected.trade()
+        cached = pairsTrader(x, y, 'X000', 'Y000', zperiod, bandwidth, fee,
+                             spread_cache=cache)
+
+        assert(cached.trade() == cum_returns)
+        assert(cached.opentimes == expected.opentimes)
+        assert(cached.closetimes == expected.closetimes)
+        for key in expected.df.keys():
+            assert(cached.df[key].equals(expected.df[key]))
+        if fee == 0.0:
+            assert(len(expected.closetimes) > 1)
+
+    assert((cache.misses, cache.hits) == (1, 2))
+
+
+def test_cache_bounds():
+    """
+    Tests pairs are keyed by their prices and evicted least recently
+    used first
+    """
+
+    df, _ = cointegrated_pairs(300, 3, seed=1)
+    cache = spreadCache()
+    first = cache.get(df['X000'], df['Y000'], 'X000', 'Y000')
+    assert(cache.get(df['X000'], df['Y000'], 'X000', 'Y000') is first)
+    changed = df['Y000'].copy()
+    changed.iloc[-1] += 1.0
+    assert(cache.get(df['X000'], changed, 'X000', 'Y000') is not first)
+    assert((cache.hits, cache.misses, len(cache)) == (1, 2, 2))
+
+    cache = spreadCache(max_bytes=int(2.5*first.nbytes))
+    for n in range(3):
+        sym = '{:03d}'.format(n)
+        cache.get(df['X' + sym], df['Y' + sym], 'X' + sym, 'Y' + sym)
+        assert(cache.nbytes <= cache.max_bytes)
+    assert(len(cache) == 2)
+    cache.get(df['X000'], df['Y000'], 'X000', 'Y000')
+    assert(cache.misses == 4)
+
+    with raises(ValueError):
+        spreadCache(max_bytes=0)
+
+
+def test_pairs_sweep():
+    """
+    Tests a pairs grid sweep gives the results of each pairsTrader
+    """
+
+    df, _ = cointegrated_pairs(250, 2, seed=5)
+    jobs = [('pairs', pair, {'zperiod': zperiod, 'bandwidth': bandwidth})
+            for zperiod in [5, 10] for bandwidth in [1.0, 2.0]
+            for pair in [('X000', 'Y000'), ('X001', 'Y001')]]
+
+    results = parameterSweep(df).run(jobs, keep_returns=True)
+
+    for (_, (xsym, ysym), params), (cum_returns, returns) in zip(jobs,
+                                                               results):
+        expected = pairsTrader(df[xsym].copy(), df[ysym].copy(), xsym, ysym,
+                               **params)
+        assert(cum_returns == expected.trade())
+        assert(np.array_equal(returns, expected.df['returns'].to_numpy()))
+
+    # fewer pairs than workers are split to keep every worker busy
+    pending = list(range(len(jobs)))
+    assert(len(_group_jobs(jobs, pending)) == 2)
+    groups = _group_jobs(jobs, pending, workers=4)
+    assert(len(groups) == 4)
+    assert(sorted(n for group in groups for n in group) == pending)
+    assert(len(_group_jobs(jobs, pending, workers=2)) == 2)
+    parallel = parameterSweep(df, workers=4).run(jobs, keep_returns=True)
+    for (cum_returns, returns), expected in zip(parallel, results):
+        assert(cum_returns == expected[0])
+        assert(np.array_equal(returns, expected[1]))
@@ -0,0 +1,93 @@
+from pytest import approx
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Lib.performance_metrics import (returns_metrics, ledger_metrics,
+                                       performance_metrics, strategies_ledger)
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategies.zscore_trend import zScoreTrader
+from ..Lib.strategy_backtester import backtest
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def test_returns_metrics():
+    """
+    Tests return based metrics against hand computed values
+    """
+
+    returns = np.array([[0.0, 0.1, 0.0, -0.2, 0.0, 0.05, 0.0, 0.2],
+                        [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]])
+    metrics = returns_metrics(returns)
+
+    run = pd.Series(returns[0])
+    assert(metrics['cum_returns'][0] == approx(0.15))
+    assert(metrics['sharpe'][0] == approx(run.mean()/run.std()))
+    downside = np.sqrt((np.minimum(returns[0], 0)**2).mean())
+    assert(metrics['sortino'][0] == approx(run.mean()/downside))
+    assert(metrics['max_drawdown'][0] == approx(0.2))
+    assert(metrics['max_drawdown_duration'][0] == 4)
+    assert(metrics['num_trades'][0] == 4)
+    assert(metrics['hit_rate'][0] == approx(0.75))
+    assert(metrics['average_trade'][0] == approx(0.0375))
+
+    assert(metrics['num_trades'][1] == 0)
+    assert(np.isnan(metrics['hit_rate'][1]))
+    assert(metrics['max_drawdown'][1] == 0)
+
+    annual = returns_metrics(returns, periods_per_year=100)
+    assert(annual['sharpe'][0] == approx(10*metrics['sharpe'][0]))
+
+
+def test_chunking():
+    """
+    Tests results do not depend on the memory budget
+    """
+
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.01, (50, 200))*(rng.random((50, 200)) < 0.1)
+    full = returns_metrics(returns)
+    chunked = returns_metrics(returns, memory_budget=1)
+    for key in full:
+        assert(np.allclose(full[key], chunked[key], equal_nan=True))
+
+
+def test_ledger_metrics():
+    """
+    Tests trade based metrics of a small ledger
+    """
+
+    ledger = ([0, 0, 1], [2, 10, 0], [6, 12, 5], [0.1, -0.05, 0.2])
+    metrics = ledger_metrics(ledger, 3, 20)
+    assert(list(metrics['num_trades']) == [2, 1, 0])
+    assert(metrics['hit_rate'][:2] == approx([0.5, 1.0]))
+    assert(metrics['average_trade'][:2] == approx([0.025, 0.2]))
+    assert(metrics['turnover'] == approx([0.2, 0.1, 0.0]))
+    assert(metrics['exposure'] == approx([0.3, 0.25, 0.0]))
+
+
+def test_strategies():
+    """
+    Tests metrics of traded strategies built from their ledger
+    """
+
+    df = pd.read_csv(mock_df)
+    strategies = [crossoverTrader(df[['date', 'ETH']].reset_index(), 'ETH',
+                                  'SMA', 40, fast_MA=10),
+                  zScoreTrader(df[['date', 'NEO']].reset_index(), 'NEO',
+                               'SMA', 80, 8, 1.5, fast_MA=27)]
+    cum_returns = [backtest(strategy).trade() for strategy in strategies]
+
+    returns = np.vstack([s.df['returns'].to_numpy() for s in strategies])
+    ledger = strategies_ledger(strategies)
+    metrics = performance_metrics(returns, ledger=ledger)
+
+    assert(metrics.shape[0] == 2)
+    assert(metrics['cum_returns'].to_numpy() == approx(cum_returns))
+    assert(metrics.loc[0, 'num_trades'] == len(strategies[0].closetimes))
+    assert(0 < metrics.loc[0, 'exposure'] <= 1)
+
+    without_ledger = performance_metrics(returns)
+    assert(np.isnan(without_ledger.loc[0, 'exposure']))
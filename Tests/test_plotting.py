@@ -0,0 +1,91 @@
+from pytest import raises
+import numpy as np
+import pandas as pd
+
+from ..Lib.reporting import plotting
+
+
+def make_series(N, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.cumsum(rng.normal(size=N)), index=np.arange(N) + 50)
+
+
+def test_set_downsampling_failure():
+    """
+    Tests for failure of incorrect inputs
+    """
+
+    with raises(ValueError):
+        plotting.set_downsampling(max_points=2)
+    with raises(ValueError):
+        plotting.set_downsampling(max_points=100.0)
+    with raises(ValueError):
+        plotting.set_downsampling(method='mean')
+
+
+def test_minmax():
+    """
+    Tests min/max downsampling keeps the extremes and end points
+    """
+
+    series = make_series(100000)
+    values = plotting.downsample(series, max_points=1000, method='minmax')
+    assert(len(values) <= 1000)
+    assert(values.index[0] == series.index[0])
+    assert(values.index[-1] == series.index[-1])
+    assert(values.max() == series.max())
+    assert(values.min() == series.min())
+    assert(values.index.is_monotonic_increasing)
+    assert(values.equals(series.loc[values.index]))
+
+
+def test_lttb():
+    """
+    Tests LTTB returns exactly max_points including the end points
+    """
+
+    series = make_series(20000)
+    values = plotting.downsample(series, max_points=500, method='lttb')
+    assert(len(values) == 500)
+    assert(values.index[0] == series.index[0])
+    assert(values.index[-1] == series.index[-1])
+    assert(values.index.is_unique and values.index.is_monotonic_increasing)
+    assert(values.equals(series.loc[values.index]))
+
+    # a straight line with one spike keeps the spike
+    line = pd.Series(np.arange(10000, dtype=float))
+    line[5003] = 1e6
+    assert(5003 in plotting.downsample(line, 100, 'lttb').index)
+
+
+def test_keep():
+    """
+    Tests trade bars are kept exactly and short series are untouched
+    """
+
+    series = make_series(50000)
+    trades = [51, 777, 20001, 49999]
+    for method in ('minmax', 'lttb'):
+        values = plotting.downsample(series, 200, method, keep=trades)
+        for t in trades:
+            assert(values[t] == series[t])
+
+    short = make_series(100)
+    assert(plotting.downsample(short, 200) is short)
+    plotting.set_downsampling(max_points=None)
+    try:
+        assert(plotting.downsample(series) is series)
+    finally:
+        plotting.set_downsampling()
+
+
+def test_nans():
+    """
+    Tests NaN bars are dropped from downsampled series
+    """
+
+    series = make_series(10000)
+    series.iloc[:30] = np.nan
+    values = plotting.downsample(series, 100)
+    assert(not values.isna().any())
+    assert(values.index[0] == series.index[30])
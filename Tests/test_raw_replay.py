@@ -0,0 +1,143 @@
+from pytest import raises
+import asyncio
+import json
+import os.path
+import pandas as pd
+
+from ..Lib.streaming.raw_replay import rawReplay, index_raw_json
+from ..Lib.streaming.event_driven import crossoverStream, replay
+from ..Benchmarks.synthetic_data import raw_json
+
+
+def _write_web_layout(path, raw, run_length):
+    """
+    Writes raw bars as webLoading does: runs of the latest bars first,
+    each run repeating the first bar of the run after it.
+    """
+    stored = {}
+    for symbol, bars in raw.items():
+        runs = []
+        end = len(bars)
+        while end > 0:
+            runs.append(bars[max(end - run_length, 0):end + 1])
+            end -= run_length
+        stored[symbol] = [bar for run in runs for bar in run]
+    with open(path, 'w') as outfile:
+        json.dump(stored, outfile, indent=4)
+
+
+def test_index(tmpdir):
+    """
+    Tests the runs of each symbol are found
+    """
+
+    raw = raw_json(100, 2, gap_fraction=0.0)
+    path = os.path.join(str(tmpdir), "raw.json")
+    _write_web_layout(path, raw, 30)
+
+    index = index_raw_json(path, chunk_size=300)
+    assert(list(index) == ['S000', 'S001'])
+    runs = index['S000']
+    assert([run[2] for run in runs]
+           == [raw['S000'][i]['time'] for i in (70, 40, 10, 0)])
+    assert([run[3] for run in runs] == [30, 31, 31, 11])
+
+    with open(path, 'rb') as infile:
+        infile.seek(runs[-1][0])
+        stored = infile.read(runs[-1][1] - runs[-1][0]).decode()
+    assert(json.loads("[" + stored.strip().rstrip(",") + "]")
+           == raw['S000'][:11])
+
+
+def test_bars(tmpdir):
+    """
+    Tests the merged stream is time ordered without duplicates
+    """
+
+    raw = raw_json(200, 4, seed=2, gap_fraction=0.2)
+    path = os.path.join(str(tmpdir), "raw.json")
+    _write_web_layout(path, raw, 50)
+
+    replayer = rawReplay(path, chunk_size=256)
+    events = list(replayer.bars())
+    expected = sorted(((bar['time'], symbol, bar)
+                       for symbol in raw for bar in raw[symbol]),
+                      key=lambda event: event[0])
+    assert(events == expected)
+    # the repeated first bar of every run but the first
+    assert(replayer.dropped
+           == sum((len(bars) - 1)//50 for bars in raw.values()))
+
+    replayer = rawReplay(path, symbols=['S003', 'S001'])
+    assert(set(symbol for _, symbol, _ in replayer.bars())
+           == {'S001', 'S003'})
+
+
+def test_run(tmpdir):
+    """
+    Tests strategies trade as a replay of the prices
+    """
+
+    raw = raw_json(300, 3, seed=4, gap_fraction=0.0)
+    path = os.path.join(str(tmpdir), "raw.json")
+    _write_web_layout(path, raw, 100)
+
+    replayer = rawReplay(path)
+    live = crossoverStream('S002', 'SMA', 20, fast_MA=5)
+    orders = []
+    replayer.subscribe(live,
+                       callback=lambda strategy, new: orders.extend(new))
+    assert(replayer.run() == 900)
+
+    df = pd.DataFrame({'S002': {bar['time']: bar['close']
+                                for bar in raw['S002']}})
+    expected = crossoverStream('S002', 'SMA', 20, fast_MA=5)
+    assert(orders == replay(expected, df))
+    assert(live.cum_returns == expected.cum_returns)
+
+    report = replayer.report()
+    assert(report['events'] == 900)
+    assert(report['events_per_second'] > 0)
+    assert(report['p50_ms'] <= report['p99_ms'])
+
+    assert(replayer.run(max_events=10) == 10)
+
+
+def test_speed(tmpdir):
+    """
+    Tests a throttled replay keeps to its speed
+    """
+
+    raw = raw_json(21, 1, gap_fraction=0.0)
+    path = os.path.join(str(tmpdir), "raw.json")
+    with open(path, 'w') as outfile:
+        json.dump(raw, outfile)
+
+    # 20 hours at 100 hours a second
+    replayer = rawReplay(path, speed=3600*100)
+    replayer.run()
+    assert(0.19 < replayer.elapsed < 1.0)
+
+    replayer = rawReplay(path, speed=3600*100)
+    assert(asyncio.run(replayer.serve()) == 21)
+    assert(replayer.elapsed > 0.19)
+
+
+def test_validation(tmpdir):
+    """
+    Tests bad parameters are rejected
+    """
+
+    raw = raw_json(10, 1)
+    path = os.path.join(str(tmpdir), "raw.json")
+    with open(path, 'w') as outfile:
+        json.dump(raw, outfile)
+
+    with raises(ValueError):
+        rawReplay(os.path.join(str(tmpdir), "raw.csv"))
+    with raises(ValueError):
+        rawReplay(path, speed=0)
+    with raises(ValueError):
+        rawReplay(path, symbols=['ETH'])
+    with raises(ValueError):
+        rawReplay(path).subscribe(crossoverStream('ETH', 'SMA', 10))
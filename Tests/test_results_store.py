@@ -0,0 +1,85 @@
+from pytest import raises, approx
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Lib.sweeps.results_store import resultsStore, data_fingerprint, run_key
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect path
+    """
+
+    with raises(ValueError):
+        resultsStore(5)
+
+
+def test_fingerprint():
+    """
+    Tests fingerprints only depend on DataFrame contents
+    """
+
+    df1 = pd.DataFrame({'a': [1.0, 2.0], 'b': [3.0, 4.0]})
+    df2 = pd.DataFrame({'a': [1.0, 2.0], 'b': [3.0, 4.0]})
+    df3 = pd.DataFrame({'a': [1.0, 2.0], 'b': [3.0, 5.0]})
+    assert(data_fingerprint(df1) == data_fingerprint(df2))
+    assert(data_fingerprint(df1) != data_fingerprint(df3))
+
+    job = ('crossover', ('a',), {'MA_type': 'SMA', 'slow_MA': 2})
+    assert(run_key(job, data_fingerprint(df1))
+           != run_key(job, data_fingerprint(df3)))
+
+
+def test_append(tmp_path):
+    """
+    Tests runs can be stored and queried
+    """
+
+    job = ('pairs', ('a', 'b'), {'zperiod': 5, 'bandwidth': 1.5})
+    returns = np.zeros(10)
+    returns[[3, 7]] = [0.1, -0.05]
+
+    with resultsStore(str(tmp_path / "store.db")) as store:
+        key = run_key(job, 'abc')
+        assert(not store.isComplete(key))
+        store.append(key, job, 'abc', 0.05, returns)
+        assert(store.isComplete(key))
+        assert(store.getCumReturns(key) == approx(0.05))
+        assert(np.array_equal(store.getReturns(key), returns))
+
+        results = store.getResults(strategy='pairs')
+        assert(results.shape[0] == 1)
+        assert(results.loc[0, 'symbols'] == 'a/b')
+        assert(results.loc[0, 'zperiod'] == 5)
+
+        with raises(KeyError):
+            store.getCumReturns('not a key')
+
+
+def test_resume(tmp_path):
+    """
+    Tests a sweep skips runs already completed in the store
+    """
+
+    df = pd.read_csv(mock_df)
+    jobs = [('crossover', ('ETH',), {'MA_type': 'SMA', 'slow_MA': slow})
+            for slow in [10, 20, 40]]
+    path = str(tmp_path / "store.db")
+
+    with resultsStore(path) as store:
+        expected = parameterSweep(df).run(jobs[:2], store=store)
+
+        # a fake result proves the completed run is not traded again
+        key = run_key(jobs[0], data_fingerprint(df))
+        store.append(key, jobs[0], data_fingerprint(df), 99.0)
+
+    with resultsStore(path) as store:
+        results = parameterSweep(df).run(jobs, store=store)
+        assert(results[0] == 99.0)
+        assert(results[1] == approx(expected[1]))
+        assert(len(store.completedKeys()) == 3)
@@ -0,0 +1,138 @@
+from pytest import raises, approx
+import json
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Main import run_study
+from ..Lib.strategies.crossover import crossoverTrader
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def write_config(tmp_path, **config):
+    path = os.path.join(str(tmp_path), "study.json")
+    with open(path, 'w') as outfile:
+        json.dump(config, outfile)
+    return path
+
+
+def test_expand_grid():
+    """
+    Tests every combination is expanded with fast_MA below slow_MA
+    """
+
+    grid = {'MA_type': 'SMA', 'slow_MA': [10, 20], 'fast_MA': [1, 10, 20]}
+    combos = run_study.expand_grid(grid)
+    assert(combos == [{'MA_type': 'SMA', 'slow_MA': 10, 'fast_MA': 1},
+                      {'MA_type': 'SMA', 'slow_MA': 20, 'fast_MA': 1},
+                      {'MA_type': 'SMA', 'slow_MA': 20, 'fast_MA': 10}])
+
+    # linked parameters vary together
+    grid = {'MAs': [{'slow_MA': 80, 'fast_MA': 27},
+                    {'slow_MA': 100, 'fast_MA': 34}],
+            'bandwidth': [1.0, 2.0]}
+    combos = run_study.expand_grid(grid)
+    assert(combos == [{'slow_MA': 80, 'fast_MA': 27, 'bandwidth': 1.0},
+                      {'slow_MA': 80, 'fast_MA': 27, 'bandwidth': 2.0},
+                      {'slow_MA': 100, 'fast_MA': 34, 'bandwidth': 1.0},
+                      {'slow_MA': 100, 'fast_MA': 34, 'bandwidth': 2.0}])
+    with raises(ValueError):
+        run_study.expand_grid({'MAs': [{'slow_MA': 80}, 100]})
+
+
+def test_zscore_config():
+    """
+    Tests the example zscore config runs the zscore app's grid
+    """
+
+    path = os.path.join(cpath, "..", "Main", "configs", "zscore.json")
+    grid = run_study.expand_grid(run_study.load_config(path)['grid'])
+    expected = [{'MA_type': 'SMA', 'slow_MA': slow, 'fast_MA': int(fast),
+                 'zscore_period': period, 'bandwidth': bandwidth}
+                for slow in [80, 100]
+                for fast in np.linspace(1, slow, 3, endpoint=False)
+                for period in [5, 8, 12] for bandwidth in [1.0, 1.5, 2.0]]
+    assert(grid == expected)
+
+
+def test_load_config_failure(tmp_path):
+    """
+    Tests for failure of incorrect configs
+    """
+
+    data = {'source': 'csv', 'infile': mock_df}
+    grid = {'zperiod': [5]}
+    with raises(ValueError):
+        run_study.load_config(write_config(tmp_path, study='pairs',
+                                           data=data, grid=grid, plots=True))
+    with raises(ValueError):
+        run_study.load_config(write_config(tmp_path, study='momentum',
+                                           data=data, grid=grid))
+    with raises(ValueError):
+        run_study.load_config(write_config(tmp_path, study='pairs',
+                                           data=data))
+
+
+def test_load_config(tmp_path):
+    """
+    Tests paths are relative to the config and overrides are applied
+    """
+
+    path = write_config(tmp_path, study='pairs',
+                        data={'source': 'csv', 'infile': 'prices.csv'},
+                        grid={'zperiod': [5]}, store='runs.db', workers=4)
+    config = run_study.load_config(path, {'workers': 2, 'output': None})
+    assert(config['data']['infile']
+           == os.path.join(str(tmp_path), 'prices.csv'))
+    assert(config['store'] == os.path.join(str(tmp_path), 'runs.db'))
+    assert(config['workers'] == 2)
+    assert(config['output'] is None)
+    assert(config['pairs'] == 'auto')
+
+
+def test_main(tmp_path):
+    """
+    Tests a study runs from the command line, matches the strategy and
+    is resumed from its store
+    """
+
+    grid = {'MA_type': 'SMA', 'slow_MA': [20, 40], 'fast_MA': [1, 10]}
+    path = write_config(tmp_path, study='crossover',
+                        data={'source': 'csv', 'infile': mock_df},
+                        symbols=['ETH'], grid=grid, store='runs.db',
+                        output='runs.csv')
+    output = os.path.join(str(tmp_path), 'runs.csv')
+
+    assert(run_study.main([path, '--workers', '2']) == 0)
+    runs = pd.read_csv(output)
+    assert(len(runs) == 4)
+    df = pd.read_csv(mock_df)
+    expected = crossoverTrader(df, 'ETH', 'SMA', 40, fast_MA=10).trade()
+    row = runs[(runs['slow_MA'] == 40) & (runs['fast_MA'] == 10)]
+    assert(row['cum_returns'].iloc[0] == approx(expected))
+
+    os.remove(output)
+    assert(run_study.main([path]) == 0)
+    assert(pd.read_csv(output).equals(runs))
+
+    assert(run_study.main([path, '--no-store', '--dry-run']) == 0)
+
+
+def test_pairs_dry_run(tmp_path, capsys):
+    """
+    Tests a dry run of a screened pairs study counts every candidate
+    pair without running the cointegration screen
+    """
+
+    path = write_config(tmp_path, study='pairs',
+                        data={'source': 'csv', 'infile': mock_df},
+                        grid={'zperiod': [5, 8]}, cache_dir='coint_cache')
+    assert(run_study.main([path, '--dry-run']) == 0)
+    assert(not os.path.exists(os.path.join(str(tmp_path), 'coint_cache')))
+
+    num_symbols = len(pd.read_csv(mock_df).select_dtypes('number').columns)
+    num_jobs = 2*num_symbols*(num_symbols - 1)//2
+    assert(capsys.readouterr().out.strip()
+           == "at most {} pairs jobs".format(num_jobs))
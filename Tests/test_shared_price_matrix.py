@@ -0,0 +1,114 @@
+from pytest import raises, approx
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Lib.sweeps.shared_price_matrix import sharedPriceMatrix
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategies.zscore_trend import zScoreTrader
+from ..Lib.strategy_backtester import backtest
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect inputs
+    """
+
+    with raises(ValueError):
+        sharedPriceMatrix([1, 2, 3])
+
+    df = pd.DataFrame({'a': [1.0, 2.0]})
+    with raises(ValueError):
+        sharedPriceMatrix(df, symbols=['b'])
+
+
+def test_attach():
+    """
+    Tests prices can be attached by name as a read only view
+    """
+
+    df = pd.DataFrame({'date': ['x', 'y', 'z'],
+                       'a': [1.0, 2.0, 3.0], 'b': [4.0, 5.0, 6.0]})
+    with sharedPriceMatrix(df) as prices:
+        assert(prices.symbols == ['a', 'b'])
+        assert(prices.shape == (2, 3))
+
+        view = sharedPriceMatrix.attach(prices.spec)
+        assert(np.array_equal(view.getSeries('b'), [4.0, 5.0, 6.0]))
+        with raises(ValueError):
+            view.getSeries('a')[0] = 10.0
+        with raises(ValueError):
+            view.getSeries('c')
+
+        frame = view.getFrame(['a'])
+        frame['a'] = 0.0
+        assert(view.getSeries('a')[0] == 1.0)
+        view.close()
+
+
+def test_cleanup():
+    """
+    Tests the segment is unlinked on close
+    """
+
+    df = pd.DataFrame({'a': [1.0, 2.0]})
+    prices = sharedPriceMatrix(df)
+    spec = prices.spec
+    prices.close()
+    prices.close()
+    with raises(FileNotFoundError):
+        sharedPriceMatrix.attach(spec)
+
+
+def test_parallel_sweep():
+    """
+    Tests a parallel sweep reproduces serial backtests
+    """
+
+    df = pd.read_csv(mock_df)
+    jobs = [('crossover', (symbol,),
+             {'MA_type': 'SMA', 'slow_MA': slow, 'fast_MA': fast})
+            for symbol in ['ETH', 'NEO'] for fast, slow in [(1, 20), (10, 40)]]
+
+    results = parameterSweep(df, workers=2).run(jobs)
+
+    for job, result in zip(jobs, results):
+        _, (symbol,), params = job
+        asset_df = df[['date', symbol]].reset_index()
+        expected = backtest(crossoverTrader(asset_df, symbol, **params)).trade()
+        assert(result == approx(expected))
+
+
+def test_bandwidth_grouping():
+    """
+    Tests zscore jobs grouped by bandwidth give their own results
+    """
+
+    df = pd.read_csv(mock_df)
+    jobs = [('zscore', (symbol,),
+             {'MA_type': 'SMA', 'slow_MA': 80, 'zscore_period': zperiod,
+              'bandwidth': bw, 'fast_MA': 27})
+            for bw in [1.0, 1.5, 2.0] for symbol in ['ETH', 'NEO']
+            for zperiod in [5, 8]]
+    jobs.insert(3, ('crossover', ('ETH',),
+                    {'MA_type': 'SMA', 'slow_MA': 40, 'fast_MA': 10}))
+
+    results = parameterSweep(df).run(jobs, keep_returns=True)
+
+    for (strategy, (symbol,), params), result in zip(jobs, results):
+        asset_df = df[['date', symbol]].reset_index()
+        if strategy == 'zscore':
+            trader = zScoreTrader(asset_df, symbol, **params)
+        else:
+            trader = crossoverTrader(asset_df, symbol, **params)
+        cum_returns, returns = result
+        assert(cum_returns == backtest(trader).trade())
+        assert(np.array_equal(returns, asset_df['returns'].to_numpy()))
+
+    jobs[0][2]['bandwidth'] = [1.0, 2.0]
+    with raises(ValueError):
+        parameterSweep(df).run(jobs)
@@ -0,0 +1,144 @@
+from pytest import raises
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Lib.streaming import snapshots
+from ..Lib.streaming.event_driven import (crossoverStream, zScoreStream,
+                                          pairsStream, replay)
+from ..Benchmarks.synthetic_data import cointegrated_pairs
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def _check_resumes(new_strategy, df, split):
+    """
+    Checks a strategy restored mid history ends as an uninterrupted one.
+    """
+    whole = new_strategy()
+    expected = replay(whole, df)
+
+    first = new_strategy()
+    orders = replay(first, df.iloc[:split])
+    restored = snapshots.loads(snapshots.dumps(first))
+    assert(restored.getState().keys() == first.getState().keys())
+    orders += replay(restored, df.iloc[split:])
+
+    assert(orders == expected)
+    assert(restored.cum_returns == whole.cum_returns)
+    assert(list(restored.ledger) == list(whole.ledger))
+    assert(restored.bars == whole.bars)
+
+
+def test_single_asset_snapshots():
+    """
+    Tests crossover and z score strategies resume exactly
+    """
+
+    df = pd.read_csv(mock_df)
+    for split in [5, 300, 1001]:
+        _check_resumes(lambda: crossoverStream('ETH', 'SMA', 40, fast_MA=10,
+                                               trading_fee=0.001), df, split)
+        _check_resumes(lambda: crossoverStream('NEO', 'EMA', 20), df, split)
+        _check_resumes(lambda: zScoreStream('ETH', 'SMA', 40, 3, 1.0,
+                                            fast_MA=5, ledger_size=5),
+                       df, split)
+
+
+def test_pairs_snapshots():
+    """
+    Tests pairs strategies resume exactly, with and without a position
+    open at the snapshot
+    """
+
+    df, _ = cointegrated_pairs(400, 1, seed=3)
+    stream = pairsStream('X000', 'Y000', 5, 1.0)
+    positions = []
+    for t, (x, y) in enumerate(zip(df['X000'], df['Y000'])):
+        stream.on_bar(t, {'X000': x, 'Y000': y})
+        positions.append(stream.spreadPosition.position)
+    opened = 1 if 1 in positions else -1
+    open_at = positions.index(opened) + 1
+
+    for split in [3, open_at, 250]:
+        _check_resumes(lambda: pairsStream('X000', 'Y000', 5, 1.0), df,
+                       split)
+
+
+def test_resume(tmpdir):
+    """
+    Tests a daily resume only processes the new bars
+    """
+
+    df = pd.read_csv(mock_df)
+    df.index = pd.date_range("2019-01-01", periods=len(df), freq='h')
+    path = os.path.join(str(tmpdir), "eth.snap")
+
+    def new_strategy():
+        return crossoverStream('ETH', 'SMA', 40, fast_MA=10)
+
+    expected = new_strategy()
+    replay(expected, df, symbols=['ETH'])
+
+    strategy, _ = snapshots.resume(path, df.iloc[:500], new_strategy,
+                                   symbols=['ETH'])
+    assert(strategy.bars == 500)
+    for day in range(500, len(df), 24):
+        strategy, _ = snapshots.resume(path, df.iloc[:day + 24],
+                                       symbols=['ETH'])
+    assert(strategy.bars == len(df))
+    assert(strategy.last_timestamp == df.index[-1])
+    assert(strategy.cum_returns == expected.cum_returns)
+    assert(snapshots.load_snapshot(path).getState()['cum_returns']
+           == expected.cum_returns)
+
+    with raises(ValueError):
+        snapshots.resume(os.path.join(str(tmpdir), "none.snap"), df)
+
+
+def test_format():
+    """
+    Tests snapshots are compact and checked when loaded
+    """
+
+    df = pd.read_csv(mock_df)
+    strategy = zScoreStream('ETH', 'SMA', 40, 12, 1.0, fast_MA=10,
+                            ledger_size=10)
+    replay(strategy, df)
+    data = snapshots.dumps(strategy)
+    assert(data[:4] == snapshots.MAGIC)
+    # windows of 40 + 10 + 2*12 floats, 10 ledger trades and a header
+    assert(len(data) < 2000)
+
+    with raises(ValueError):
+        snapshots.loads(data[:-1] + bytes([data[-1] ^ 1]))
+    with raises(ValueError):
+        snapshots.loads(data[:len(data)//2])
+    with raises(ValueError):
+        snapshots.loads(b'XXXX' + data[4:])
+    newer = bytearray(data)
+    newer[4:6] = (snapshots.VERSION + 1).to_bytes(2, 'little')
+    with raises(ValueError):
+        snapshots.loads(bytes(newer))
+
+    strategy.ledger.append((object(), 0.0))
+    with raises(ValueError):
+        snapshots.dumps(strategy)
+
+
+def test_nan_and_types():
+    """
+    Tests values round trip with their types
+    """
+
+    parts = []
+    value = {'a': [np.nan, 1.5], 'b': [1, 'x', None, True],
+             'c': pd.Timestamp("2020-01-01 05:00"), 'd': -3}
+    snapshots._encode(value, parts)
+    decoded, end = snapshots._decode(b''.join(parts), 0)
+    assert(end == len(b''.join(parts)))
+    assert(np.isnan(decoded['a'][0]) and decoded['a'][1] == 1.5)
+    assert(decoded['b'] == [1, 'x', None, True])
+    assert(decoded['c'] == value['c'])
+    assert(decoded['d'] == -3)
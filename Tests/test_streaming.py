@@ -0,0 +1,183 @@
+from pytest import raises
+import os.path
+import numpy as np
+import pandas as pd
+
+from ..Lib.streaming.indicators import (rollingMean, rollingVariance,
+                                        expWeightedMean, rollingZScore)
+from ..Lib.streaming.event_driven import (crossoverStream, zScoreStream,
+                                          pairsStream, order, replay)
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategies.zscore_trend import zScoreTrader
+from ..Lib.strategies.pairs import pairsTrader
+from ..Lib.types.zscore import zScore
+from ..Benchmarks.synthetic_data import cointegrated_pairs
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def _feed(indicator, series):
+    return np.array([indicator.update(x) for x in series])
+
+
+def test_indicators_match_pandas():
+    """
+    Tests the O(1) indicators give the batch values bit for bit
+    """
+
+    prices = pd.read_csv(mock_df)['ETH']
+    for period in [1, 2, 3, 10, 40]:
+        assert(np.array_equal(_feed(rollingMean(period), prices),
+                              prices.rolling(period).mean().values,
+                              equal_nan=True))
+        assert(np.array_equal(_feed(rollingVariance(period), prices),
+                              prices.rolling(period).var().values,
+                              equal_nan=True))
+        assert(np.array_equal(_feed(expWeightedMean(period), prices),
+                              prices.ewm(period).mean().values,
+                              equal_nan=True))
+        assert(np.array_equal(_feed(rollingZScore(period), prices),
+                              zScore(prices, period).values.values,
+                              equal_nan=True))
+
+
+def test_indicator_constant_values():
+    """
+    Tests flat windows give a zero variance and an undefined z score
+    """
+
+    var = rollingVariance(3)
+    zscr = rollingZScore(3)
+    for x in [1e6 + 0.1, 2.0, 2.0, 2.0, 2.0]:
+        value = var.update(x)
+        z = zscr.update(x)
+    assert(value == 0.0)
+    assert(np.isnan(z))
+
+
+def _trade_times(orders):
+    opens = sorted(set(o.timestamp for o in orders if o.action == 'open'))
+    closes = sorted(set(o.timestamp for o in orders if o.action == 'close'))
+    return opens, closes
+
+
+def test_crossover_stream():
+    """
+    Tests crossoverStream trades as crossoverTrader
+    """
+
+    df = pd.read_csv(mock_df)
+    for MA_type, fast, slow in [('SMA', 1, 20), ('SMA', 10, 40),
+                                ('EMA', 5, 50)]:
+        batch = crossoverTrader(df.copy(), 'ETH', MA_type, slow,
+                                fast_MA=fast, trading_fee=0.001)
+        expected = batch.trade()
+
+        stream = crossoverStream('ETH', MA_type, slow, fast_MA=fast,
+                                 trading_fee=0.001)
+        orders = replay(stream, df)
+        assert(stream.cum_returns == expected)
+        assert(_trade_times(orders) == (batch.opentimes, batch.closetimes))
+        assert(stream.bars == len(df))
+
+
+def test_zscore_stream():
+    """
+    Tests zScoreStream trades as zScoreTrader
+    """
+
+    df = pd.read_csv(mock_df)
+    for MA_type, fast, slow, period in [('SMA', 1, 20, 3),
+                                        ('SMA', 10, 40, 12),
+                                        ('EMA', 5, 80, 5)]:
+        batch = zScoreTrader(df.copy(), 'NEO', MA_type, slow, period, 1.0,
+                             fast_MA=fast)
+        expected = batch.trade()
+
+        stream = zScoreStream('NEO', MA_type, slow, period, 1.0,
+                              fast_MA=fast)
+        orders = replay(stream, df)
+        assert(stream.cum_returns == expected)
+        assert(_trade_times(orders) == (batch.opentimes, batch.closetimes))
+
+
+def test_pairs_stream():
+    """
+    Tests pairsStream trades as pairsTrader, which skips the last bar
+    """
+
+    df, _ = cointegrated_pairs(300, 1, seed=3)
+    batch = pairsTrader(df['X000'].copy(), df['Y000'].copy(),
+                        'X000', 'Y000', 5, 1.0)
+    expected = batch.trade()
+
+    stream = pairsStream('X000', 'Y000', 5, 1.0)
+    orders = replay(stream, df.iloc[:-1])
+    assert(len(orders) > 0)
+    assert(stream.cum_returns == expected)
+    assert(_trade_times(orders) == (batch.opentimes, batch.closetimes))
+    assert(stream.hedge_ratio == batch.df.loc[len(df) - 2, 'HR'])
+    assert(stream.spread == batch.df.loc[len(df) - 2, 'spread'])
+
+    # ending the history on a close, only the stream trades the final bar
+    last = max(o.timestamp for o in orders if o.action == 'close')
+    history = df.iloc[:last + 1]
+    batch = pairsTrader(history['X000'].copy(), history['Y000'].copy(),
+                        'X000', 'Y000', 5, 1.0)
+    expected = batch.trade()
+    stream = pairsStream('X000', 'Y000', 5, 1.0)
+    final = replay(stream, history)
+    assert(last not in batch.closetimes)
+    assert(_trade_times(final)[1][-1] == last)
+    assert(stream.cum_returns != expected)
+    assert(_trade_times([o for o in final if o.timestamp < last])
+           == (batch.opentimes, batch.closetimes))
+
+
+def test_ledger_size():
+    """
+    Tests only the latest trades are kept
+    """
+
+    df = pd.read_csv(mock_df)
+    stream = crossoverStream('ETH', 'SMA', 20, fast_MA=1, ledger_size=3)
+    orders = replay(stream, df)
+    assert(stream.num_trades > 3)
+    assert(len(stream.ledger) == 3)
+    closes = [o for o in orders if o.action == 'close']
+    assert([t for t, _ in stream.ledger]
+           == [o.timestamp for o in closes[-3:]])
+
+
+def test_orders():
+    """
+    Tests the orders of a bar
+    """
+
+    stream = crossoverStream('ETH', 'SMA', 2)
+    orders = []
+    for t, price in enumerate([1.0, 1.0, 1.0, 0.5, 2.0, 1.0]):
+        orders.extend(stream.on_bar(t, {'ETH': price}))
+    assert(orders == [order(4, 'ETH', 'open', 'L', 2.0),
+                      order(5, 'ETH', 'close', 'L', 1.0),
+                      order(5, 'ETH', 'open', 'S', 1.0)])
+
+
+def test_validation():
+    """
+    Tests bad parameters are rejected
+    """
+
+    with raises(ValueError):
+        rollingMean(0)
+    with raises(ValueError):
+        crossoverStream('ETH', 'WMA', 20)
+    with raises(ValueError):
+        crossoverStream('ETH', 'SMA', 10, fast_MA=20)
+    with raises(ValueError):
+        zScoreStream('ETH', 'SMA', 20, 0, 1.0)
+    with raises(ValueError):
+        pairsStream('X', 'Y', 0)
+    with raises(ValueError):
+        crossoverStream('ETH', 'SMA', 20, ledger_size=-1)
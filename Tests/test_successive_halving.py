@@ -0,0 +1,70 @@
+from pytest import raises, approx
+import os.path
+import pandas as pd
+
+from ..Lib.sweeps.successive_halving import successiveHalving
+from ..Lib.strategies.zscore_trend import zScoreTrader
+from ..Lib.strategy_backtester import backtest
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+grid = [{'MA_type': 'SMA', 'slow_MA': slow, 'zscore_period': zperiod,
+         'bandwidth': bw, 'fast_MA': 1}
+        for slow in [40, 80] for zperiod in [5, 8, 12] for bw in [1.0, 2.0]]
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect inputs
+    """
+
+    df = pd.read_csv(mock_df)
+    with raises(ValueError):
+        successiveHalving(df, ['BTC'], 'zscore', grid)
+    with raises(ValueError):
+        successiveHalving(df, ['ETH'], 'zscore', grid, resource='time')
+    with raises(ValueError):
+        successiveHalving(df, ['ETH'], 'zscore', grid, eta=1)
+
+
+def test_schedule():
+    """
+    Tests rungs shrink the candidates and grow the budget by eta
+    """
+
+    df = pd.read_csv(mock_df)
+    search = successiveHalving(df, ['ETH', 'NEO'], 'zscore', grid,
+                               min_resource=250, eta=2)
+    assert(search.rungs == [(12, 250), (6, 500), (3, 1000)])
+
+    search = successiveHalving(df, ['ETH', 'NEO'], 'zscore', grid,
+                               resource='symbols', eta=2)
+    assert(search.rungs == [(12, 1), (6, 2)])
+
+
+def test_run():
+    """
+    Tests the final rung is scored on the full history and the compute
+    saved is reported
+    """
+
+    df = pd.read_csv(mock_df)
+    symbols = ['ETH', 'NEO']
+    search = successiveHalving(df, symbols, 'zscore', grid,
+                               min_resource=250, eta=2)
+    ranking = search.run()
+
+    assert(ranking.shape[0] == len(grid))
+    assert(list(ranking['rung'][:3]) == [2, 2, 2])
+    assert(search.compute['evaluated_bars']
+           == 2*(12*250 + 6*500 + 3*1000))
+    assert(search.compute['saved'] == approx(1 - 9000/12000))
+
+    best = ranking.iloc[0]
+    params = grid[best['candidate']]
+    expected = 0.0
+    for symbol in symbols:
+        asset_df = df[['date', symbol]].reset_index()
+        expected += backtest(zScoreTrader(asset_df, symbol, **params)).trade()
+    assert(best['score'] == approx(expected/len(symbols)))
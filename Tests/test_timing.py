@@ -0,0 +1,108 @@
+from pytest import raises, approx
+import os.path
+import json
+import pandas as pd
+
+from ..Lib.instrumentation import timing
+from ..Lib.strategies.crossover import crossoverTrader
+from ..Lib.strategy_backtester import backtest
+from ..Lib.sweeps.parameter_sweep import parameterSweep
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+
+def test_disabled():
+    """
+    Tests phases are no-ops while instrumentation is disabled
+    """
+
+    timing.disable()
+    assert(timing.get_recorder() is None)
+    assert(timing.phase('bar_loop') is timing.phase('position'))
+    assert(timing.drain() is None)
+
+    df = pd.read_csv(mock_df)
+    strategy = crossoverTrader(df[['date', 'ETH']], 'ETH', 'SMA', 40,
+                               fast_MA=10)
+    backtest(strategy).trade()
+    assert(timing.get_recorder() is None)
+
+
+def test_recorder():
+    """
+    Tests phases of a backtest are recorded with their call counts
+    """
+
+    df = pd.read_csv(mock_df)
+    recorder = timing.enable()
+    try:
+        strategy = crossoverTrader(df[['date', 'ETH']], 'ETH', 'SMA', 40,
+                                   fast_MA=10)
+        backtest(strategy).trade()
+    finally:
+        assert(timing.disable() is recorder)
+
+    stats = recorder.stats
+    num_opens, num_closes = len(strategy.opentimes), len(strategy.closetimes)
+    assert(stats['backtest.trade'][0] == 1)
+    assert(stats['indicators'][0] == 1)
+    assert(stats['bar_loop'][3] == df.shape[0] - 41)
+    assert(stats['position'][0] == num_opens + num_closes)
+    assert(stats['dataframe_write'][0] == num_closes)
+    assert(stats['bar_loop'][1] <= stats['backtest.trade'][1])
+
+    summary = recorder.summary()
+    assert(summary.index[0] == 'backtest.trade')
+    assert(summary.loc['bar_loop', 'per_bar']
+           == approx(stats['bar_loop'][1]/stats['bar_loop'][3]))
+    with raises(RuntimeError):
+        recorder.exportChromeTrace("unused.json")
+
+
+def test_merge_and_trace(tmp_path):
+    """
+    Tests recorders merge and export Chrome traces
+    """
+
+    recorder = timing.phaseRecorder(trace=True)
+    recorder.record('a', 0.0, 1.0, bars=10)
+    other = timing.phaseRecorder(trace=True)
+    other.record('a', 2.0, 4.0, bars=10)
+    other.record('b', 2.0, 2.5)
+    recorder.merge(other.getState())
+
+    assert(recorder.stats['a'] == [2, 3.0, 2.0, 20])
+    assert(recorder.stats['b'][0] == 1)
+    path = os.path.join(str(tmp_path), "trace.json")
+    recorder.exportChromeTrace(path)
+    with open(path) as infile:
+        events = json.load(infile)['traceEvents']
+    assert(len(events) == 3)
+    assert(events[1]['ts'] == approx(2e6) and events[1]['dur'] == approx(2e6))
+
+
+def test_sweep_workers():
+    """
+    Tests timings of worker processes are merged into the caller's
+    """
+
+    df = pd.read_csv(mock_df)
+    jobs = [('zscore', (sym,), {'MA_type': 'SMA', 'slow_MA': 80,
+                                'zscore_period': 8, 'bandwidth': 1.5})
+            for sym in ('ETH', 'NEO')]*2
+
+    recorder = timing.enable()
+    try:
+        parameterSweep(df, workers=2).run(jobs)
+    finally:
+        timing.disable()
+    assert(recorder.stats['backtest.trade'][0] == 4)
+    assert(recorder.stats['bar_loop'][3] == 4*(df.shape[0] - 80))
+
+    serial = timing.enable()
+    try:
+        parameterSweep(df).run(jobs)
+    finally:
+        timing.disable()
+    assert(serial.stats['position'][0] == recorder.stats['position'][0])
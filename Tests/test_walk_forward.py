@@ -0,0 +1,71 @@
+from pytest import raises, approx
+import os.path
+import pandas as pd
+
+from ..Lib.sweeps.walk_forward import walkForward
+from ..Lib.strategies import event_kernels as kernels
+
+cpath = os.path.dirname(__file__)
+mock_df = os.path.join(cpath, "..", "Data", "mock_df.csv")
+
+grid = [{'MA_type': 'SMA', 'slow_MA': slow, 'fast_MA': fast}
+        for fast, slow in [(1, 10), (1, 20), (5, 40), (10, 50)]]
+
+
+def test_initialisation_failure():
+    """
+    Tests for failure of incorrect inputs
+    """
+
+    df = pd.read_csv(mock_df)
+    with raises(ValueError):
+        walkForward(df, 'ETH', 'pairs', grid, 200, 100)
+    with raises(ValueError):
+        walkForward(df, 'BTC', 'crossover', grid, 200, 100)
+    with raises(ValueError):
+        walkForward(df, 'ETH', 'crossover', grid, 0, 100)
+    with raises(ValueError):
+        walkForward(df, 'ETH', 'crossover', grid, 900, 200)
+
+
+def test_windows():
+    """
+    Tests rolling and anchored window layouts
+    """
+
+    df = pd.read_csv(mock_df)
+    rolling = walkForward(df, 'ETH', 'crossover', grid, 400, 200)
+    assert(rolling.windows == [(0, 400, 400, 600), (200, 600, 600, 800),
+                               (400, 800, 800, 1000)])
+
+    anchored = walkForward(df, 'ETH', 'crossover', grid, 400, 200,
+                           anchored=True)
+    assert(anchored.windows == [(0, 400, 400, 600), (0, 600, 600, 800),
+                                (0, 800, 800, 1000)])
+
+
+def test_run():
+    """
+    Tests each window selects the best train parameters and that a
+    parallel run matches a serial one
+    """
+
+    df = pd.read_csv(mock_df)
+    engine = walkForward(df, 'ETH', 'crossover', grid, 300, 100, step=150)
+    results = engine.run()
+    assert(results.shape[0] == len(engine.windows))
+
+    prices = df['ETH'].to_numpy()
+    events = engine.precomputeEvents()
+    for _, row in results.iterrows():
+        train = [kernels.crossover_trades(prices, index, side,
+                                          row['train_start'],
+                                          row['train_end'])[2].sum()
+                 for index, side, _ in events]
+        assert(row['train_returns'] == approx(max(train)))
+        assert(row['slow_MA'] == grid[row['best']]['slow_MA'])
+
+    parallel = walkForward(df, 'ETH', 'crossover', grid, 300, 100, step=150,
+                           workers=2).run()
+    assert(parallel['test_returns'].to_numpy()
+           == approx(results['test_returns'].to_numpy()))